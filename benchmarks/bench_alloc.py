@@ -0,0 +1,108 @@
+"""事件构造内存分配基准测试
+使用tracemalloc按事件类型统计 `Adapter.json_to_event` 构造每个事件分配的字节数
+
+用法:
+    python benchmarks/bench_alloc.py --output alloc.json
+
+merge为改动前先把data合并进外层字典再构造的方式，raw与no_raw分别为开启与关闭
+`ntchat_keep_raw_data` 时的当前实现；retained为事件对象的常驻内存，peak为构造过程中的峰值
+"""
+
+import argparse
+import copy
+import gc
+import json
+import sys
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import nonebot
+
+from corpus import CorpusGenerator, Frame
+
+MODES = ("merge", "raw", "no_raw")
+
+
+def setup() -> Any:
+    nonebot.init(log_level="WARNING")
+    from nonebot.adapters.ntchat import Adapter
+
+    return Adapter(nonebot.get_driver())
+
+
+def make_runner(adapter: Any, mode: str) -> Callable[[Frame], Any]:
+    if mode == "merge":
+
+        def merge(json_data: Frame) -> Any:
+            model = adapter.event_models.get_event_model(json_data)
+            json_data.update(**json_data["data"])
+            return adapter.event_builder.build(model, json_data)
+
+        return merge
+
+    def current(json_data: Frame) -> Any:
+        adapter.ntchat_config.ntchat_keep_raw_data = mode == "raw"
+        return adapter.json_to_event(json_data)
+
+    return current
+
+
+def measure(run: Callable[[Frame], Any], frames: List[Frame]) -> Dict[str, float]:
+    # json_to_event会修改传入的字典，每次测量使用新的副本，副本不计入统计
+    frames = copy.deepcopy(frames)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        events = [run(frame) for frame in frames]
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del events
+    return {
+        "retained_bytes": retained / len(frames),
+        "peak_bytes": peak / len(frames),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="混合语料帧数")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    args = parser.parse_args()
+
+    adapter = setup()
+    groups: Dict[str, List[Frame]] = defaultdict(list)
+    for frame in CorpusGenerator(args.seed).generate(args.count):
+        model = adapter.event_models.get_event_model(frame)
+        groups[model.__name__].append(frame)
+    groups["(all)"] = [frame for frames in groups.values() for frame in frames]
+
+    runners = {mode: make_runner(adapter, mode) for mode in MODES}
+    result: Dict[str, Dict[str, Any]] = {}
+    print(
+        f"{'event':<26}{'count':>7}"
+        + "".join(f"{mode + ' ret':>13}{mode + ' peak':>13}" for mode in MODES)
+    )
+    for name, frames in sorted(groups.items()):
+        stats: Dict[str, Any] = {"count": len(frames)}
+        for mode, run in runners.items():
+            stats[mode] = measure(run, frames)
+        result[name] = stats
+        print(
+            f"{name:<26}{len(frames):>7}"
+            + "".join(
+                f"{stats[mode]['retained_bytes']:>11.0f}B "
+                f"{stats[mode]['peak_bytes']:>11.0f}B "
+                for mode in MODES
+            )
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,89 @@
+"""压测用的bot
+回复每条文本消息 `echo <msgid>`，并通过 `/bench/stats` 提供api往返耗时与内存占用
+
+用法:
+    HOST=127.0.0.1 PORT=8080 python benchmarks/bench_bot.py
+"""
+
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional
+
+import nonebot
+from nonebot import on_message
+
+nonebot.init(log_level=os.environ.get("LOG_LEVEL", "WARNING"))
+
+from nonebot.adapters.ntchat import Adapter, Bot, TextMessageEvent  # noqa: E402
+
+driver = nonebot.get_driver()
+driver.register_adapter(Adapter)
+
+api_rtts: Deque[float] = deque(maxlen=100000)
+counters: Dict[str, int] = {"handled": 0, "failed": 0}
+
+
+def memory_usage() -> Optional[int]:
+    """当前进程常驻内存，单位字节，无法获取时为None"""
+    try:
+        import psutil
+
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def percentile(values: Any, q: float) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+echo = on_message(priority=1, block=True)
+
+
+@echo.handle()
+async def _(bot: Bot, event: TextMessageEvent) -> None:
+    counters["handled"] += 1
+    started = time.perf_counter()
+    try:
+        await bot.send(event, f"echo {event.msgid}")
+    except Exception:
+        counters["failed"] += 1
+    else:
+        api_rtts.append(time.perf_counter() - started)
+
+
+app = nonebot.get_app()
+
+
+@app.get("/bench/stats")
+async def stats() -> Dict[str, Any]:
+    return {
+        **counters,
+        "api_rtt": {
+            "count": len(api_rtts),
+            "p50": percentile(api_rtts, 0.5),
+            "p90": percentile(api_rtts, 0.9),
+            "p99": percentile(api_rtts, 0.99),
+        },
+        "memory": memory_usage(),
+    }
+
+
+@app.post("/bench/reset")
+async def reset() -> Dict[str, Any]:
+    api_rtts.clear()
+    counters.update(handled=0, failed=0)
+    return {"memory": memory_usage()}
+
+
+if __name__ == "__main__":
+    nonebot.run()
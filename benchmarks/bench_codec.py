@@ -0,0 +1,96 @@
+"""帧编解码基准测试
+比较各json编解码器与msgpack、cbor二进制帧的编码大小、编码与解码耗时
+
+用法:
+    python benchmarks/bench_codec.py --output codec.json
+
+未安装的编解码器会被跳过
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from nonebot.adapters.ntchat.codec import binary_codecs, codecs
+
+from corpus import CorpusGenerator, Frame
+
+
+def best_of(rounds: int, func: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def bench_codec(codec: Any, frames: List[Frame], rounds: int) -> Dict[str, float]:
+    dumps, loads = codec.dumps, codec.loads
+    encoded = [dumps(frame) for frame in frames]
+    # json编解码器输出str，按utf-8编码后的大小计算带宽
+    size = sum(
+        len(raw.encode()) if isinstance(raw, str) else len(raw) for raw in encoded
+    )
+    encode = best_of(rounds, lambda: [dumps(frame) for frame in frames])
+    decode = best_of(rounds, lambda: [loads(raw) for raw in encoded])
+    return {
+        "bytes_per_frame": size / len(frames),
+        "encode_us_per_frame": encode / len(frames) * 1e6,
+        "decode_us_per_frame": decode / len(frames) * 1e6,
+    }
+
+
+def available_codecs() -> Dict[str, Any]:
+    result: Dict[str, Any] = {}
+    for name, codec in {**codecs, **binary_codecs}.items():
+        try:
+            result[name] = codec()
+        except ImportError:
+            continue
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=5000, help="混合语料帧数")
+    parser.add_argument("--members", type=int, default=500, help="群成员列表长度")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--rounds", type=int, default=5, help="每项测量的轮数")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed)
+    suites = {
+        "mixed": generator.generate(args.count),
+        "member_list": [generator.member_list(args.members) for _ in range(50)],
+        "media": [generator.media() for _ in range(20)],
+    }
+    available = available_codecs()
+    result: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for suite, frames in suites.items():
+        result[suite] = {}
+        baseline = None
+        for name, codec in available.items():
+            stats = bench_codec(codec, frames, args.rounds)
+            if baseline is None:
+                baseline = stats["bytes_per_frame"]
+            result[suite][name] = stats
+            print(
+                f"{suite:<12} {name:<8} {stats['bytes_per_frame']:>10.0f} B/frame "
+                f"({stats['bytes_per_frame'] / baseline:>4.0%})  "
+                f"encode {stats['encode_us_per_frame']:>9.1f}us  "
+                f"decode {stats['decode_us_per_frame']:>9.1f}us"
+            )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,170 @@
+"""http api调用基准测试
+在本地模拟的ntchat http api服务上比较复用连接池的 `HttpApiClient` 与每次调用新建客户端的吞吐量
+
+用法:
+    python benchmarks/bench_http.py --calls 500 --concurrency 1 16 64 --output http.json
+
+unpooled为改动前经驱动 `request` 发出请求的方式（httpx驱动每次请求新建 `AsyncClient`，耗时主要在创建ssl上下文与建立连接），
+pooled为 `HttpApiClient`；模拟服务在独立的子进程中运行，对每个请求返回固定的成功结果
+"""
+
+import argparse
+import asyncio
+import json
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict
+
+RESPONSE_BODY = json.dumps({"status": 0, "msg": "ok", "data": {"result": True}}).encode()
+
+PostFunc = Callable[[str, str], Awaitable[Any]]
+
+
+async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """最简单的http/1.1处理，支持keep-alive"""
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            close = False
+            for line in head.split(b"\r\n")[1:]:
+                name, _, value = line.partition(b":")
+                name = name.strip().lower()
+                if name == b"content-length":
+                    length = int(value)
+                elif name == b"connection" and value.strip().lower() == b"close":
+                    close = True
+            await reader.readexactly(length)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                b"Content-Length: %d\r\n\r\n%s" % (len(RESPONSE_BODY), RESPONSE_BODY)
+            )
+            await writer.drain()
+            if close:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+def serve(port: int) -> None:
+    async def main() -> None:
+        server = await asyncio.start_server(handle, "127.0.0.1", port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), 0.2).close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"stand-in server did not start on port {port}")
+
+
+async def run_calls(post: PostFunc, calls: int, concurrency: int) -> float:
+    """并发发出api调用，返回每秒调用数"""
+    content = json.dumps({"to_wxid": "wxid_bench", "content": "收到"})
+    remaining = iter(range(calls))
+
+    async def worker() -> None:
+        for _ in remaining:
+            await post("send_text", content)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return calls / (time.perf_counter() - started)
+
+
+async def bench(
+    api_root: str, calls: int, concurrency: int, max_connections: int
+) -> Dict[str, float]:
+    from nonebot.drivers import Request
+    from nonebot.drivers.httpx import Mixin
+
+    from nonebot.adapters.ntchat.client import HttpApiClient
+
+    headers = {"Content-Type": "application/json"}
+
+    async def unpooled(api: str, content: str) -> Any:
+        request = Request(
+            "POST", api_root + api, headers=headers, timeout=10, content=content
+        )
+        # 驱动的request不使用实例状态
+        return await Mixin.request(None, request)  # type: ignore
+
+    client = HttpApiClient(api_root, max_connections, keepalive_expiry=30)
+
+    async def pooled(api: str, content: str) -> Any:
+        return await client.post(api, content, 10)
+
+    try:
+        # 预热，建立连接池中的连接
+        await run_calls(pooled, concurrency, concurrency)
+        return {
+            "unpooled_cps": await run_calls(unpooled, calls, concurrency),
+            "pooled_cps": await run_calls(pooled, calls, concurrency),
+        }
+    finally:
+        await client.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--calls", type=int, default=500, help="每项测量的调用数")
+    parser.add_argument(
+        "--concurrency", type=int, nargs="+", default=[1, 16, 64], help="并发调用数"
+    )
+    parser.add_argument(
+        "--max-connections", type=int, default=32, help="连接池大小，同ntchat_http_max_connections"
+    )
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve)
+        return 0
+
+    port = free_port()
+    server = subprocess.Popen([sys.executable, __file__, "--serve", str(port)])
+    try:
+        wait_port(port)
+        api_root = f"http://127.0.0.1:{port}/"
+        result: Dict[str, Any] = {}
+        for concurrency in args.concurrency:
+            stats = asyncio.run(
+                bench(api_root, args.calls, concurrency, args.max_connections)
+            )
+            result[str(concurrency)] = stats
+            print(
+                f"concurrency {concurrency:>4}  "
+                f"unpooled {stats['unpooled_cps']:>8.0f} calls/s  "
+                f"pooled {stats['pooled_cps']:>8.0f} calls/s  "
+                f"x{stats['pooled_cps'] / stats['unpooled_cps']:.1f}"
+            )
+    finally:
+        server.terminate()
+        server.wait()
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+"""事件接收基准测试
+使用合成语料测量 `Adapter.json_to_event` 与 `Bot.handle_event` 的吞吐量与内存占用
+
+用法:
+    python benchmarks/bench_ingest.py --output result.json
+    python benchmarks/bench_ingest.py --baseline benchmarks/ingest_baseline.json
+
+指定 `--baseline` 时与保存的结果比较，任一指标退化超过 `--tolerance` 时以状态码1退出；
+ingest_baseline.json为默认参数下的参考结果，运行环境记录在meta中，
+每事件内存与机器无关，吞吐量只在相近的机器上可比，其他机器上可先在基准提交上用 `--output` 生成
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import nonebot
+
+from corpus import BOT_WXID, CorpusGenerator, Frame
+
+HIGHER_IS_BETTER = ("ingest_eps", "handle_eps")
+LOWER_IS_BETTER = ("retained_bytes_per_event", "peak_bytes_per_event")
+
+
+def setup(args: argparse.Namespace) -> Tuple[Any, Any]:
+    nonebot.init(
+        log_level="WARNING",
+        ntchat_json_codec=args.codec,
+        ntchat_trusted_ingest=args.trusted,
+        ntchat_keep_raw_data=args.keep_raw,
+    )
+    from nonebot.adapters.ntchat import Adapter, Bot
+
+    adapter = Adapter(nonebot.get_driver())
+    return adapter, Bot(adapter, BOT_WXID)
+
+
+def bench_ingest(adapter: Any, encoded: List[str], rounds: int) -> float:
+    """解码并构造事件，返回最好一轮的每秒事件数"""
+    loads = adapter.codec.loads
+    to_event = adapter.json_to_event
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        for raw in encoded:
+            to_event(loads(raw))
+        best = min(best, time.perf_counter() - started)
+    return len(encoded) / best
+
+
+def bench_models(adapter: Any, encoded: List[str]) -> Dict[str, Dict[str, float]]:
+    """按事件模型分别统计构造速度"""
+    loads = adapter.codec.loads
+    to_event = adapter.json_to_event
+    elapsed: Dict[str, float] = defaultdict(float)
+    counts: Dict[str, int] = defaultdict(int)
+    for raw in encoded:
+        started = time.perf_counter()
+        event = to_event(loads(raw))
+        cost = time.perf_counter() - started
+        name = type(event).__name__
+        elapsed[name] += cost
+        counts[name] += 1
+    return {
+        name: {"count": counts[name], "eps": counts[name] / elapsed[name]}
+        for name in sorted(counts)
+    }
+
+
+def bench_handle(adapter: Any, bot: Any, encoded: List[str], rounds: int) -> float:
+    """事件交给Bot.handle_event处理，返回最好一轮的每秒事件数"""
+
+    async def run(events: List[Any]) -> float:
+        started = time.perf_counter()
+        for event in events:
+            await bot.handle_event(event)
+        return time.perf_counter() - started
+
+    best = float("inf")
+    for _ in range(rounds):
+        events = [adapter.json_to_event(adapter.codec.loads(raw)) for raw in encoded]
+        gc.collect()
+        best = min(best, asyncio.run(run(events)))
+    return len(encoded) / best
+
+
+def bench_memory(adapter: Any, encoded: List[str]) -> Dict[str, float]:
+    """统计构造事件时的峰值内存与事件对象的常驻内存"""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        events = [adapter.json_to_event(adapter.codec.loads(raw)) for raw in encoded]
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del events
+    return {
+        "retained_bytes_per_event": retained / len(encoded),
+        "peak_bytes_per_event": peak / len(encoded),
+    }
+
+
+def run_suite(
+    adapter: Any, bot: Any, frames: List[Frame], rounds: int
+) -> Dict[str, Any]:
+    encoded = [adapter.codec.dumps(frame) for frame in frames]
+    result: Dict[str, Any] = {
+        "events": len(encoded),
+        "ingest_eps": bench_ingest(adapter, encoded, rounds),
+        "handle_eps": bench_handle(adapter, bot, encoded, rounds),
+    }
+    result.update(bench_memory(adapter, encoded))
+    result["models"] = bench_models(adapter, encoded)
+    return result
+
+
+def compare(
+    result: Dict[str, Any], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """返回退化超过容差的指标"""
+    regressions: List[str] = []
+    for suite, current in result["suites"].items():
+        base = baseline.get("suites", {}).get(suite)
+        if base is None:
+            continue
+        for key in HIGHER_IS_BETTER + LOWER_IS_BETTER:
+            old, new = base.get(key), current.get(key)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if key in LOWER_IS_BETTER:
+                change = -change
+            if change < -tolerance:
+                regressions.append(
+                    f"{suite}.{key}: {old:.1f} -> {new:.1f} ({change:+.1%})"
+                )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="混合语料事件数")
+    parser.add_argument("--flood", type=int, default=20000, help="文本刷屏语料事件数")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--rounds", type=int, default=5, help="每项测量的轮数")
+    parser.add_argument("--codec", default="auto", help="json编解码器")
+    parser.add_argument("--trusted", action="store_true", help="开启信任模式")
+    parser.add_argument("--keep-raw", action="store_true", help="保留原始数据")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    parser.add_argument("--baseline", type=Path, help="用于比较的基准结果")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="允许的退化比例")
+    args = parser.parse_args()
+
+    adapter, bot = setup(args)
+    generator = CorpusGenerator(args.seed)
+    suites = {
+        "mixed": generator.generate(args.count),
+        "text_flood": generator.text_flood(args.flood),
+    }
+    result: Dict[str, Any] = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "codec": adapter.codec.name,
+            "seed": args.seed,
+            "trusted": args.trusted,
+            "keep_raw_data": args.keep_raw,
+        },
+        "suites": {
+            name: run_suite(adapter, bot, frames, args.rounds)
+            for name, frames in suites.items()
+        },
+    }
+
+    for name, suite in result["suites"].items():
+        print(
+            f"{name:<12} ingest {suite['ingest_eps']:>10.0f} ev/s  "
+            f"handle {suite['handle_eps']:>10.0f} ev/s  "
+            f"retained {suite['retained_bytes_per_event']:>8.0f} B/ev  "
+            f"peak {suite['peak_bytes_per_event']:>8.0f} B/ev"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare(result, baseline, args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print("no regressions")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""json编解码微基准测试
+在合成的ntchat上报与api请求上比较orjson、msgspec、ujson与标准库json的解码、编码耗时
+
+用法:
+    python benchmarks/bench_json.py --output json.json
+
+解码分别测量str帧与bytes帧（反向ws的文本帧与二进制帧、http post上报），
+编码测量 `_call_api` 发出的api请求，未安装的编解码器会被跳过
+"""
+
+import argparse
+import gc
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from nonebot.adapters.ntchat.codec import JsonCodec, codecs
+from nonebot.adapters.ntchat.type import EventType
+
+from corpus import CorpusGenerator, Frame
+
+
+def best_of(rounds: int, func: Callable[[], Any]) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        gc.collect()
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def api_requests(generator: CorpusGenerator, count: int) -> List[Dict[str, Any]]:
+    """`_call_api` 发出的请求，以文本为主，混入少量群发@与base64图片"""
+    requests: List[Dict[str, Any]] = []
+    for seq in range(count):
+        if seq % 50 == 0:
+            params: Dict[str, Any] = {
+                "to_wxid": generator.rooms[0],
+                "file": "base64://" + "A" * 64 * 1024,
+            }
+            action = "send_image"
+        elif seq % 10 == 0:
+            params = {
+                "to_wxid": generator.rooms[0],
+                "content": "{$@}" + generator._text(32),
+                "at_list": generator.users[:5],
+            }
+            action = "send_room_at_msg"
+        else:
+            params = {"to_wxid": generator.users[seq % 100], "content": "收到"}
+            action = "send_text"
+        requests.append({"action": action, "params": params, "echo": str(seq)})
+    return requests
+
+
+def bench_decode(
+    codec: JsonCodec, frames: List[Frame], rounds: int
+) -> Dict[str, Dict[str, float]]:
+    """按事件类型统计str与bytes帧的解码耗时"""
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for frame in frames:
+        groups[EventType(frame["type"]).name].append(
+            json.dumps(frame, ensure_ascii=False)
+        )
+    loads = codec.loads
+    result: Dict[str, Dict[str, float]] = {}
+    for name, texts in sorted(groups.items()):
+        raws = [text.encode() for text in texts]
+        str_time = best_of(rounds, lambda: [loads(text) for text in texts])
+        bytes_time = best_of(rounds, lambda: [loads(raw) for raw in raws])
+        result[name] = {
+            "count": len(texts),
+            "str_us": str_time / len(texts) * 1e6,
+            "bytes_us": bytes_time / len(texts) * 1e6,
+        }
+    return result
+
+
+def bench_encode(
+    codec: JsonCodec, requests: List[Dict[str, Any]], rounds: int
+) -> float:
+    dumps = codec.dumps
+    return best_of(rounds, lambda: [dumps(r) for r in requests]) / len(requests) * 1e6
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="混合语料帧数")
+    parser.add_argument("--requests", type=int, default=5000, help="api请求数")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--rounds", type=int, default=5, help="每项测量的轮数")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    args = parser.parse_args()
+
+    generator = CorpusGenerator(args.seed)
+    frames = generator.generate(args.count)
+    requests = api_requests(generator, args.requests)
+
+    result: Dict[str, Any] = {}
+    for name, codec_class in codecs.items():
+        try:
+            codec = codec_class()
+        except ImportError:
+            print(f"{name:<8} not installed")
+            continue
+        decode = bench_decode(codec, frames, args.rounds)
+        total = sum(item["count"] for item in decode.values())
+        str_us = sum(item["str_us"] * item["count"] for item in decode.values())
+        bytes_us = sum(item["bytes_us"] * item["count"] for item in decode.values())
+        result[name] = {
+            "decode": decode,
+            "decode_str_us": str_us / total,
+            "decode_bytes_us": bytes_us / total,
+            "encode_us": bench_encode(codec, requests, args.rounds),
+        }
+
+    baseline = result.get("json")
+    for name, item in result.items():
+        speedup = ""
+        if baseline is not None:
+            speedup = f"  x{baseline['decode_str_us'] / item['decode_str_us']:.1f}"
+        print(
+            f"{name:<8} decode str {item['decode_str_us']:>6.2f}us  "
+            f"bytes {item['decode_bytes_us']:>6.2f}us  "
+            f"encode {item['encode_us']:>6.2f}us{speedup}"
+        )
+    if baseline is not None:
+        print()
+        print(f"{'event':<30}" + "".join(f"{name:>10}" for name in result))
+        for event in baseline["decode"]:
+            print(
+                f"{event:<30}"
+                + "".join(
+                    f"{item['decode'][event]['str_us']:>8.2f}us"
+                    for item in result.values()
+                )
+            )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
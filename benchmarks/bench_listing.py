@@ -0,0 +1,140 @@
+"""大列表回调基准测试
+比较群成员列表回调完整解码为字典、解析为 `RoomMember` 模型与逐项解析为紧凑记录时的峰值内存与耗时
+
+用法:
+    python benchmarks/bench_listing.py --sizes 10000 100000 --output listing.json
+
+每种方式在独立的子进程中运行，峰值常驻内存（RSS）为相对于读入回调原始数据后的增量
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+from corpus import CorpusGenerator
+
+MODES = ("dicts", "models", "records", "stream")
+"""dicts: 完整解码（get_room_members的返回值）；models: 解析为RoomMember；
+records: 逐项解析并保留所有Member记录；stream: 逐项解析不保留"""
+
+
+def peak_rss() -> int:
+    """当前进程的峰值常驻内存，单位字节"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS的ru_maxrss单位为字节，linux为KB
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def reset_peak_rss() -> None:
+    """重置峰值常驻内存，仅linux支持"""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def run_mode(mode: str, text: str) -> int:
+    from nonebot.adapters.ntchat.event import RoomMember
+    from nonebot.adapters.ntchat.listing import Member, item_list, iter_items
+    from nonebot.adapters.ntchat.utils import handle_api_result
+
+    if mode == "stream":
+        return sum(1 for _ in iter_items(text, Member.from_dict))
+    if mode == "records":
+        return len(list(iter_items(text, Member.from_dict)))
+    members = item_list(handle_api_result(json.loads(text)))
+    if mode == "models":
+        return len([RoomMember.parse_obj(member) for member in members])
+    return len(members)
+
+
+def child(mode: str, path: str) -> Dict[str, Any]:
+    text = Path(path).read_text(encoding="utf-8")
+    # 预先导入，避免模块占用的内存计入结果
+    import nonebot.adapters.ntchat.event  # noqa: F401
+    import nonebot.adapters.ntchat.listing  # noqa: F401
+
+    reset_peak_rss()
+    before = peak_rss()
+    started = time.perf_counter()
+    count = run_mode(mode, text)
+    elapsed = time.perf_counter() - started
+    rss = peak_rss() - before
+
+    tracemalloc.start()
+    run_mode(mode, text)
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "count": count,
+        "seconds": elapsed,
+        "peak_rss": rss,
+        "peak_traced": traced,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[10000, 100000], help="群成员数"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    parser.add_argument("--child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(child(*args.child)))
+        return 0
+
+    result: Dict[str, Dict[str, Any]] = {}
+    for size in args.sizes:
+        frame = CorpusGenerator(args.seed).member_list(size)
+        with tempfile.NamedTemporaryFile(
+            "w", suffix=".json", encoding="utf-8", delete=False
+        ) as f:
+            json.dump(frame, f, ensure_ascii=False)
+        del frame
+        try:
+            suite: Dict[str, Any] = {"frame_bytes": os.path.getsize(f.name)}
+            for mode in MODES:
+                output = subprocess.run(
+                    [sys.executable, __file__, "--child", mode, f.name],
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                stats: Dict[str, Any] = json.loads(output)
+                suite[mode] = stats
+                print(
+                    f"{size:>8} members  {mode:<8} "
+                    f"peak rss {stats['peak_rss'] / 1024 / 1024:>7.1f}MiB  "
+                    f"traced {stats['peak_traced'] / 1024 / 1024:>7.1f}MiB  "
+                    f"{stats['seconds'] * 1000:>8.1f}ms"
+                )
+            result[str(size)] = suite
+        finally:
+            os.unlink(f.name)
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
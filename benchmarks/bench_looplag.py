@@ -0,0 +1,155 @@
+"""事件循环延迟基准测试
+在大媒体发送与文本消息洪流混合的负载下，比较在事件循环中直接编码与卸载到执行器时的循环延迟
+
+用法:
+    python benchmarks/bench_looplag.py --media 20 --media-size 10 --texts 5000 --output looplag.json
+
+inline为 `ntchat_offload_threshold=0` 时的方式，offload为按阈值卸载到 `--executor` 执行器的方式；
+媒体发送与 `Bot.send_image` 相同，构造消息段后编码为api请求帧，文本消息只编码请求帧；
+循环延迟为每隔 `--interval` 毫秒的定时器实际唤醒时间与预期时间之差，文本延迟为每条文本帧从排队到编码完成的耗时；
+base64编码与orjson编码不释放GIL，线程池只能把单次长时间阻塞拆开，
+`--executor process` 或 `--media-dir` （保存为文件，哈希与写入释放GIL）下改善更明显
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+MODES = ("inline", "offload")
+MB = 1024 * 1024
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50_ms": (percentile(values, 0.5) or 0) * 1000,
+        "p99_ms": (percentile(values, 0.99) or 0) * 1000,
+        "max_ms": max(values, default=0) * 1000,
+    }
+
+
+async def monitor(interval: float, lags: List[float], stop: asyncio.Event) -> None:
+    """定时唤醒，记录实际唤醒时间超出预期的部分"""
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(time.perf_counter() - expected, 0))
+
+
+async def bench(
+    threshold: int,
+    executor: str,
+    media: int,
+    media_size: int,
+    texts: int,
+    interval: float,
+) -> Dict[str, Any]:
+    from nonebot.adapters.ntchat.codec import get_codec
+    from nonebot.adapters.ntchat.message import MessageSegment
+    from nonebot.adapters.ntchat.offload import Offloader, codec_dumps, payload_size
+
+    codec = get_codec("auto")
+    offloader = Offloader(threshold, executor)
+    blobs = [os.urandom(media_size) for _ in range(media)]
+
+    async def send_media(data: bytes) -> None:
+        size = payload_size(data)
+        segment = await offloader.run(size, MessageSegment.image, data, local=True)
+        params = {**segment.data, "to_wxid": "wxid_bench"}
+        frame = {"action": "send_image", "params": params, "echo": "1"}
+        await offloader.run(size, codec_dumps, codec.name, frame)
+
+    text_latency: List[float] = []
+
+    async def send_texts() -> None:
+        for i in range(texts):
+            queued = time.perf_counter()
+            # 让出事件循环，模拟逐条到达的消息
+            await asyncio.sleep(0)
+            params = {"to_wxid": "wxid_bench", "content": f"echo {i}"}
+            codec.dumps({"action": "send_text", "params": params, "echo": str(i)})
+            text_latency.append(time.perf_counter() - queued)
+
+    lags: List[float] = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(monitor(interval, lags, stop))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(send_texts(), *(send_media(data) for data in blobs))
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await ticker
+        offloader.shutdown()
+    return {
+        "seconds": elapsed,
+        "offloaded": offloader.offloaded,
+        "loop_lag": summarize(lags),
+        "text_latency": summarize(text_latency),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--media", type=int, default=20, help="大媒体发送数")
+    parser.add_argument("--media-size", type=int, default=10, help="媒体大小，单位MiB")
+    parser.add_argument("--texts", type=int, default=5000, help="文本消息数")
+    parser.add_argument(
+        "--threshold", type=int, default=1024 * 1024, help="卸载阈值，同ntchat_offload_threshold"
+    )
+    parser.add_argument(
+        "--executor", choices=("thread", "process"), default="thread", help="执行器类型"
+    )
+    parser.add_argument("--media-dir", action="store_true", help="媒体保存为文件后发送路径")
+    parser.add_argument("--interval", type=float, default=1, help="定时器间隔，单位毫秒")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    args = parser.parse_args()
+
+    from nonebot.adapters.ntchat.media import media_store
+
+    workdir = tempfile.TemporaryDirectory()
+    if args.media_dir:
+        media_store.configure(Path(workdir.name), threshold=0, max_age=3600)
+
+    result: Dict[str, Any] = {}
+    for mode in MODES:
+        threshold = args.threshold if mode == "offload" else 0
+        stats = asyncio.run(
+            bench(
+                threshold,
+                args.executor,
+                args.media,
+                args.media_size * MB,
+                args.texts,
+                args.interval / 1000,
+            )
+        )
+        result[mode] = stats
+        lag, text = stats["loop_lag"], stats["text_latency"]
+        print(
+            f"{mode:<8} {stats['seconds']:>6.2f}s  "
+            f"loop lag p50 {lag['p50_ms']:>7.2f}ms p99 {lag['p99_ms']:>7.2f}ms "
+            f"max {lag['max_ms']:>7.2f}ms  "
+            f"text p99 {text['p99_ms']:>7.2f}ms max {text['max_ms']:>7.2f}ms"
+        )
+    workdir.cleanup()
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
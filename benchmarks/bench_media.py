@@ -0,0 +1,116 @@
+"""媒体发送内存基准测试
+比较bytes媒体转为base64内联发送与保存为共享目录文件后发送路径时的峰值内存与耗时
+
+用法:
+    python benchmarks/bench_media.py --sizes 1 10 100 --output media.json
+
+每次测量在独立的子进程中构造 `MessageSegment.image` 并编码为api请求帧，
+base64为未配置 `ntchat_media_dir` 时的方式，spool为保存为文件的方式；
+峰值常驻内存（RSS）为相对于准备好媒体数据后的增量，tracemalloc峰值包含编解码器预留但未使用的缓冲区
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Dict
+
+from bench_listing import peak_rss, reset_peak_rss
+
+MODES = ("base64", "spool")
+MB = 1024 * 1024
+
+
+def send_frame(codec: Any, data: bytes) -> int:
+    """构造消息段并编码为 `_call_api` 发出的请求帧，返回帧长度"""
+    from nonebot.adapters.ntchat.message import MessageSegment
+
+    segment = MessageSegment.image(data)
+    params = {**segment.data, "to_wxid": "wxid_bench"}
+    frame = codec.dumps({"action": "send_image", "params": params, "echo": "1"})
+    return len(frame)
+
+
+def child(mode: str, size: int, directory: str, codec_name: str) -> Dict[str, Any]:
+    from nonebot.adapters.ntchat.codec import get_codec
+    from nonebot.adapters.ntchat.media import media_store
+
+    codec = get_codec(codec_name)
+
+    if mode == "spool":
+        media_store.configure(Path(directory), threshold=0, max_age=3600)
+    data = os.urandom(size)
+    # 预热，避免模块导入与编解码器初始化计入结果
+    send_frame(codec, b"\x89PNG\r\n\x1a\n")
+
+    reset_peak_rss()
+    before = peak_rss()
+    started = time.perf_counter()
+    frame_bytes = send_frame(codec, data)
+    elapsed = time.perf_counter() - started
+    rss = peak_rss() - before
+
+    # 再次测量时内容相同的文件已存在，改变内容避免命中
+    data = os.urandom(size)
+    tracemalloc.start()
+    send_frame(codec, data)
+    _, traced = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        "frame_bytes": frame_bytes,
+        "seconds": elapsed,
+        "peak_rss": rss,
+        "peak_traced": traced,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1, 10, 100], help="媒体大小，单位MiB"
+    )
+    parser.add_argument("--codec", default="auto", help="json编解码器")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    parser.add_argument("--child", nargs=4, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        mode, size, directory, codec_name = args.child
+        print(json.dumps(child(mode, int(size), directory, codec_name)))
+        return 0
+
+    result: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for size in args.sizes:
+            suite: Dict[str, Any] = {}
+            for mode in MODES:
+                command = [sys.executable, __file__, "--child", mode]
+                command += [str(size * MB), directory, args.codec]
+                output = subprocess.run(
+                    command,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                stats: Dict[str, Any] = json.loads(output)
+                suite[mode] = stats
+                print(
+                    f"{size:>5}MiB  {mode:<7} "
+                    f"peak rss {stats['peak_rss'] / MB:>7.1f}MiB  "
+                    f"traced {stats['peak_traced'] / MB:>7.1f}MiB  "
+                    f"frame {stats['frame_bytes'] / MB:>7.1f}MiB  "
+                    f"{stats['seconds'] * 1000:>8.1f}ms"
+                )
+            result[str(size)] = suite
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
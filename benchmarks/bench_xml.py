@@ -0,0 +1,114 @@
+"""raw_msg延迟解析基准测试
+按事件类型比较只构造事件（延迟解析）与构造后立即读取全部xml字段（原先的提前解析）的耗时
+
+用法:
+    python benchmarks/bench_xml.py --output xml.json
+
+lazy为只构造事件，eager为构造后读取全部xml字段，与改动前在校验器中解析xml的开销相当，
+describe为构造后生成事件描述（`Bot.handle_event` 记录日志时的开销）
+"""
+
+import argparse
+import gc
+import inspect
+import json
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Type
+
+from nonebot.adapters.ntchat import event as event_module
+from nonebot.adapters.ntchat.collator import EventModels
+from nonebot.adapters.ntchat.event import Event, get_xml_fields
+
+from corpus import CorpusGenerator, Frame
+
+MODES = ("lazy", "eager", "describe")
+
+
+def build_models() -> EventModels:
+    models: EventModels = EventModels()
+    for _, model in inspect.getmembers(event_module, inspect.isclass):
+        if issubclass(model, Event) and model is not Event:
+            models.add_event_model(model)
+    return models
+
+
+def make_runner(mode: str, model: Type[Event]) -> Callable[[Dict[str, Any]], Any]:
+    fields = get_xml_fields(model)
+    parse = model.parse_obj
+    if mode == "lazy":
+        return parse
+    if mode == "describe":
+        return lambda data: parse(data).get_event_description()
+
+    def eager(data: Dict[str, Any]) -> None:
+        event = parse(data)
+        for name in fields:
+            getattr(event, name)
+
+    return eager
+
+
+def bench(
+    model: Type[Event], frames: List[Dict[str, Any]], rounds: int
+) -> Dict[str, float]:
+    result: Dict[str, float] = {}
+    for mode in MODES:
+        run = make_runner(mode, model)
+        best = float("inf")
+        for _ in range(rounds):
+            gc.collect()
+            started = time.perf_counter()
+            for data in frames:
+                run(data)
+            best = min(best, time.perf_counter() - started)
+        result[f"{mode}_us"] = best / len(frames) * 1e6
+    return result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="混合语料帧数")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--rounds", type=int, default=5, help="每项测量的轮数")
+    parser.add_argument("--all", action="store_true", help="包含没有xml字段的事件类型")
+    parser.add_argument("--output", type=Path, help="结果保存路径")
+    args = parser.parse_args()
+
+    models = build_models()
+    groups: Dict[Type[Event], List[Dict[str, Any]]] = defaultdict(list)
+    frame: Frame
+    for frame in CorpusGenerator(args.seed).generate(args.count):
+        groups[models.get_event_model(frame)].append(frame["data"])
+
+    result: Dict[str, Any] = {}
+    print(
+        f"{'event':<26}{'count':>7}{'lazy':>12}{'eager':>12}{'describe':>12}"
+        f"{'saved':>8}  fields"
+    )
+    for model, frames in sorted(groups.items(), key=lambda item: item[0].__name__):
+        fields = get_xml_fields(model)
+        if not fields and not args.all:
+            continue
+        stats = bench(model, frames, args.rounds)
+        saved = 1 - stats["lazy_us"] / stats["eager_us"]
+        result[model.__name__] = {
+            "count": len(frames),
+            "fields": list(fields),
+            **stats,
+            "saved": saved,
+        }
+        print(
+            f"{model.__name__:<26}{len(frames):>7}"
+            f"{stats['lazy_us']:>10.2f}us{stats['eager_us']:>10.2f}us"
+            f"{stats['describe_us']:>10.2f}us{saved:>8.1%}  {', '.join(fields)}"
+        )
+    if args.output:
+        args.output.write_text(json.dumps(result, indent=2), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""信任模式构造一致性检查
+在合成语料上比较 `EventBuilder` 信任模式构造的事件与 `parse_obj` 完整校验的结果
+
+用法:
+    python benchmarks/check_parity.py --count 20000
+
+逐个事件比较类型、导出字段与事件接口的返回值，有任何差异时打印并以状态码1退出
+"""
+
+import argparse
+import inspect
+import sys
+from collections import Counter
+from typing import Any, Dict, List, Type
+
+from nonebot.adapters.ntchat import event as event_module
+from nonebot.adapters.ntchat.collator import EventBuilder, EventModels
+from nonebot.adapters.ntchat.event import Event
+
+from corpus import CorpusGenerator, Frame
+
+INTERFACES = (
+    "get_type",
+    "get_event_name",
+    "get_event_description",
+    "get_user_id",
+    "get_session_id",
+    "is_tome",
+)
+"""需要比较返回值的事件接口"""
+
+
+def build_models() -> EventModels:
+    models: EventModels = EventModels()
+    for _, model in inspect.getmembers(event_module, inspect.isclass):
+        if issubclass(model, Event) and model is not Event:
+            models.add_event_model(model)
+    return models
+
+
+def values_of(frame: Frame, keep_raw: bool) -> Dict[str, Any]:
+    """与 `Adapter.json_to_event` 相同的事件数据"""
+    data = dict(frame["data"])
+    if keep_raw:
+        return {"data": data, **data, "type": frame["type"]}
+    data["type"] = frame["type"]
+    return data
+
+
+def call(event: Event, name: str) -> Any:
+    try:
+        return getattr(event, name)()
+    except Exception as e:
+        return f"<{type(e).__name__}>"
+
+
+def compare(model: Type[Event], frame: Frame, keep_raw: bool) -> List[str]:
+    """返回两种方式构造的事件之间的差异"""
+    try:
+        expected = model.parse_obj(values_of(frame, keep_raw))
+    except Exception as e:
+        expected = None
+        error = type(e).__name__
+    try:
+        trusted = EventBuilder(trusted=True).construct(model, values_of(frame, keep_raw))
+    except Exception as e:
+        if expected is None:
+            return []
+        return [f"trusted construction raised {type(e).__name__}"]
+    if expected is None:
+        return [f"trusted construction accepted data rejected with {error}"]
+
+    diffs: List[str] = []
+    if type(trusted) is not type(expected):
+        diffs.append(f"type {type(trusted).__name__} != {type(expected).__name__}")
+    trusted_dict, expected_dict = trusted.dict(), expected.dict()
+    for key in sorted(set(trusted_dict) | set(expected_dict)):
+        if trusted_dict.get(key) != expected_dict.get(key):
+            diffs.append(
+                f"{key}: {trusted_dict.get(key)!r} != {expected_dict.get(key)!r}"
+            )
+    if trusted.__fields_set__ != expected.__fields_set__:
+        diffs.append(
+            f"fields set {sorted(trusted.__fields_set__)} "
+            f"!= {sorted(expected.__fields_set__)}"
+        )
+    for name in INTERFACES:
+        got, want = call(trusted, name), call(expected, name)
+        if got != want:
+            diffs.append(f"{name}(): {got!r} != {want!r}")
+    if isinstance(expected, event_module.MessageEvent):
+        if str(trusted.get_message()) != str(expected.get_message()):
+            diffs.append("get_message() differs")
+    return diffs
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="混合语料帧数")
+    parser.add_argument("--seed", type=int, default=0, help="语料随机种子")
+    parser.add_argument("--limit", type=int, default=5, help="每种事件最多打印的差异数")
+    args = parser.parse_args()
+
+    models = build_models()
+    checked: Counter = Counter()
+    failed: Counter = Counter()
+    for frame in CorpusGenerator(args.seed).generate(args.count):
+        model = models.get_event_model(frame)
+        for keep_raw in (False, True):
+            checked[model.__name__] += 1
+            diffs = compare(model, frame, keep_raw)
+            if not diffs:
+                continue
+            failed[model.__name__] += 1
+            if failed[model.__name__] <= args.limit:
+                print(f"MISMATCH {model.__name__} (keep_raw={keep_raw}) {frame['data']}")
+                for diff in diffs:
+                    print(f"    {diff}")
+
+    for name in sorted(checked):
+        print(f"{name:<26}{checked[name]:>7} checked {failed[name]:>5} mismatched")
+    if failed:
+        return 1
+    print("trusted construction matches parse_obj")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
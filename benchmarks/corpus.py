@@ -0,0 +1,395 @@
+"""合成事件语料
+按固定随机种子生成覆盖event.py中所有事件类型的ntchat上报数据
+"""
+
+import base64
+import random
+from typing import Any, Callable, Dict, List, Tuple
+
+Frame = Dict[str, Any]
+
+BOT_WXID = "wxid_bench_bot"
+
+QUOTE_XML = (
+    "<msg><appmsg><title>{title}</title><type>57</type><refermsg>"
+    "<svrid>{svrid}</svrid><chatusr>{chatusr}</chatusr>"
+    "<content>{content}</content></refermsg></appmsg></msg>"
+)
+CARD_XML = (
+    '<msg bigheadimgurl="http://wx.qlogo.cn/mmhead/{wxid}/0" '
+    'nickname="{nickname}" username="{wxid}" sex="1" province="" city=""/>'
+)
+EMOJI_XML = (
+    '<msg><emoji fromusername="{wxid}" type="2" '
+    'cdnurl="http%3A%2F%2Femoji.qpic.cn%2Fwx_emoji%2F{md5}%2F" md5="{md5}"/></msg>'
+)
+LOCATION_XML = (
+    '<msg><location x="{x:.6f}" y="{y:.6f}" scale="15" '
+    'label="{label}" poiname="{poiname}" maptype="roadmap"/></msg>'
+)
+REVOKE_XML = (
+    '<sysmsg type="revokemsg"><revokemsg><session>{session}</session>'
+    "<msgid>{msgid}</msgid><newmsgid>{newmsgid}</newmsgid>"
+    "<replacemsg><![CDATA[\"{nickname}\" 撤回了一条消息]]></replacemsg>"
+    "</revokemsg></sysmsg>"
+)
+WCPAY_XML = (
+    "<msg><appmsg><title>微信转账</title><type>2000</type><wcpayinfo>"
+    "<paysubtype>1</paysubtype><feedesc>￥{amount:.2f}</feedesc>"
+    "<transcationid>{transid}</transcationid><pay_memo>{memo}</pay_memo>"
+    "</wcpayinfo></appmsg></msg>"
+)
+APP_XML = (
+    "<msg><appmsg><title>{title}</title><type>{sub_type}</type>"
+    "<url>https://example.com/{path}</url></appmsg></msg>"
+)
+PLAIN_XML = "<msg><content>{content}</content></msg>"
+
+
+class CorpusGenerator:
+    """
+    生成ntchat上报数据，相同种子生成相同语料
+    """
+
+    def __init__(self, seed: int = 0, bot_wxid: str = BOT_WXID) -> None:
+        self.random = random.Random(seed)
+        self.bot_wxid = bot_wxid
+        self.msgid = 1000000000
+        self.timestamp = 1660000000
+        self.users = [f"wxid_user{i:05d}" for i in range(2000)]
+        self.rooms = [f"{1000000 + i}@chatroom" for i in range(200)]
+        kinds = self.kinds()
+        self._funcs = [func for func, _ in kinds]
+        self._weights = [weight for _, weight in kinds]
+
+    def _next_msgid(self) -> str:
+        self.msgid += 1
+        return str(self.msgid)
+
+    def _text(self, length: int) -> str:
+        words = ["今天", "天气", "不错", "hello", "world", "nonebot", "ntchat", "哈哈"]
+        parts: List[str] = []
+        size = 0
+        while size < length:
+            word = self.random.choice(words)
+            parts.append(word)
+            size += len(word)
+        return "".join(parts)[:length]
+
+    def _message(self, wx_type: int, in_room: bool = True, **data: Any) -> Frame:
+        self.timestamp += 1
+        return {
+            "timestamp": self.timestamp,
+            "wx_type": wx_type,
+            "from_wxid": self.random.choice(self.users),
+            "room_wxid": self.random.choice(self.rooms) if in_room else "",
+            "to_wxid": self.bot_wxid,
+            "msgid": self._next_msgid(),
+            **data,
+        }
+
+    def _members(self, count: int) -> List[Dict[str, str]]:
+        return [
+            {
+                "avatar": f"http://wx.qlogo.cn/mmhead/{wxid}/132",
+                "invite_by": self.random.choice(self.users),
+                "nickname": f"成员{wxid[-5:]}",
+                "wxid": wxid,
+            }
+            for wxid in self.random.sample(self.users, count)
+        ]
+
+    def text(self) -> Frame:
+        in_room = self.random.random() < 0.8
+        at_user_list = [self.bot_wxid] if in_room and self.random.random() < 0.1 else []
+        return {
+            "type": 11046,
+            "data": self._message(
+                1,
+                in_room,
+                msg=self._text(self.random.choice([4, 16, 64, 256])),
+                at_user_list=at_user_list,
+            ),
+        }
+
+    def quote(self) -> Frame:
+        raw_msg = QUOTE_XML.format(
+            title=self._text(20),
+            svrid=self.random.randrange(10**18),
+            chatusr=self.random.choice(self.users),
+            content=self._text(40),
+        )
+        return {
+            "type": 11061,
+            "data": self._message(49, wx_sub_type=57, raw_msg=raw_msg),
+        }
+
+    def picture(self) -> Frame:
+        path = f"C:\\WeChat Files\\{self.bot_wxid}\\FileStorage\\Image\\{self.msgid}"
+        return {
+            "type": 11047,
+            "data": self._message(
+                3,
+                raw_msg=PLAIN_XML.format(content="img"),
+                image=f"{path}.dat",
+                image_thumb=f"{path}_t.dat",
+            ),
+        }
+
+    def voice(self) -> Frame:
+        return {
+            "type": 11048,
+            "data": self._message(
+                34,
+                raw_msg=PLAIN_XML.format(content="voice"),
+                mp3_file=f"C:\\voice\\{self.msgid}.mp3",
+            ),
+        }
+
+    def card(self) -> Frame:
+        wxid = self.random.choice(self.users)
+        return {
+            "type": 11050,
+            "data": self._message(
+                42, raw_msg=CARD_XML.format(wxid=wxid, nickname=self._text(6))
+            ),
+        }
+
+    def video(self) -> Frame:
+        return {
+            "type": 11051,
+            "data": self._message(
+                43,
+                raw_msg=PLAIN_XML.format(content="video"),
+                video=f"C:\\video\\{self.msgid}.mp4",
+                video_thumb=f"C:\\video\\{self.msgid}.jpg",
+            ),
+        }
+
+    def emoji(self) -> Frame:
+        md5 = "%032x" % self.random.getrandbits(128)
+        wxid = self.random.choice(self.users)
+        return {
+            "type": 11052,
+            "data": self._message(47, raw_msg=EMOJI_XML.format(wxid=wxid, md5=md5)),
+        }
+
+    def location(self) -> Frame:
+        raw_msg = LOCATION_XML.format(
+            x=self.random.uniform(20, 40),
+            y=self.random.uniform(100, 120),
+            label=self._text(12),
+            poiname=self._text(6),
+        )
+        return {"type": 11053, "data": self._message(48, raw_msg=raw_msg)}
+
+    def link(self) -> Frame:
+        raw_msg = APP_XML.format(title=self._text(16), sub_type=5, path=self.msgid)
+        return {
+            "type": 11054,
+            "data": self._message(49, wx_sub_type=5, raw_msg=raw_msg),
+        }
+
+    def file(self) -> Frame:
+        name = f"{self._text(8)}.pdf"
+        return {
+            "type": 11055,
+            "data": self._message(
+                49,
+                wx_sub_type=6,
+                raw_msg=APP_XML.format(title=name, sub_type=6, path=name),
+                file=f"C:\\WeChat Files\\{self.bot_wxid}\\FileStorage\\File\\{name}",
+            ),
+        }
+
+    def miniapp(self) -> Frame:
+        raw_msg = APP_XML.format(title=self._text(16), sub_type=33, path=self.msgid)
+        return {
+            "type": 11056,
+            "data": self._message(49, wx_sub_type=33, raw_msg=raw_msg),
+        }
+
+    def wcpay(self) -> Frame:
+        raw_msg = WCPAY_XML.format(
+            amount=self.random.uniform(0.01, 500),
+            transid=self.random.randrange(10**20),
+            memo=self._text(10),
+        )
+        return {
+            "type": 11057,
+            "data": self._message(49, False, wx_sub_type=2000, raw_msg=raw_msg),
+        }
+
+    def system(self) -> Frame:
+        raw_msg = PLAIN_XML.format(content=self._text(30))
+        return {"type": 11058, "data": self._message(10000, raw_msg=raw_msg)}
+
+    def revoke(self) -> Frame:
+        data = self._message(10002)
+        data["raw_msg"] = REVOKE_XML.format(
+            session=data["room_wxid"],
+            msgid=self.random.randrange(10**9),
+            newmsgid=self.random.randrange(10**18),
+            nickname=self._text(4),
+        )
+        return {"type": 11059, "data": data}
+
+    def other(self) -> Frame:
+        raw_msg = PLAIN_XML.format(content=self._text(20))
+        return {"type": 11060, "data": self._message(9999, raw_msg=raw_msg)}
+
+    def other_app(self) -> Frame:
+        raw_msg = APP_XML.format(title=self._text(16), sub_type=19, path=self.msgid)
+        return {
+            "type": 11061,
+            "data": self._message(49, wx_sub_type=19, raw_msg=raw_msg),
+        }
+
+    def friend_request(self) -> Frame:
+        raw_msg = CARD_XML.format(
+            wxid=self.random.choice(self.users), nickname=self._text(6)
+        )
+        return {"type": 11049, "data": self._message(37, False, raw_msg=raw_msg)}
+
+    def friend_add(self) -> Frame:
+        wxid = self.random.choice(self.users)
+        return {
+            "type": 11102,
+            "data": {
+                "account": wxid,
+                "avatar": f"http://wx.qlogo.cn/mmhead/{wxid}/132",
+                "city": "Shenzhen",
+                "country": "CN",
+                "nickname": self._text(6),
+                "remark": "",
+                "sex": self.random.randint(0, 1),
+                "wxid": wxid,
+            },
+        }
+
+    def invited_room(self) -> Frame:
+        members = self._members(500)
+        return {
+            "type": 11100,
+            "data": {
+                "avatar": "",
+                "is_manager": False,
+                "manager_wxid": members[0]["wxid"],
+                "member_list": members,
+                "nickname": self._text(8),
+                "room_wxid": self.random.choice(self.rooms),
+                "total_member": len(members),
+            },
+        }
+
+    def member_add(self) -> Frame:
+        members = self._members(self.random.choice([1, 1, 1, 100]))
+        return {
+            "type": 11098,
+            "data": {
+                "member_list": members,
+                "nickname": self._text(8),
+                "room_wxid": self.random.choice(self.rooms),
+                "total_member": 300,
+            },
+        }
+
+    def member_del(self) -> Frame:
+        members = [
+            {"nickname": m["nickname"], "wxid": m["wxid"]} for m in self._members(1)
+        ]
+        return {
+            "type": 11099,
+            "data": {
+                "member_list": members,
+                "nickname": self._text(8),
+                "room_wxid": self.random.choice(self.rooms),
+                "total_member": 299,
+            },
+        }
+
+    def kinds(self) -> List[Tuple[Callable[[], Frame], float]]:
+        """各类事件的生成函数与权重"""
+        return [
+            (self.text, 60),
+            (self.quote, 6),
+            (self.picture, 6),
+            (self.voice, 2),
+            (self.card, 1),
+            (self.video, 2),
+            (self.emoji, 4),
+            (self.location, 1),
+            (self.link, 2),
+            (self.file, 1),
+            (self.miniapp, 1),
+            (self.wcpay, 1),
+            (self.system, 3),
+            (self.revoke, 2),
+            (self.other, 1),
+            (self.other_app, 1),
+            (self.friend_request, 0.5),
+            (self.friend_add, 0.5),
+            (self.invited_room, 0.1),
+            (self.member_add, 2),
+            (self.member_del, 1),
+        ]
+
+    def frame(self) -> Frame:
+        """按权重随机生成一条上报数据"""
+        return self.random.choices(self._funcs, self._weights)[0]()
+
+    def generate(self, count: int) -> List[Frame]:
+        """按权重生成count条上报数据，每种事件至少一条"""
+        frames = [func() for func in self._funcs]
+        while len(frames) < count:
+            frames.append(self.frame())
+        self.random.shuffle(frames)
+        return frames
+
+    def text_flood(self, count: int, room_wxid: str = "") -> List[Frame]:
+        """同一群内的大量短文本消息"""
+        room_wxid = room_wxid or self.rooms[0]
+        frames = [self.text() for _ in range(count)]
+        for frame in frames:
+            frame["data"]["room_wxid"] = room_wxid
+            frame["data"]["msg"] = self._text(8)
+        return frames
+
+    def member_list(self, count: int = 500) -> Frame:
+        """获取群成员列表的api回复，count超过用户池大小时生成额外的成员"""
+        members = self._members(min(count, len(self.users)))
+        for i in range(len(members), count):
+            wxid = f"wxid_member{i:07d}"
+            members.append(
+                {
+                    "avatar": f"http://wx.qlogo.cn/mmhead/{wxid}/132",
+                    "invite_by": self.random.choice(self.users),
+                    "nickname": f"成员{wxid[-5:]}",
+                    "wxid": wxid,
+                }
+            )
+        return {
+            "echo": str(self.random.randrange(1 << 31)),
+            "status": "ok",
+            "data": {
+                "room_wxid": self.random.choice(self.rooms),
+                "member_list": members,
+            },
+        }
+
+    def media(self, size: int = 256 * 1024) -> Frame:
+        """以base64上报的媒体数据"""
+        raw = self.random.getrandbits(size * 8).to_bytes(size, "little")
+        return {
+            "type": 11047,
+            "data": self._message(
+                3,
+                raw_msg=PLAIN_XML.format(content="img"),
+                image=base64.b64encode(raw).decode(),
+            ),
+        }
+
+
+def generate_corpus(count: int, seed: int = 0, bot_wxid: str = BOT_WXID) -> List[Frame]:
+    """生成混合语料，见 `CorpusGenerator.generate`"""
+    return CorpusGenerator(seed, bot_wxid).generate(count)
@@ -0,0 +1,252 @@
+"""模拟ntchat客户端的压测工具
+以多个bot身份连接适配器的反向ws，按目标速率上报合成事件，并在注入的延迟后回复api调用
+
+配合 `bench_bot.py` 使用时，可以得到端到端的处理延迟、api往返耗时与内存增长：
+    python benchmarks/bench_bot.py
+    python benchmarks/fake_ntchat.py --bots 4 --rate 200 --duration 60 --latency 20
+
+`--format msgpack` 时协商二进制帧，可与json比较带宽与处理延迟
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlsplit
+
+import httpx
+import websockets
+from nonebot.adapters.ntchat.codec import get_binary_codec
+
+from corpus import CorpusGenerator, Frame
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    values = sorted(values)
+    if not values:
+        return None
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def summarize(values: List[float]) -> Dict[str, Any]:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 0.5),
+        "p90": percentile(values, 0.9),
+        "p99": percentile(values, 0.99),
+        "max": max(values) if values else None,
+    }
+
+
+class FakePeer:
+    """
+    单个模拟的ntchat客户端
+    """
+
+    def __init__(
+        self, self_id: str, args: argparse.Namespace, generator: CorpusGenerator
+    ) -> None:
+        self.self_id = self_id
+        self.args = args
+        self.generator = generator
+        self.sent = 0
+        """已上报事件数"""
+        self.api_calls = 0
+        """收到的api调用数"""
+        self.pending: Dict[str, float] = {}
+        """等待回复的文本消息，msgid -> 上报时间"""
+        self.handler_latency: List[float] = []
+        """文本消息从上报到收到回复的耗时"""
+        self.behind = 0.0
+        """上报落后于目标速率的最大时间"""
+        self.sent_bytes = 0
+        """上报的字节数"""
+        self.codec = get_binary_codec(args.format) if args.format != "json" else None
+
+    def encode(self, data: Dict[str, Any]) -> Any:
+        if self.codec is None:
+            return json.dumps(data, ensure_ascii=False)
+        return self.codec.dumps(data)
+
+    def decode(self, message: Any) -> Dict[str, Any]:
+        if isinstance(message, bytes) and self.codec is not None:
+            return self.codec.loads(message)
+        return json.loads(message)
+
+    def next_frame(self) -> Frame:
+        if self.args.mix == "text":
+            return self.generator.text()
+        return self.generator.frame()
+
+    async def run(self, started: float) -> None:
+        headers = {"X-Self-ID": self.self_id}
+        if self.args.access_token:
+            headers["access_token"] = self.args.access_token
+        if self.codec is not None:
+            headers["X-Frame-Format"] = self.codec.name
+        async with websockets.connect(
+            self.args.url, extra_headers=headers, max_size=None
+        ) as ws:
+            reader = asyncio.create_task(self._read(ws))
+            try:
+                await self._write(ws, started)
+                # 等待最后一批回复
+                await asyncio.sleep(self.args.drain)
+            finally:
+                reader.cancel()
+
+    async def _write(self, ws: Any, started: float) -> None:
+        loop = asyncio.get_running_loop()
+        interval = 1 / self.args.rate
+        deadline = started + self.args.duration
+        due = started
+        while due < deadline:
+            now = loop.time()
+            if due > now:
+                await asyncio.sleep(due - now)
+            else:
+                self.behind = max(self.behind, now - due)
+            frame = self.next_frame()
+            if frame["type"] == 11046:
+                self.pending[frame["data"]["msgid"]] = time.perf_counter()
+            message = self.encode(frame)
+            await ws.send(message)
+            self.sent += 1
+            self.sent_bytes += len(
+                message.encode() if isinstance(message, str) else message
+            )
+            due += interval
+
+    async def _read(self, ws: Any) -> None:
+        async for message in ws:
+            data = self.decode(message)
+            if "action" not in data:
+                continue
+            self.api_calls += 1
+            params = data.get("params") or {}
+            content = params.get("content")
+            if isinstance(content, str) and content.startswith("echo "):
+                sent_at = self.pending.pop(content[5:], None)
+                if sent_at is not None:
+                    self.handler_latency.append(time.perf_counter() - sent_at)
+            asyncio.create_task(self._reply(ws, data))
+
+    async def _reply(self, ws: Any, data: Dict[str, Any]) -> None:
+        delay = self.args.latency + random.uniform(0, self.args.jitter)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+        result: Any = None
+        if data["action"].startswith("get_"):
+            result = []
+        response = {"echo": data.get("echo"), "status": "ok", "data": result}
+        try:
+            await ws.send(self.encode(response))
+        except websockets.ConnectionClosed:
+            pass
+
+
+async def fetch_stats(client: httpx.AsyncClient, path: str) -> Optional[Dict]:
+    try:
+        response = await client.request(
+            "POST" if path.endswith("reset") else "GET", path
+        )
+        return response.json()
+    except (httpx.HTTPError, ValueError):
+        return None
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    url = urlsplit(args.url)
+    scheme = "https" if url.scheme == "wss" else "http"
+    stats_url = args.stats_url or f"{scheme}://{url.netloc}"
+    # 相同种子的msgid固定，以本次运行的时间作为msgid前缀，避免再次运行时被适配器去重丢弃
+    msgid_base = int(time.time()) * 10**9
+    peers = []
+    for i in range(args.bots):
+        generator = CorpusGenerator(args.seed + i, f"wxid_bench_{i:03d}")
+        generator.msgid = msgid_base
+        peers.append(FakePeer(f"wxid_bench_{i:03d}", args, generator))
+    async with httpx.AsyncClient(base_url=stats_url, timeout=10) as client:
+        before = await fetch_stats(client, "/bench/reset")
+        loop = asyncio.get_running_loop()
+        started = loop.time() + 0.5
+        await asyncio.gather(*(peer.run(started) for peer in peers))
+        elapsed = loop.time() - started - args.drain
+        after = await fetch_stats(client, "/bench/stats")
+
+    sent = sum(peer.sent for peer in peers)
+    latency = [v for peer in peers for v in peer.handler_latency]
+    report: Dict[str, Any] = {
+        "bots": args.bots,
+        "target_eps": args.rate * args.bots,
+        "sent": sent,
+        "sent_eps": sent / elapsed,
+        "format": args.format,
+        "bytes_per_event": sum(peer.sent_bytes for peer in peers) / max(sent, 1),
+        "max_behind": max(peer.behind for peer in peers),
+        "api_calls": sum(peer.api_calls for peer in peers),
+        "unanswered": sum(len(peer.pending) for peer in peers),
+        "handler_latency": summarize(latency),
+    }
+    if after is not None:
+        report["bot"] = after
+        if before is not None and before.get("memory") and after.get("memory"):
+            report["memory_growth"] = after["memory"] - before["memory"]
+    return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    def ms(value: Optional[float]) -> str:
+        return "-" if value is None else f"{value * 1000:.1f}ms"
+
+    print(
+        f"bots {report['bots']}  target {report['target_eps']:.0f} ev/s  "
+        f"sustained {report['sent_eps']:.0f} ev/s  "
+        f"max behind {ms(report['max_behind'])}  "
+        f"{report['format']} {report['bytes_per_event']:.0f} B/ev"
+    )
+    latency = report["handler_latency"]
+    print(
+        f"handler latency  n={latency['count']}  p50 {ms(latency['p50'])}  "
+        f"p90 {ms(latency['p90'])}  p99 {ms(latency['p99'])}  "
+        f"unanswered {report['unanswered']}"
+    )
+    bot = report.get("bot")
+    if bot:
+        rtt = bot["api_rtt"]
+        print(
+            f"api round trip   n={rtt['count']}  p50 {ms(rtt['p50'])}  "
+            f"p90 {ms(rtt['p90'])}  p99 {ms(rtt['p99'])}  failed {bot['failed']}"
+        )
+    if "memory_growth" in report:
+        print(f"memory growth    {report['memory_growth'] / 1024 / 1024:.1f}MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default="ws://127.0.0.1:8080/ntchat/ws")
+    parser.add_argument("--stats-url", help="bench_bot的地址，默认与--url相同")
+    parser.add_argument("--access-token")
+    parser.add_argument("--bots", type=int, default=1, help="模拟的bot数量")
+    parser.add_argument("--rate", type=float, default=100, help="每个bot每秒上报数")
+    parser.add_argument("--duration", type=float, default=30, help="上报时长，秒")
+    parser.add_argument("--drain", type=float, default=2, help="上报结束后等待回复的时间，秒")
+    parser.add_argument(
+        "--mix", choices=("mixed", "text"), default="mixed", help="事件组成"
+    )
+    parser.add_argument(
+        "--format", choices=("json", "msgpack", "cbor"), default="json", help="帧格式"
+    )
+    parser.add_argument("--latency", type=float, default=0, help="api回复延迟，毫秒")
+    parser.add_argument("--jitter", type=float, default=0, help="api回复随机附加延迟上限，毫秒")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="报告保存路径")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
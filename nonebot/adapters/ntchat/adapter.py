@@ -4,11 +4,12 @@
 import asyncio
 import contextlib
 import inspect
-import json
-from typing import Any, Dict, List, Optional, cast
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
 from nonebot.drivers.fastapi import Driver
-from nonebot.exception import ApiNotAvailable, NetworkError, WebSocketClosed
+from nonebot.exception import WebSocketClosed
 from nonebot.internal.driver import (
     URL,
     ForwardDriver,
@@ -19,35 +20,126 @@ from nonebot.internal.driver import (
     WebSocketServerSetup,
 )
 from nonebot.typing import overrides
-from nonebot.utils import DataclassEncoder, escape_tag
+from nonebot.utils import escape_tag
 
 from nonebot.adapters import Adapter as BaseAdapter
 
 from . import event
 from .bot import Bot
-from .collator import EventModels
+from .client import HttpApiClient
+from .codec import (
+    BinaryCodec,
+    JsonCodec,
+    get_binary_codec,
+    get_codec,
+    is_json,
+    sniff_binary_format,
+)
+from .collator import EventBuilder, EventModels
 from .config import Config
+from .dedup import Deduplicator
+from .dispatcher import EventDispatcher
 from .event import Event
+from .exception import ActionFailed, ApiNotAvailable, ApiTimeout, NetworkError
+from .listing import peek_echo
+from .media import media_store
+from .metrics import Metrics
+from .offload import Offloader, codec_dumps, codec_loads, payload_size
+from .recorder import Recorder
+from .scheduler import (
+    PRIORITY_NAMES,
+    PRIORITY_NORMAL,
+    SendScheduler,
+    priority_level,
+)
+from .sharding import WORKER_SECRET_HEADER, WorkerInfo
 from .store import ResultStore
-from .utils import handle_api_result, log
-
-event_models = EventModels[Event]()
-"""事件模型创建器"""
+from .tracing import JsonlSink, Tracer, mark
+from .utils import get_api_options, handle_api_result, log
 
 
 class Adapter(BaseAdapter):
 
-    _result_store = ResultStore()
-    """api回调存储"""
     ntchat_config: Config
     """ntchat配置"""
 
     def __init__(self, driver: Driver, **kwargs) -> None:
         super().__init__(driver, **kwargs)
         self.ntchat_config: Config = Config(**self.config.dict())
+        self.codec: JsonCodec = get_codec(self.ntchat_config.ntchat_json_codec)
+        """json编解码器"""
+        self.offloader = Offloader(
+            self.ntchat_config.ntchat_offload_threshold,
+            self.ntchat_config.ntchat_offload_executor,
+            self.ntchat_config.ntchat_offload_workers,
+        )
+        """执行器卸载"""
+        self.event_builder: EventBuilder[Event] = EventBuilder(
+            self.ntchat_config.ntchat_trusted_ingest,
+            self.ntchat_config.ntchat_trusted_sample_rate,
+        )
+        """事件构造器"""
+        self.event_models: EventModels[Event] = EventModels()
+        """事件模型创建器"""
+        self.deduplicator = Deduplicator(
+            self.ntchat_config.ntchat_dedup_capacity,
+            self.ntchat_config.ntchat_dedup_window,
+        )
+        """消息去重"""
         self.connections: Dict[str, WebSocket] = {}
+        self.frame_codecs: Dict[str, BinaryCodec] = {}
+        """反向ws连接协商的二进制帧编解码器，使用json的连接不在其中"""
+        self.binary_codecs: Dict[str, BinaryCodec] = {}
+        """可用的二进制帧编解码器，收到的二进制帧按首字节选择"""
+        for name in self.ntchat_config.ntchat_binary_formats:
+            codec = get_binary_codec(name)
+            if codec is not None:
+                self.binary_codecs[codec.name] = codec
+        self.result_stores: Dict[str, ResultStore] = {}
+        """bot的api回调存储"""
+        self.send_schedulers: Dict[str, SendScheduler] = {}
+        """bot的发送调度器"""
+        self.http_client: Optional[HttpApiClient] = None
+        """http api客户端"""
+        if self.ntchat_config.ntchat_http_api_root:
+            self.http_client = HttpApiClient(
+                self.ntchat_config.ntchat_http_api_root,
+                self.ntchat_config.ntchat_http_max_connections,
+                self.ntchat_config.ntchat_http_keepalive_expiry,
+            )
         self.tasks: List["asyncio.Task"] = []
+        self.dispatchers: Dict[str, EventDispatcher] = {}
+        """bot事件分发器"""
+        self.worker: Optional[WorkerInfo] = WorkerInfo.from_env()
+        """由supervisor启动时的分片信息"""
+        self.worker_clients: Dict[int, HttpApiClient] = {}
+        """到其他worker的http客户端"""
+        self.recorder: Optional[Recorder] = None
+        """上报记录"""
+        if self.ntchat_config.ntchat_record_dir is not None:
+            self.recorder = Recorder(
+                self.ntchat_config.ntchat_record_dir,
+                self.ntchat_config.ntchat_record_max_bytes,
+                self.ntchat_config.ntchat_record_max_files,
+                self.ntchat_config.ntchat_record_compress,
+            )
+        self.metrics = Metrics(self.ntchat_config.ntchat_metrics)
+        """运行指标"""
+        sample_rate = self.ntchat_config.ntchat_trace_sample_rate
+        self.tracer = Tracer(
+            sample_rate,
+            JsonlSink(self.ntchat_config.ntchat_trace_file) if sample_rate > 0 else None,
+        )
+        """事件阶段追踪"""
+        media_store.configure(
+            self.ntchat_config.ntchat_media_dir,
+            self.ntchat_config.ntchat_media_threshold,
+            self.ntchat_config.ntchat_media_max_age,
+            self.ntchat_config.ntchat_media_cache_size,
+            self.ntchat_config.ntchat_media_evict_grace,
+        )
         self._search_events()
+        self._setup_metrics()
         self._setup()
 
     def _search_events(self) -> None:
@@ -56,7 +148,120 @@ class Adapter(BaseAdapter):
             model = getattr(event, model_name)
             if not inspect.isclass(model) or not issubclass(model, Event):
                 continue
-            event_models.add_event_model(model)
+            self.event_models.add_event_model(model)
+
+    def _setup_metrics(self) -> None:
+        """注册导出时取值的指标"""
+        self.metrics.gauge(
+            "ntchat_dispatch_queue_depth",
+            "Events waiting in dispatch queues, by bot",
+            ("bot",),
+            lambda: [((k,), d.qsize) for k, d in self.dispatchers.items()],
+        )
+        self.metrics.gauge(
+            "ntchat_dispatch_shard_depth",
+            "Events waiting in each dispatch shard, by bot and shard",
+            ("bot", "shard"),
+            lambda: self._shard_values(lambda d: d.occupancy),
+        )
+        self.metrics.gauge(
+            "ntchat_dispatch_shard_lag_seconds",
+            "Queue wait of the last event started by each shard, by bot and shard",
+            ("bot", "shard"),
+            lambda: self._shard_values(lambda d: d.lags),
+        )
+        self.metrics.gauge(
+            "ntchat_dispatch_shard_max_lag_seconds",
+            "Longest queue wait seen by each shard, by bot and shard",
+            ("bot", "shard"),
+            lambda: self._shard_values(lambda d: d.max_lags),
+        )
+        self.metrics.gauge(
+            "ntchat_api_in_flight",
+            "Websocket api calls waiting for a result, by bot",
+            ("bot",),
+            lambda: [((k,), s.in_flight) for k, s in self.result_stores.items()],
+        )
+        self.metrics.gauge(
+            "ntchat_api_oldest_in_flight_seconds",
+            "Wait of the oldest websocket api call still waiting for a result, by bot",
+            ("bot",),
+            lambda: [((k,), s.oldest_age) for k, s in self.result_stores.items()],
+        )
+        self.metrics.func_counter(
+            "ntchat_api_late_results_total",
+            "Api results that arrived after the call timed out or was dropped, by bot",
+            ("bot",),
+            lambda: [((k,), s.late) for k, s in self.result_stores.items()],
+        )
+        self.metrics.func_counter(
+            "ntchat_api_unknown_results_total",
+            "Api results whose echo matches no call, by bot",
+            ("bot",),
+            lambda: [((k,), s.unknown) for k, s in self.result_stores.items()],
+        )
+        self.metrics.gauge(
+            "ntchat_send_wait_avg_seconds",
+            "Average wait of sends in the rate limiting scheduler, by bot",
+            ("bot",),
+            lambda: [((k,), s.wait_avg) for k, s in self.send_schedulers.items()],
+        )
+        self.metrics.gauge(
+            "ntchat_send_wait_max_seconds",
+            "Longest wait of a send in the rate limiting scheduler, by bot",
+            ("bot",),
+            lambda: [((k,), s.wait_max) for k, s in self.send_schedulers.items()],
+        )
+        self.metrics.gauge(
+            "ntchat_directory_bytes",
+            "Estimated memory used by the cached contact directory, by bot",
+            ("bot",),
+            lambda: [
+                ((k,), b.directory.nbytes)
+                for k, b in self.bots.items()
+                if isinstance(b, Bot)
+            ],
+        )
+        self.metrics.func_counter(
+            "ntchat_media_hits_total",
+            "Bytes media sends that reused a file already in the media directory",
+            (),
+            lambda: [((), media_store.hits)],
+        )
+        self.metrics.func_counter(
+            "ntchat_media_misses_total",
+            "Bytes media sends that wrote a new file to the media directory",
+            (),
+            lambda: [((), media_store.misses)],
+        )
+        self.metrics.func_counter(
+            "ntchat_media_bytes_saved_total",
+            "Bytes not written because the media file already existed",
+            (),
+            lambda: [((), media_store.bytes_saved)],
+        )
+        self.metrics.gauge(
+            "ntchat_media_hit_rate",
+            "Share of bytes media sends that reused an existing file",
+            (),
+            lambda: [((), media_store.hit_rate)],
+        )
+        self.metrics.gauge(
+            "ntchat_websocket_connections",
+            "Open websocket connections, by bot",
+            ("bot",),
+            lambda: [((k,), 1) for k in self.connections],
+        )
+
+    def _shard_values(
+        self, func: Callable[[EventDispatcher], List[float]]
+    ) -> List[Tuple[Tuple[str, str], float]]:
+        """按(bot, 分片)展开各分发器的分片指标"""
+        return [
+            ((self_id, str(index)), value)
+            for self_id, dispatcher in self.dispatchers.items()
+            for index, value in enumerate(func(dispatcher))
+        ]
 
     def _setup(self) -> None:
         http_setup = HTTPServerSetup(
@@ -85,6 +290,206 @@ class Adapter(BaseAdapter):
         )
         self.setup_websocket_server(ws_setup)
 
+        if self.worker is not None:
+            http_setup = HTTPServerSetup(
+                URL("/ntchat/worker/call"),
+                "POST",
+                self.get_name(),
+                self._handle_worker_call,
+            )
+            self.setup_http_server(http_setup)
+            http_setup = HTTPServerSetup(
+                URL("/ntchat/worker/load"),
+                "GET",
+                self.get_name(),
+                self._handle_worker_load,
+            )
+            self.setup_http_server(http_setup)
+
+        if self.ntchat_config.ntchat_metrics:
+            http_setup = HTTPServerSetup(
+                URL("/ntchat/metrics"), "GET", self.get_name(), self._handle_metrics
+            )
+            self.setup_http_server(http_setup)
+
+        self.driver.on_shutdown(self._stop_dispatchers)
+        self.driver.on_shutdown(self.offloader.shutdown)
+        self.driver.on_shutdown(self.tracer.close)
+        if self.recorder is not None:
+            self.driver.on_startup(self.recorder.start)
+            self.driver.on_shutdown(self.recorder.close)
+        if self.http_client is not None:
+            self.driver.on_shutdown(self.http_client.close)
+        self.driver.on_shutdown(self._close_worker_clients)
+
+    def _get_dispatcher(self, bot: Bot) -> EventDispatcher:
+        """获取bot对应的事件分发器，不存在时创建"""
+        dispatcher = self.dispatchers.get(bot.self_id)
+        if dispatcher is None:
+            dispatcher = EventDispatcher(
+                bot,
+                self.ntchat_config.ntchat_dispatch_workers,
+                self.ntchat_config.ntchat_dispatch_queue_size,
+                self.ntchat_config.ntchat_dispatch_drain_timeout,
+            )
+            self.dispatchers[bot.self_id] = dispatcher
+            self.tasks.extend(dispatcher.start())
+        return dispatcher
+
+    async def _remove_dispatcher(self, self_id: str) -> None:
+        """停止并移除bot对应的事件分发器"""
+        dispatcher = self.dispatchers.pop(self_id, None)
+        if dispatcher is None:
+            return
+        for task in dispatcher.tasks:
+            with contextlib.suppress(ValueError):
+                self.tasks.remove(task)
+        await dispatcher.stop()
+
+    async def _stop_dispatchers(self) -> None:
+        for self_id in list(self.dispatchers):
+            await self._remove_dispatcher(self_id)
+        for self_id in list(self.send_schedulers):
+            await self.send_schedulers.pop(self_id).stop()
+
+    def _get_send_scheduler(self, bot: Bot) -> Optional[SendScheduler]:
+        """获取bot对应的发送调度器，未配置限速时返回None"""
+        config = self.ntchat_config
+        if config.ntchat_send_rate <= 0 and config.ntchat_send_rate_per_user <= 0:
+            return None
+        scheduler = self.send_schedulers.get(bot.self_id)
+        if scheduler is None:
+            scheduler = SendScheduler(
+                config.ntchat_send_rate,
+                config.ntchat_send_burst,
+                config.ntchat_send_rate_per_user,
+                config.ntchat_send_burst_per_user,
+            )
+            self.send_schedulers[bot.self_id] = scheduler
+        return scheduler
+
+    def _get_worker_client(self, index: int) -> HttpApiClient:
+        """获取到指定worker的http客户端，不存在时创建"""
+        assert self.worker is not None
+        client = self.worker_clients.get(index)
+        if client is None:
+            client = HttpApiClient(
+                f"{self.worker.urls[index]}/ntchat/worker/",
+                self.ntchat_config.ntchat_http_max_connections,
+                self.ntchat_config.ntchat_http_keepalive_expiry,
+                headers={WORKER_SECRET_HEADER: self.worker.secret},
+            )
+            self.worker_clients[index] = client
+        return client
+
+    async def _close_worker_clients(self) -> None:
+        for client in self.worker_clients.values():
+            await client.close()
+        self.worker_clients.clear()
+
+    async def call_bot_api(self, self_id: str, api: str, **data: Any) -> Any:
+        """调用指定bot的api，bot连接在其他worker进程时转发到该worker
+
+        参数:
+            self_id: bot的wxid
+            api: api名称
+            data: api参数
+
+        返回:
+            api调用返回数据
+
+        异常:
+            ApiNotAvailable: bot未连接
+            NetworkError: 网络错误
+            ActionFailed: API 调用失败
+        """
+        bot = self.bots.get(self_id)
+        if bot is not None:
+            return await bot.call_api(api, **data)
+        if self.worker is None:
+            raise ApiNotAvailable
+        index = self.worker.owner(self_id)
+        if index == self.worker.worker_id:
+            raise ApiNotAvailable
+
+        timeout: float = data.pop("_timeout", self.config.api_timeout)
+        body = {"self_id": self_id, "api": api, "data": data, "timeout": timeout}
+        content = await self._dumps(body, payload_size(data))
+        try:
+            response = await self._get_worker_client(index).post(
+                "call", content, timeout
+            )
+        except NetworkError:
+            raise
+        except Exception as e:
+            raise NetworkError("Worker request failed") from e
+        if response.status_code == 404:
+            raise ApiNotAvailable
+        if not 200 <= response.status_code < 300:
+            raise NetworkError(
+                f"Worker request received unexpected "
+                f"status code: {response.status_code}"
+            )
+        return handle_api_result(await self._loads(response.content))
+
+    async def _loads(self, data: Union[str, bytes]) -> Any:
+        """解码json，数据过大时在执行器中运行"""
+        size = len(data)
+        if not self.offloader.should_offload(size):
+            return self.codec.loads(data)
+        return await self.offloader.run(size, codec_loads, self.codec.name, data)
+
+    async def _dumps(self, obj: Any, size: int) -> str:
+        """编码json，数据过大时在执行器中运行"""
+        if not self.offloader.should_offload(size):
+            return self.codec.dumps(obj)
+        return await self.offloader.run(size, codec_dumps, self.codec.name, obj)
+
+    def _inbound_codec(
+        self, data: Union[str, bytes], codec: Optional[BinaryCodec]
+    ) -> Optional[BinaryCodec]:
+        """按首字节识别收到的帧格式，json帧返回None，无法识别时使用协商的格式"""
+        if is_json(data):
+            return None
+        name = sniff_binary_format(cast(bytes, data))
+        return self.binary_codecs.get(name, codec) if name else codec
+
+    async def _loads_frame(
+        self, data: Union[str, bytes], codec: Optional[BinaryCodec]
+    ) -> Any:
+        """按 `_inbound_codec` 识别的格式解码ws帧"""
+        if codec is None:
+            return await self._loads(data)
+        size = len(data)
+        if not self.offloader.should_offload(size):
+            return codec.loads(cast(bytes, data))
+        return await self.offloader.run(size, codec_loads, codec.name, data)
+
+    async def _dumps_frame(
+        self, obj: Any, size: int, codec: Optional[BinaryCodec]
+    ) -> Union[str, bytes]:
+        """编码ws帧，未协商二进制格式时编码为json"""
+        if codec is None:
+            return await self._dumps(obj, size)
+        if not self.offloader.should_offload(size):
+            return codec.dumps(obj)
+        return await self.offloader.run(size, codec_dumps, codec.name, obj)
+
+    def _negotiate_codec(self, request: Request) -> Optional[BinaryCodec]:
+        """按 `X-Frame-Format` 请求头选择二进制帧格式，不可用时回退到json"""
+        requested = request.headers.get("X-Frame-Format")
+        if not requested:
+            return None
+        for name in requested.split(","):
+            name = name.strip().lower()
+            if name == "json":
+                return None
+            codec = self.binary_codecs.get(name)
+            if codec is not None:
+                return codec
+        log("WARNING", f"Frame format {escape_tag(requested)} unavailable, using json")
+        return None
+
     @classmethod
     @overrides(BaseAdapter)
     def get_name(cls) -> str:
@@ -93,45 +498,77 @@ class Adapter(BaseAdapter):
 
     @overrides(BaseAdapter)
     async def _call_api(self, bot: Bot, api: str, **data: Any) -> Any:
-        websocket = self.connections.get(bot.self_id, None)
         timeout: float = data.get("_timeout", self.config.api_timeout)
+        options = get_api_options()
+        priority: int = options.get("priority", PRIORITY_NORMAL)
+        sent: Optional["asyncio.Future[None]"] = options.get("sent")
+        raw: bool = options.get("raw", False)
         log("DEBUG", f"Calling API <y>{api}</y>")
 
-        if websocket:
-            seq = self._result_store.get_seq()
-            json_data = json.dumps(
-                {"action": api, "params": data, "echo": str(seq)},
-                cls=DataclassEncoder,
-                ensure_ascii=False,
-            )
-            await websocket.send(json_data)
-            return handle_api_result(
-                await self._result_store.fetch(bot.self_id, seq, timeout)
-            )
+        if api.startswith("send_"):
+            scheduler = self._get_send_scheduler(bot)
+            if scheduler is not None:
+                to_wxid = data.get("to_wxid") or data.get("room_wxid", "")
+                wait = await scheduler.acquire(to_wxid, priority)
+                self.metrics.send_wait_seconds.observe(
+                    (bot.self_id, PRIORITY_NAMES[priority_level(priority)]), wait
+                )
+
+        started = time.perf_counter()
+        try:
+            return await self._request(bot, api, data, timeout, sent, raw)
+        except ApiTimeout:
+            self.metrics.api_timeouts.inc((api,))
+            raise
+        except Exception:
+            self.metrics.api_errors.inc((api,))
+            raise
+        finally:
+            self.metrics.api_seconds.observe((api,), time.perf_counter() - started)
+
+    async def _request(
+        self,
+        bot: Bot,
+        api: str,
+        data: Dict[str, Any],
+        timeout: float,
+        sent: Optional["asyncio.Future[None]"],
+        raw: bool = False,
+    ) -> Any:
+        """通过反向ws或http发送api请求，raw为True时返回未解码的回调数据"""
+        websocket = self.connections.get(bot.self_id, None)
+        result_store = self.result_stores.get(bot.self_id, None)
+        if websocket and result_store:
+            seq = result_store.get_seq()
+            future = result_store.register(seq, raw)
+            try:
+                frame = await self._dumps_frame(
+                    {"action": api, "params": data, "echo": str(seq)},
+                    payload_size(data),
+                    self.frame_codecs.get(bot.self_id),
+                )
+                await websocket.send(frame)
+            except BaseException:
+                result_store.discard(seq)
+                raise
+            if sent is not None and not sent.done():
+                sent.set_result(None)
+            result = await result_store.wait(seq, future, timeout)
+            return result if raw else handle_api_result(result)
         elif isinstance(self.driver, ForwardDriver):
-            api_root = self.ntchat_config.ntchat_http_api_root
-            if not api_root:
+            if self.http_client is None:
                 raise ApiNotAvailable
-            elif not api_root.endswith("/"):
-                api_root += "/"
-
-            headers = {"Content-Type": "application/json"}
-
-            request = Request(
-                "POST",
-                api_root + api,
-                headers=headers,
-                timeout=timeout,
-                content=json.dumps(data, cls=DataclassEncoder),
-            )
 
             try:
-                response = await self.driver.request(request)
+                content = await self._dumps(data, payload_size(data))
+                response = await self.http_client.post(api, content, timeout)
 
                 if 200 <= response.status_code < 300:
                     if not response.content:
                         raise ValueError("Empty response")
-                    result = json.loads(response.content)
+                    if raw:
+                        return response.content
+                    result = await self._loads(response.content)
                     return handle_api_result(result)
                 raise NetworkError(
                     f"HTTP request received unexpected "
@@ -159,8 +596,7 @@ class Adapter(BaseAdapter):
 
         data = request.content
         if data is not None:
-            json_data = json.loads(data)
-            event = self.json_to_event(json_data)
+            event = await self._decode_event(data, self_id)
             if event:
                 bot = self.bots.get(self_id, None)
                 if not bot:
@@ -168,7 +604,13 @@ class Adapter(BaseAdapter):
                     self.bot_connect(bot)
                     log("INFO", f"<y>Bot {escape_tag(self_id)}</y> connected")
                 bot = cast(Bot, bot)
-                asyncio.create_task(bot.handle_event(event))
+                if not self._get_dispatcher(bot).put_nowait(event):
+                    # 未处理的消息需要接受ntchat重发
+                    msgid = getattr(event, "msgid", None)
+                    if msgid:
+                        self.deduplicator.forget(self_id, msgid)
+                    log("WARNING", f"Event queue for Bot {escape_tag(self_id)} is full")
+                    return Response(503, content="Event queue is full")
         return Response(204)
 
     async def _handle_ws(self, websocket: WebSocket) -> None:
@@ -191,20 +633,39 @@ class Adapter(BaseAdapter):
             await websocket.close(1008, content)
             return
 
+        codec = self._negotiate_codec(websocket.request)
         await websocket.accept()
         bot = Bot(self, self_id)
         self.connections[self_id] = websocket
+        if codec is not None:
+            self.frame_codecs[self_id] = codec
+        result_store = ResultStore()
+        self.result_stores[self_id] = result_store
         self.bot_connect(bot)
+        self.metrics.connects.inc((self_id,))
+        dispatcher = self._get_dispatcher(bot)
 
-        log("INFO", f"<y>Bot {escape_tag(self_id)}</y> connected")
+        log(
+            "INFO",
+            f"<y>Bot {escape_tag(self_id)}</y> connected"
+            + (f" using {codec.name} frames" if codec else ""),
+        )
 
         try:
             while True:
                 data = await websocket.receive()
-                json_data = json.loads(data)
-                event = self.json_to_event(json_data, self_id)
+                # 在收到数据后计时，不把等待下一帧的空闲时间计入追踪
+                received = time.perf_counter()
+                if result_store.streaming and is_json(data):
+                    seq = peek_echo(data)
+                    if seq is not None and result_store.wants_raw(seq):
+                        # 大列表回调不在此解码，由调用方逐项解析
+                        result_store.add_raw(seq, data)
+                        continue
+                event = await self._decode_event(data, self_id, received, codec)
                 if event:
-                    asyncio.create_task(bot.handle_event(event))
+                    dispatcher.put_intake(event)
+                    await self._wait_intake(dispatcher, result_store)
         except WebSocketClosed:
             log("WARNING", f"WebSocket for Bot {escape_tag(self_id)} closed by peer")
         except Exception as e:
@@ -217,7 +678,127 @@ class Adapter(BaseAdapter):
             with contextlib.suppress(Exception):
                 await websocket.close()
             self.connections.pop(self_id, None)
+            self.frame_codecs.pop(self_id, None)
+            self.result_stores.pop(self_id, None)
+            result_store.fail_all("WebSocket closed")
             self.bot_disconnect(bot)
+            await self._remove_dispatcher(self_id)
+            scheduler = self.send_schedulers.pop(self_id, None)
+            if scheduler is not None:
+                await scheduler.stop()
+
+    async def _wait_intake(
+        self, dispatcher: EventDispatcher, result_store: ResultStore
+    ) -> None:
+        """接收缓冲已满时暂停读取，直到缓冲腾出空间
+
+        有api调用等待回调时不暂停，回调不会排在积压的事件之后
+        """
+        while dispatcher.intake_full and not result_store.in_flight:
+            waiters = [
+                asyncio.ensure_future(dispatcher.wait_intake()),
+                asyncio.ensure_future(result_store.wait_call()),
+            ]
+            try:
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                for waiter in waiters:
+                    waiter.cancel()
+
+    async def _handle_metrics(self, request: Request) -> Response:
+        response = self._check_access_token(request)
+        if response is not None:
+            return response
+        return Response(
+            200,
+            headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+            content=self.metrics.render(),
+        )
+
+    async def _handle_worker_call(self, request: Request) -> Response:
+        response = self._check_worker_secret(request)
+        if response is not None:
+            return response
+        if not request.content:
+            return Response(400, content="Empty body")
+        body = await self._loads(request.content)
+        bot = self.bots.get(body.get("self_id"))
+        if bot is None:
+            return Response(404, content="Bot not connected")
+        data: Dict[str, Any] = body.get("data", {})
+        if body.get("timeout") is not None:
+            data["_timeout"] = body["timeout"]
+        try:
+            result = {
+                "status": "ok",
+                "data": await bot.call_api(body["api"], **data),
+            }
+        except ActionFailed as e:
+            result = {**e.info, "status": "failed"}
+        except Exception as e:
+            result = {"status": "failed", "message": repr(e)}
+        return Response(
+            200,
+            headers={"Content-Type": "application/json"},
+            content=await self._dumps(result, payload_size(result)),
+        )
+
+    async def _handle_worker_load(self, request: Request) -> Response:
+        response = self._check_worker_secret(request)
+        if response is not None:
+            return response
+        assert self.worker is not None
+        bots: Dict[str, Any] = {}
+        for self_id in self.bots:
+            dispatcher = self.dispatchers.get(self_id)
+            result_store = self.result_stores.get(self_id)
+            bots[self_id] = {
+                "connected": self_id in self.connections,
+                "queue": dispatcher.qsize if dispatcher else 0,
+                "received": dispatcher.received if dispatcher else 0,
+                "handled": dispatcher.handled if dispatcher else 0,
+                "rejected": dispatcher.rejected if dispatcher else 0,
+                "shard_depth": dispatcher.occupancy if dispatcher else [],
+                "shard_max_lag": dispatcher.max_lags if dispatcher else [],
+                "in_flight": result_store.in_flight if result_store else 0,
+            }
+        load = {"worker_id": self.worker.worker_id, "pid": os.getpid(), "bots": bots}
+        return Response(
+            200,
+            headers={"Content-Type": "application/json"},
+            content=self.codec.dumps(load),
+        )
+
+    async def _decode_event(
+        self,
+        data: Union[str, bytes],
+        self_id: str,
+        received: Optional[float] = None,
+        codec: Optional[BinaryCodec] = None,
+    ) -> Optional[Event]:
+        """解码收到的数据并转换为事件，记录解码耗时，被采样时记录各阶段耗时"""
+        codec = self._inbound_codec(data, codec)
+        if self.recorder is not None:
+            self.recorder.record(self_id, data, codec.name if codec else "json")
+        trace = self.tracer.start(self_id, received)
+        if trace is not None and received is not None:
+            trace.mark("receive")
+        token = self.tracer.activate(trace)
+        try:
+            started = time.perf_counter()
+            json_data = await self._loads_frame(data, codec)
+            decoded = time.perf_counter() - started
+            mark("decode")
+            event = self.json_to_event(json_data, self_id)
+        finally:
+            self.tracer.deactivate(token)
+        if event is not None:
+            name = type(event).__name__
+            self.metrics.decode_seconds.observe((name,), decoded)
+            if trace is not None:
+                trace.event = name
+                event._trace = trace
+        return event
 
     def _check_access_token(self, request: Request) -> Optional[Response]:
         token = request.headers.get("access_token")
@@ -228,35 +809,69 @@ class Adapter(BaseAdapter):
             log("WARNING", msg)
             return Response(403, content=msg)
 
-    @classmethod
+    def _check_worker_secret(self, request: Request) -> Optional[Response]:
+        """校验supervisor生成的worker密钥，worker接口只接受supervisor与其他worker的请求"""
+        assert self.worker is not None
+        if not self.worker.check_secret(request.headers.get(WORKER_SECRET_HEADER)):
+            log("WARNING", "Worker secret mismatch")
+            return Response(403, content="Worker secret mismatch")
+
     def json_to_event(
-        cls, json_data: Any, self_id: Optional[str] = None
+        self, json_data: Any, self_id: Optional[str] = None
     ) -> Optional[Event]:
         """将 json 数据转换为 Event 对象。
 
         如果为 API 调用返回数据且提供了 Event 对应 Bot，则将数据存入 ResultStore。
 
+        此方法原为类方法，现需要适配器实例上的配置、去重器、ResultStore 与指标，
+        改为实例方法，原先的 `Adapter.json_to_event(data)` 需改为通过适配器实例调用。
+
         参数:
             json_data: json 数据
             self_id: 当前 Event 对应的 Bot
 
         返回:
-            Event 对象，如果解析失败或为 API 调用返回数据，则返回 None
+            Event 对象，如果解析失败、为重复消息或为 API 调用返回数据，则返回 None
         """
         if not isinstance(json_data, dict):
             return None
 
         # api回调设置结果
         if "type" not in json_data:
-            if self_id is not None:
-                cls._result_store.add_result(self_id, json_data)
+            result_store = self.result_stores.get(self_id)
+            if result_store is not None:
+                result_store.add_result(json_data)
             return
 
-        # 实例化事件
-        event_model = event_models.get_event_model(json_data)
+        # 实例化事件，直接使用data作为事件字段
+        event_model = self.event_models.get_event_model(json_data)
+        mark("model")
         try:
-            json_data.update(**json_data.get("data"))
-            event = event_model.parse_obj(json_data)
+            data: Dict[str, Any] = json_data["data"]
+            msgid = data.get("msgid")
+            if (
+                self_id
+                and msgid
+                and self.deduplicator.is_duplicate(self_id, str(msgid))
+            ):
+                log("DEBUG", f"Drop duplicate message {escape_tag(str(msgid))}")
+                self.metrics.duplicates.inc((self_id,))
+                return None
+            if self.ntchat_config.ntchat_keep_raw_data:
+                # 与原先合并进外层字典的结果一致：data自身带有data字段时（如群成员变动）以其为准
+                values = {"data": data, **data, "type": json_data["type"]}
+            else:
+                values = data
+                values["type"] = json_data["type"]
+            started = time.perf_counter()
+            event = self.event_builder.build(event_model, values)
+            mark("build")
+            if self_id and msgid:
+                # 解析失败的消息不记录，ntchat重发时仍可处理
+                self.deduplicator.remember(self_id, str(msgid))
+            name = event_model.__name__
+            self.metrics.parse_seconds.observe((name,), time.perf_counter() - started)
+            self.metrics.events.inc((self_id or "", name))
             return event
         except Exception as e:
             log(
@@ -2,17 +2,35 @@ import asyncio
 import re
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Callable, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Optional,
+    TypeVar,
+    Union,
+)
 
 from nonebot.message import handle_event
 from nonebot.typing import overrides
 
 from nonebot.adapters import Bot as BaseBot
 
+from .directory import Directory
 from .event import Event, TextMessageEvent
-from .exception import NotInteractableEventError
+from .exception import NotInteractableEventError, SendMessageError
+from .listing import Friend, Member, Room, item_list, iter_items
 from .message import Message, MessageSegment
-from .utils import log
+from .offload import payload_size
+from .scheduler import PRIORITY_REPLY
+from .utils import api_options, log
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+
+T = TypeVar("T")
 
 
 def _check_at_me(bot: "Bot", event: TextMessageEvent) -> None:
@@ -66,14 +84,38 @@ async def send(
 
     if isinstance(message, str) or isinstance(message, MessageSegment):
         message = Message(message)
-
+    config = bot.adapter.ntchat_config
+    message = message.normalize(config.ntchat_text_max_length)
+
+    loop = asyncio.get_running_loop()
+    window = asyncio.Semaphore(max(config.ntchat_send_window, 1))
+
+    async def _send_segment(segment: MessageSegment, sent: "asyncio.Future[None]"):
+        try:
+            with api_options(priority=PRIORITY_REPLY, sent=sent):
+                return await bot.call_api(f"send_{segment.type}", **segment.data)
+        finally:
+            window.release()
+            if not sent.done():
+                sent.set_result(None)
+
+    # 按顺序写出每段消息，不等待回调，同时等待回调的消息数不超过window
     task = []
     for segment in message:
-        api = f"send_{segment.type}"
-        segment.data["to_wxid"] = wx_id
-        task.append(bot.call_api(api, **segment.data))
-
-    return await asyncio.gather(*task)
+        # normalize可能返回原消息中的消息段，复制后再设置接收方，不修改调用方的消息
+        segment = MessageSegment(segment.type, {**segment.data, "to_wxid": wx_id})
+        await window.acquire()
+        sent = loop.create_future()
+        task.append(asyncio.create_task(_send_segment(segment, sent)))
+        await sent
+
+    results = await asyncio.gather(*task, return_exceptions=True)
+    errors = [r for r in results if isinstance(r, Exception)]
+    if errors:
+        if len(results) == 1:
+            raise errors[0]
+        raise SendMessageError(results)
+    return results
 
 
 class Bot(BaseBot):
@@ -83,13 +125,27 @@ class Bot(BaseBot):
 
     send_handler: Callable[["Bot", Event, Union[str, MessageSegment]], Any] = send
 
+    def __init__(self, adapter: "Adapter", self_id: str):
+        super().__init__(adapter, self_id)
+        self.directory = Directory(adapter.ntchat_config.ntchat_directory_ttl)
+        """通讯录缓存"""
+
     async def handle_event(self, event: Event) -> None:
         """处理收到的事件。"""
+        trace = event._trace
+        if trace is not None:
+            trace.mark("queue")
+        self.directory.apply(event)
         if isinstance(event, TextMessageEvent):
             _check_at_me(self, event)
             _check_nickname(self, event)
+        if trace is not None:
+            trace.mark("check")
 
         await handle_event(self, event)
+        if trace is not None:
+            trace.mark("handle")
+            self.adapter.tracer.finish(trace)
 
     @overrides(BaseBot)
     async def send(
@@ -125,7 +181,10 @@ class Bot(BaseBot):
             * `to_wxid`：接收方的wx_id，可以是好友id，也可以是room_id
             * `file`：图片内容，支持url，本地路径，bytes，BytesIO
         """
-        data = MessageSegment.image(file_path=file_path).data
+        segment = await self.adapter.offloader.run(
+            payload_size(file_path), MessageSegment.image, file_path, local=True
+        )
+        data = segment.data
         data["to_wxid"] = to_wxid
         return await self.call_api("send_image", **data)
 
@@ -140,7 +199,10 @@ class Bot(BaseBot):
             * `to_wxid`：接收人id
             * `file_path`：文件内容，支持url，本地路径，bytes，BytesIO
         """
-        data = MessageSegment.file(file_path=file_path).data
+        segment = await self.adapter.offloader.run(
+            payload_size(file_path), MessageSegment.file, file_path, local=True
+        )
+        data = segment.data
         data["to_wxid"] = to_wxid
         return await self.call_api("send_file", **data)
 
@@ -155,7 +217,10 @@ class Bot(BaseBot):
             * `to_wxid`：接收人id
             * `file_path`：视频内容，支持url，本地路径，bytes，BytesIO
         """
-        data = MessageSegment.video(file_path=file_path).data
+        segment = await self.adapter.offloader.run(
+            payload_size(file_path), MessageSegment.video, file_path, local=True
+        )
+        data = segment.data
         data["to_wxid"] = to_wxid
         return await self.call_api("send_video", **data)
 
@@ -168,6 +233,109 @@ class Bot(BaseBot):
             * `to_wxid`：接收人id
             * `file`：图片内容，支持url，本地路径，bytes，BytesIO
         """
-        data = MessageSegment.gif(file=file).data
+        segment = await self.adapter.offloader.run(
+            payload_size(file), MessageSegment.gif, file, local=True
+        )
+        data = segment.data
         data["to_wxid"] = to_wxid
         return await self.call_api("send_gif", **data)
+
+    async def get_friend(self, wxid: str) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取联系人信息，缓存未加载或过期时重新获取联系人列表
+
+        参数:
+            * `wxid`：联系人wxid
+        """
+        if not self.directory.is_fresh("friends"):
+            async with self.directory.lock("friends"):
+                if not self.directory.is_fresh("friends"):
+                    result = await self.call_api("get_contacts")
+                    self.directory.set_friends(item_list(result))
+        return self.directory.friends.get(wxid)
+
+    async def get_room(self, room_wxid: str) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取群信息，缓存未加载或过期时重新获取群列表
+
+        参数:
+            * `room_wxid`：群id
+        """
+        if not self.directory.is_fresh("rooms"):
+            async with self.directory.lock("rooms"):
+                if not self.directory.is_fresh("rooms"):
+                    result = await self.call_api("get_rooms")
+                    self.directory.set_rooms(item_list(result))
+        return self.directory.rooms.get(room_wxid)
+
+    async def get_room_member(
+        self, room_wxid: str, wxid: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取群成员信息，缓存未加载或过期时重新获取该群成员列表
+
+        参数:
+            * `room_wxid`：群id
+            * `wxid`：成员wxid
+        """
+        if not self.directory.is_fresh(room_wxid):
+            async with self.directory.lock(room_wxid):
+                if not self.directory.is_fresh(room_wxid):
+                    result = await self.call_api(
+                        "get_room_members", room_wxid=room_wxid
+                    )
+                    self.directory.set_members(room_wxid, item_list(result))
+        return self.directory.members.get(room_wxid, {}).get(wxid)
+
+    async def _iter_list(
+        self,
+        api: str,
+        convert: Callable[[Dict[str, Any]], T],
+        chunk_size: int,
+        **data: Any,
+    ) -> AsyncIterator[T]:
+        """获取未解码的回调并逐项解析，每解析chunk_size项让出一次事件循环"""
+        with api_options(raw=True):
+            frame = await self.call_api(api, **data)
+        for index, record in enumerate(iter_items(frame, convert), 1):
+            yield record
+            if chunk_size > 0 and index % chunk_size == 0:
+                await asyncio.sleep(0)
+
+    def iter_contacts(self, chunk_size: int = 1000) -> AsyncIterator[Friend]:
+        """
+        说明:
+            逐个获取联系人，回调逐项解析为 `Friend` 记录，不构造完整的联系人列表
+
+        参数:
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        return self._iter_list("get_contacts", Friend.from_dict, chunk_size)
+
+    def iter_rooms(self, chunk_size: int = 1000) -> AsyncIterator[Room]:
+        """
+        说明:
+            逐个获取群聊，回调逐项解析为 `Room` 记录，不构造完整的群列表
+
+        参数:
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        return self._iter_list("get_rooms", Room.from_dict, chunk_size)
+
+    def iter_room_members(
+        self, room_wxid: str, chunk_size: int = 1000
+    ) -> AsyncIterator[Member]:
+        """
+        说明:
+            逐个获取群成员，回调逐项解析为 `Member` 记录，不构造完整的成员列表
+
+        参数:
+            * `room_wxid`：群id
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        return self._iter_list(
+            "get_room_members", Member.from_dict, chunk_size, room_wxid=room_wxid
+        )
@@ -1,10 +1,12 @@
 from io import BytesIO
 from pathlib import Path
-from typing import Any, Dict, List, Union
+from typing import Any, AsyncIterator, Dict, List, Optional, Union
 
 from nonebot.adapters import Bot as BaseBot
 
+from .directory import Directory
 from .event import Event, TextMessageEvent
+from .listing import Friend, Member, Room
 from .message import MessageSegment
 
 def _check_at_me(bot: "Bot", event: TextMessageEvent) -> None: ...
@@ -17,6 +19,9 @@ async def send(
 ) -> Any: ...
 
 class Bot(BaseBot):
+    directory: Directory
+    """通讯录缓存"""
+
     async def call_api(self, api: str, **data) -> Any:
         """调用 ntchat API。
 
@@ -362,3 +367,63 @@ class Bot(BaseBot):
             * `room_wxid`：群聊id
         """
         ...
+    async def get_friend(self, wxid: str) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取联系人信息，缓存未加载或过期时重新获取联系人列表
+
+        参数:
+            * `wxid`：联系人wxid
+        """
+        ...
+    async def get_room(self, room_wxid: str) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取群信息，缓存未加载或过期时重新获取群列表
+
+        参数:
+            * `room_wxid`：群id
+        """
+        ...
+    async def get_room_member(
+        self, room_wxid: str, wxid: str
+    ) -> Optional[Dict[str, Any]]:
+        """
+        说明:
+            从通讯录缓存获取群成员信息，缓存未加载或过期时重新获取该群成员列表
+
+        参数:
+            * `room_wxid`：群id
+            * `wxid`：成员wxid
+        """
+        ...
+    def iter_contacts(self, chunk_size: int = 1000) -> AsyncIterator[Friend]:
+        """
+        说明:
+            逐个获取联系人，回调逐项解析为 `Friend` 记录，不构造完整的联系人列表
+
+        参数:
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        ...
+    def iter_rooms(self, chunk_size: int = 1000) -> AsyncIterator[Room]:
+        """
+        说明:
+            逐个获取群聊，回调逐项解析为 `Room` 记录，不构造完整的群列表
+
+        参数:
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        ...
+    def iter_room_members(
+        self, room_wxid: str, chunk_size: int = 1000
+    ) -> AsyncIterator[Member]:
+        """
+        说明:
+            逐个获取群成员，回调逐项解析为 `Member` 记录，不构造完整的成员列表
+
+        参数:
+            * `room_wxid`：群id
+            * `chunk_size`：每解析多少项让出一次事件循环
+        """
+        ...
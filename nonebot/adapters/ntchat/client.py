@@ -0,0 +1,68 @@
+"""http api客户端
+复用到ntchat_http_api_root的长连接
+"""
+
+from typing import Dict, Optional
+
+import httpx
+
+from .exception import ApiTimeout
+
+
+class HttpApiClient:
+    """
+    http api客户端，维护到api地址的连接池
+    """
+
+    def __init__(
+        self,
+        api_root: str,
+        max_connections: int,
+        keepalive_expiry: float,
+        access_token: Optional[str] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> None:
+        if not api_root.endswith("/"):
+            api_root += "/"
+        self.api_root: str = api_root
+        """api地址"""
+        self.requests: int = 0
+        """已发出的请求数"""
+        headers = {"Content-Type": "application/json", **(headers or {})}
+        if access_token:
+            headers["access_token"] = access_token
+        self._client = httpx.AsyncClient(
+            base_url=api_root,
+            headers=headers,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=keepalive_expiry,
+            ),
+        )
+
+    async def post(
+        self, api: str, content: str, timeout: Optional[float]
+    ) -> httpx.Response:
+        """调用api，连接池已满时等待空闲连接
+
+        参数:
+            api: api名称
+            content: 请求体
+            timeout: 超时时间
+
+        返回:
+            http响应
+
+        异常:
+            ApiTimeout: 请求超时
+        """
+        self.requests += 1
+        try:
+            return await self._client.post(api, content=content, timeout=timeout)
+        except httpx.TimeoutException as e:
+            raise ApiTimeout("HTTP API call timeout") from e
+
+    async def close(self) -> None:
+        """关闭所有连接"""
+        await self._client.aclose()
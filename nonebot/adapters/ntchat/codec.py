@@ -0,0 +1,238 @@
+"""json编解码
+根据配置选择orjson、msgspec、ujson或标准库json，
+反向ws连接还可以协商使用msgpack或cbor二进制帧
+"""
+
+import dataclasses
+import json
+from typing import Any, Callable, Dict, Optional, Type, Union
+
+from nonebot.utils import DataclassEncoder
+
+from .utils import log
+
+
+def _default(o: Any) -> Any:
+    """与 `DataclassEncoder` 一致的dataclass序列化"""
+    if dataclasses.is_dataclass(o):
+        return {f.name: getattr(o, f.name) for f in dataclasses.fields(o)}
+    raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
+
+
+class JsonCodec:
+    """
+    标准库json编解码
+    """
+
+    name: str = "json"
+    """编解码器名称"""
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        """解码json，支持str与bytes"""
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        """编码json，dataclass按字段序列化，不转义非ascii字符"""
+        return json.dumps(obj, cls=DataclassEncoder, ensure_ascii=False)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson编解码，orjson无法编码的数据（非str的字典键、超出64位的整数）回退到标准库json
+    """
+
+    name = "orjson"
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._loads: Callable[[Union[str, bytes]], Any] = orjson.loads
+        self._dumps: Callable[..., bytes] = orjson.dumps
+        self._option: int = orjson.OPT_PASSTHROUGH_DATACLASS
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        try:
+            return self._dumps(obj, default=_default, option=self._option).decode()
+        except TypeError:
+            return super().dumps(obj)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    msgspec编解码
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        import msgspec
+
+        self._decoder = msgspec.json.Decoder()
+        self._encoder = msgspec.json.Encoder(enc_hook=_default)
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._decoder.decode(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._encoder.encode(obj).decode()
+
+
+class UjsonCodec(JsonCodec):
+    """
+    ujson编解码
+    """
+
+    name = "ujson"
+
+    def __init__(self) -> None:
+        import ujson
+
+        self._loads: Callable[[Union[str, bytes]], Any] = ujson.loads
+        self._dumps: Callable[..., str] = ujson.dumps
+
+    def loads(self, data: Union[str, bytes]) -> Any:
+        return self._loads(data)
+
+    def dumps(self, obj: Any) -> str:
+        return self._dumps(obj, ensure_ascii=False, default=_default)
+
+
+codecs: Dict[str, Type[JsonCodec]] = {
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+    "ujson": UjsonCodec,
+    "json": JsonCodec,
+}
+"""可用编解码器，auto时按此顺序选择第一个已安装的"""
+
+
+def get_codec(name: str = "auto") -> JsonCodec:
+    """获取编解码器
+
+    参数:
+        name: 编解码器名称，`auto` 为自动选择
+
+    返回:
+        编解码器，指定的编解码器未安装时返回标准库json
+    """
+    if name != "auto":
+        try:
+            return codecs[name]()
+        except KeyError:
+            log("WARNING", f"Unknown json codec {name}, falling back to json")
+        except ImportError:
+            log("WARNING", f"Json codec {name} is not installed, falling back to json")
+        return JsonCodec()
+    for codec in codecs.values():
+        try:
+            return codec()
+        except ImportError:
+            continue
+    return JsonCodec()
+
+
+class BinaryCodec:
+    """
+    二进制帧编解码基类
+    """
+
+    name: str = ""
+    """编解码器名称，同时也是协商时使用的格式名"""
+
+    def loads(self, data: bytes) -> Any:
+        """解码二进制帧"""
+        raise NotImplementedError
+
+    def dumps(self, obj: Any) -> bytes:
+        """编码为二进制帧，dataclass按字段序列化"""
+        raise NotImplementedError
+
+
+class MsgpackCodec(BinaryCodec):
+    """
+    msgpack编解码
+    """
+
+    name = "msgpack"
+
+    def __init__(self) -> None:
+        import msgpack
+
+        self._packer = msgpack.Packer(default=_default, use_bin_type=True)
+        self._unpackb: Callable[..., Any] = msgpack.unpackb
+
+    def loads(self, data: bytes) -> Any:
+        return self._unpackb(data, raw=False, strict_map_key=False)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._packer.pack(obj)
+
+
+class CborCodec(BinaryCodec):
+    """
+    cbor编解码
+    """
+
+    name = "cbor"
+
+    def __init__(self) -> None:
+        import cbor2
+
+        self._loads: Callable[[bytes], Any] = cbor2.loads
+        self._dumps: Callable[..., bytes] = cbor2.dumps
+
+    def loads(self, data: bytes) -> Any:
+        return self._loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return self._dumps(obj, default=_cbor_default)
+
+
+def _cbor_default(encoder: Any, o: Any) -> None:
+    encoder.encode(_default(o))
+
+
+binary_codecs: Dict[str, Type[BinaryCodec]] = {
+    "msgpack": MsgpackCodec,
+    "cbor": CborCodec,
+}
+"""可用二进制帧编解码器"""
+
+JSON_PREFIXES = frozenset(b"{[ \t\r\n")
+"""json文本可能的首字节，二进制连接上以这些字节开头的帧按json解码"""
+BINARY_PREFIXES: Dict[int, str] = {
+    **{byte: "msgpack" for byte in (*range(0x80, 0x90), 0xDE, 0xDF)},
+    **{byte: "cbor" for byte in range(0xA0, 0xC0)},
+}
+"""二进制帧首字节对应的格式，帧总是map，msgpack为fixmap/map16/map32，cbor为主类型5"""
+
+
+def get_binary_codec(name: str) -> Optional[BinaryCodec]:
+    """获取二进制帧编解码器
+
+    参数:
+        name: 格式名称
+
+    返回:
+        编解码器，格式未知或依赖未安装时返回None
+    """
+    codec = binary_codecs.get(name.strip().lower())
+    if codec is None:
+        return None
+    try:
+        return codec()
+    except ImportError:
+        return None
+
+
+def is_json(data: Union[str, bytes]) -> bool:
+    """帧是否为json文本"""
+    return isinstance(data, str) or not data or data[0] in JSON_PREFIXES
+
+
+def sniff_binary_format(data: bytes) -> Optional[str]:
+    """按首字节识别二进制帧的格式，无法识别时返回None"""
+    return BINARY_PREFIXES.get(data[0]) if data else None
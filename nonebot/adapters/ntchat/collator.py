@@ -1,6 +1,9 @@
-from typing import Dict, Generic, Tuple, Type, TypeVar
+from typing import Any, Dict, Generic, List, Tuple, Type, TypeVar
+
+from pydantic.fields import ModelField
 
 from .event import Event
+from .utils import log
 
 E = TypeVar("E", bound=Event)
 
@@ -10,8 +13,11 @@ class EventModels(Generic[E]):
     事件创建器
     """
 
-    event_dict: Dict[Tuple[int, int], Type[E]] = {}
-    """事件模型字典"""
+    def __init__(self) -> None:
+        self.event_dict: Dict[Tuple[int, int], Type[E]] = {}
+        """事件模型字典"""
+        self.type_dict: Dict[int, Type[E]] = {}
+        """子类型未知时按事件类型回退的模型字典"""
 
     def add_event_model(self, event: Type[E]) -> None:
         """添加事件模型"""
@@ -23,12 +29,102 @@ class EventModels(Generic[E]):
             sub_type = sub_type.default
         if event_type:
             self.event_dict[(event_type, sub_type)] = event
+            if sub_type == 0:
+                self.type_dict[event_type] = event
 
     def get_event_model(self, data: Dict) -> Type[E]:
         """获取事件模型"""
         event_type: int = data.get("type")
         sub_type = data["data"].get("wx_sub_type", 0)
-        event_model = self.event_dict.get((event_type, sub_type), None)
-        if event_model is None and sub_type != 0:
-            event_model = self.event_dict.get((event_type, 0))
-        return event_model if event_model else Event
+        event_model = self.event_dict.get((event_type, sub_type))
+        if event_model is None:
+            event_model = self.type_dict.get(event_type, Event)
+        return event_model
+
+
+_TRUSTED_TYPES = {str, int, float, bool, dict, Dict, List[str]}
+"""信任模式下无需校验、直接使用原始值的字段类型"""
+
+
+def _parse_obj(model: Type[E], values: Dict[str, Any]) -> E:
+    """完整校验构造事件，pydantic校验时会复制data字典，构造后换回原始数据的引用"""
+    event = model.parse_obj(values)
+    raw = values.get("data")
+    if isinstance(raw, dict) and "data" in event.__fields_set__:
+        event.__dict__["data"] = raw
+    return event
+
+
+class EventBuilder(Generic[E]):
+    """
+    事件构造器，信任模式下仅校验需要转换的字段，其余字段直接使用原始数据
+    """
+
+    def __init__(self, trusted: bool = False, sample_rate: float = 0) -> None:
+        self.trusted: bool = trusted
+        """是否信任数据"""
+        self.sample_interval: int = round(1 / sample_rate) if sample_rate > 0 else 0
+        """信任模式下每隔多少个事件完整校验一次，0为不校验"""
+        self._count: int = 0
+        self._schemas: Dict[Type[E], Tuple[List[str], List[ModelField]]] = {}
+
+    def _get_schema(self, model: Type[E]) -> Tuple[List[str], List[ModelField]]:
+        """获取模型的必填字段与需要校验的字段，每个模型只计算一次"""
+        schema = self._schemas.get(model)
+        if schema is None:
+            fields = model.__fields__.values()
+            required = [field.name for field in fields if field.required]
+            validated = [
+                field for field in fields if field.outer_type_ not in _TRUSTED_TYPES
+            ]
+            schema = self._schemas[model] = (required, validated)
+        return schema
+
+    def build(self, model: Type[E], values: Dict[str, Any]) -> E:
+        """构造事件
+
+        参数:
+            model: 事件模型
+            values: 事件数据
+
+        返回:
+            事件对象
+
+        异常:
+            ValidationError: 数据校验失败
+        """
+        if not self.trusted:
+            return _parse_obj(model, values)
+        self._count += 1
+        if self.sample_interval and self._count % self.sample_interval == 0:
+            constructed = self.construct(model, dict(values))
+            event = _parse_obj(model, values)
+            if constructed != event:
+                log(
+                    "WARNING",
+                    f"Trusted construction of {model.__name__} differs from validation, "
+                    "ntchat protocol may have changed",
+                )
+            return event
+        return self.construct(model, values)
+
+    def construct(self, model: Type[E], values: Dict[str, Any]) -> E:
+        """跳过简单类型字段的校验构造事件，数据缺失或校验失败时退回完整校验"""
+        required, validated = self._get_schema(model)
+        for validator in model.__pre_root_validators__:
+            values = validator(model, values)
+        for name in required:
+            if name not in values:
+                return _parse_obj(model, values)
+        for field in validated:
+            if field.name not in values:
+                continue
+            value, errors = field.validate(
+                values[field.name], values, loc=field.name, cls=model
+            )
+            if errors:
+                return _parse_obj(model, values)
+            values[field.name] = value
+        for _, validator in model.__post_root_validators__:
+            values = validator(model, values)
+        return model.construct(**values)
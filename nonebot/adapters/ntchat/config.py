@@ -1,4 +1,5 @@
-from typing import Optional
+from pathlib import Path
+from typing import List, Literal, Optional
 
 from pydantic import AnyUrl, BaseModel, Field
 
@@ -16,6 +17,76 @@ class Config(BaseModel):
     """令牌口令"""
     ntchat_http_api_root: Optional[str] = Field(default=None)
     """http api请求地址"""
+    ntchat_http_max_connections: int = Field(default=10)
+    """http api连接池最大连接数"""
+    ntchat_http_keepalive_expiry: float = Field(default=30)
+    """http api空闲连接保持时间，单位秒"""
+    ntchat_json_codec: Literal["auto", "orjson", "msgspec", "ujson", "json"] = Field(
+        default="auto"
+    )
+    """json编解码器，auto为自动选择已安装的最快实现"""
+    ntchat_binary_formats: List[str] = Field(default=["msgpack", "cbor"])
+    """反向ws连接可协商的二进制帧格式，为空时只使用json"""
+    ntchat_media_dir: Optional[Path] = Field(default=None)
+    """bytes媒体保存目录，需要ntchat能够访问，不填时以base64发送"""
+    ntchat_media_threshold: int = Field(default=0)
+    """大于等于此大小（字节）的bytes媒体保存为文件发送，默认全部保存，相同的表情、图片只保存一次"""
+    ntchat_media_max_age: float = Field(default=86400)
+    """媒体文件保留时间，单位秒"""
+    ntchat_media_cache_size: int = Field(default=512 * 1024 * 1024)
+    """媒体文件占用的最大空间（字节），超出时删除最久未使用的文件，0为不限制"""
+    ntchat_media_evict_grace: float = Field(default=300)
+    """媒体文件保存或复用后至少保留的时间（秒），期间即使超出最大空间也不删除，保证已构造的消息发出前文件存在"""
+    ntchat_text_max_length: int = Field(default=2000)
+    """单条文本消息最大长度，超出时自动拆分，0为不拆分"""
+    ntchat_send_window: int = Field(default=4)
+    """发送多段消息时最多同时等待回调的消息数，1为逐条发送"""
+    ntchat_send_rate: float = Field(default=0)
+    """每个bot每秒最多发送消息数，0为不限制"""
+    ntchat_send_burst: int = Field(default=5)
+    """每个bot允许连续发送的消息数"""
+    ntchat_send_rate_per_user: float = Field(default=0)
+    """向同一接收方每秒最多发送消息数，0为不限制"""
+    ntchat_send_burst_per_user: int = Field(default=3)
+    """向同一接收方允许连续发送的消息数"""
+    ntchat_offload_threshold: int = Field(default=1024 * 1024)
+    """超过此大小（字节）的json编解码与媒体转换在执行器中运行，0为不启用"""
+    ntchat_offload_executor: Literal["thread", "process"] = Field(default="thread")
+    """json编解码使用的执行器类型，媒体转换总是使用线程池"""
+    ntchat_offload_workers: Optional[int] = Field(default=None)
+    """执行器worker数量，不填时使用默认值"""
+    ntchat_directory_ttl: float = Field(default=3600)
+    """通讯录缓存有效期，单位秒，0为永不过期"""
+    ntchat_dedup_capacity: int = Field(default=10000)
+    """消息去重记录的msgid数量，0为不去重"""
+    ntchat_dedup_window: float = Field(default=300)
+    """消息去重时间窗口，单位秒"""
+    ntchat_metrics: bool = Field(default=False)
+    """是否记录运行指标并开放 `/ntchat/metrics` 路由"""
+    ntchat_trace_sample_rate: float = Field(default=0)
+    """事件阶段追踪的采样率，0为不追踪"""
+    ntchat_trace_file: Path = Field(default=Path("ntchat_trace.jsonl"))
+    """事件阶段追踪记录文件"""
+    ntchat_record_dir: Optional[Path] = Field(default=None)
+    """上报记录目录，不填时不记录"""
+    ntchat_record_max_bytes: int = Field(default=64 * 1024 * 1024)
+    """单个记录文件的最大大小（压缩前，字节），超出时滚动到新文件"""
+    ntchat_record_max_files: int = Field(default=10)
+    """保留的记录文件数，0为不限制"""
+    ntchat_record_compress: bool = Field(default=True)
+    """是否使用gzip压缩记录文件"""
+    ntchat_keep_raw_data: bool = Field(default=False)
+    """是否在事件的data字段中保留原始数据（引用，不复制）"""
+    ntchat_trusted_ingest: bool = Field(default=False)
+    """信任ntchat客户端数据，构造事件时跳过简单类型字段的校验"""
+    ntchat_trusted_sample_rate: float = Field(default=0.001)
+    """信任模式下仍完整校验的事件比例，用于发现协议变动，0为不校验"""
+    ntchat_dispatch_workers: int = Field(default=8)
+    """每个bot的事件分片数量，同一会话的事件在同一分片内按顺序处理"""
+    ntchat_dispatch_queue_size: int = Field(default=1000)
+    """每个分片等待处理的事件队列长度，0为不限制"""
+    ntchat_dispatch_drain_timeout: float = Field(default=5)
+    """bot断开时等待已入队事件处理完成的最长时间，单位秒"""
 
     class Config:
         extra = "ignore"
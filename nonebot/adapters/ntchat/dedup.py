@@ -0,0 +1,66 @@
+"""消息去重
+ntchat超时重试或同时上报到http与ws时，同一msgid可能收到多次
+"""
+
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class Deduplicator:
+    """
+    按 `(self_id, msgid)` 去重，只保留时间窗口内最近的capacity条记录
+    """
+
+    def __init__(self, capacity: int, window: float) -> None:
+        self.capacity: int = capacity
+        """最多记录的msgid数量，0为不去重"""
+        self.window: float = window
+        """去重时间窗口，单位秒"""
+        self.duplicates: int = 0
+        """已丢弃的重复消息数"""
+        self._seen: "OrderedDict[Tuple[str, str], float]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def is_duplicate(self, self_id: str, msgid: str) -> bool:
+        """检查消息是否重复，不记录该消息，消息成功解析后再调用 `remember`
+
+        参数:
+            self_id: bot的wxid
+            msgid: 消息id
+
+        返回:
+            是否在时间窗口内收到过
+        """
+        if self.capacity <= 0:
+            return False
+        now = time.monotonic()
+        self._expire(now)
+        key = (self_id, msgid)
+        if key in self._seen:
+            self.duplicates += 1
+            return True
+        return False
+
+    def remember(self, self_id: str, msgid: str) -> None:
+        """记录已接收的消息，之后时间窗口内相同msgid的消息视为重复"""
+        if self.capacity <= 0:
+            return
+        self._seen[(self_id, msgid)] = time.monotonic()
+        if len(self._seen) > self.capacity:
+            self._seen.popitem(last=False)
+
+    def forget(self, self_id: str, msgid: str) -> None:
+        """移除记录，用于消息未能处理、需要接受重发的情况"""
+        self._seen.pop((self_id, msgid), None)
+
+    def _expire(self, now: float) -> None:
+        expire = now - self.window
+        seen = self._seen
+        while seen:
+            key = next(iter(seen))
+            if seen[key] >= expire:
+                break
+            del seen[key]
@@ -0,0 +1,132 @@
+"""通讯录缓存
+按wxid索引好友、群聊与群成员，由api结果初始化，并根据事件增量更新
+"""
+
+import asyncio
+import time
+from typing import Any, Dict, Iterable, List
+
+from .event import (
+    Event,
+    FriendAddNoticeEvent,
+    InvitedRoomEvent,
+    RoomMemberAddNoticeEvent,
+    RoomMemberDelNoticeEvent,
+)
+from .listing import Member
+
+Record = Dict[str, Any]
+
+
+def _record_size(record: Record) -> int:
+    """估算单条记录占用的内存"""
+    size = 64 + 32 * len(record)
+    for value in record.values():
+        if isinstance(value, str):
+            size += 49 + len(value)
+        elif isinstance(value, list):
+            size += 56 + 8 * len(value)
+    return size
+
+
+def _member_record(data: Record) -> Record:
+    """将事件与api返回的群成员统一为 `Member` 的字段"""
+    return dict(Member.from_dict(data)._asdict())
+
+
+class Directory:
+    """
+    单个bot的通讯录缓存
+    """
+
+    def __init__(self, ttl: float) -> None:
+        self.ttl: float = ttl
+        """缓存有效期，单位秒，0为永不过期"""
+        self.friends: Dict[str, Record] = {}
+        """好友，wxid -> 好友信息"""
+        self.rooms: Dict[str, Record] = {}
+        """群聊，room_wxid -> 群信息"""
+        self.members: Dict[str, Dict[str, Record]] = {}
+        """群成员，room_wxid -> wxid -> 成员信息"""
+        self.nbytes: int = 0
+        """估算的缓存内存占用"""
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._loaded: Dict[str, float] = {}
+
+    def is_fresh(self, key: str) -> bool:
+        """缓存是否已加载且未过期，key为 `friends`、`rooms` 或群wxid"""
+        loaded = self._loaded.get(key)
+        if loaded is None:
+            return False
+        return self.ttl <= 0 or time.monotonic() - loaded < self.ttl
+
+    def lock(self, key: str) -> asyncio.Lock:
+        """刷新缓存时使用的锁，每个key一把，不同列表的刷新互不等待"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        return lock
+
+    def _replace(self, table: Dict[str, Record], records: Iterable[Record]) -> None:
+        self.nbytes -= sum(_record_size(r) for r in table.values())
+        table.clear()
+        for record in records:
+            self._put(table, record)
+
+    def _put(self, table: Dict[str, Record], record: Record) -> None:
+        wxid = record.get("wxid")
+        if not wxid:
+            return
+        old = table.get(wxid)
+        if old is not None:
+            self.nbytes -= _record_size(old)
+        table[wxid] = record
+        self.nbytes += _record_size(record)
+
+    def _pop(self, table: Dict[str, Record], wxid: str) -> None:
+        old = table.pop(wxid, None)
+        if old is not None:
+            self.nbytes -= _record_size(old)
+
+    def set_friends(self, friends: List[Record]) -> None:
+        """用完整好友列表初始化"""
+        self._replace(self.friends, friends)
+        self._loaded["friends"] = time.monotonic()
+
+    def set_rooms(self, rooms: List[Record]) -> None:
+        """用完整群列表初始化"""
+        self._replace(self.rooms, rooms)
+        self._loaded["rooms"] = time.monotonic()
+
+    def set_members(self, room_wxid: str, members: List[Record]) -> None:
+        """用完整群成员列表初始化"""
+        table = self.members.setdefault(room_wxid, {})
+        self._replace(table, (_member_record(m) for m in members))
+        self._loaded[room_wxid] = time.monotonic()
+
+    def apply(self, event: Event) -> None:
+        """根据事件增量更新缓存"""
+        if isinstance(event, FriendAddNoticeEvent):
+            self._put(self.friends, event.dict(exclude={"data", "type", "to_me"}))
+        elif isinstance(event, RoomMemberAddNoticeEvent):
+            members = self.members.get(event.room_wxid)
+            if members is not None:
+                for member in event.member_list:
+                    self._put(members, _member_record(member.dict()))
+            self._update_room(event.room_wxid, total_member=event.total_member)
+        elif isinstance(event, RoomMemberDelNoticeEvent):
+            members = self.members.get(event.room_wxid)
+            if members is not None:
+                for member in event.member_list:
+                    self._pop(members, member.wxid)
+            self._update_room(event.room_wxid, total_member=event.total_member)
+        elif isinstance(event, InvitedRoomEvent):
+            room = event.dict(exclude={"data", "type", "to_me", "member_list"})
+            room["wxid"] = room.pop("room_wxid")
+            self._put(self.rooms, room)
+            self.set_members(event.room_wxid, [m.dict() for m in event.member_list])
+
+    def _update_room(self, room_wxid: str, **fields: Any) -> None:
+        room = self.rooms.get(room_wxid)
+        if room is not None:
+            self._put(self.rooms, {**room, **fields})
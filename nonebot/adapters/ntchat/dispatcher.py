@@ -0,0 +1,219 @@
+"""事件分发
+按会话将事件分片，同一会话内的事件按顺序处理，不同会话并行处理
+"""
+
+import asyncio
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+from nonebot.utils import escape_tag
+
+from .event import Event
+from .utils import log
+
+if TYPE_CHECKING:
+    from .bot import Bot
+
+
+def get_conversation_id(event: Event) -> str:
+    """获取事件所属会话id，群聊为room_wxid，私聊为from_wxid，不属于会话时为空"""
+    room_wxid = getattr(event, "room_wxid", "")
+    if room_wxid:
+        return room_wxid
+    return getattr(event, "from_wxid", "")
+
+
+class EventShard:
+    """
+    事件分片，由单个worker按入队顺序处理
+    """
+
+    def __init__(self, queue_size: int) -> None:
+        self.queue: "asyncio.Queue[Tuple[float, Event]]" = asyncio.Queue(
+            max(queue_size, 0)
+        )
+        """等待处理的事件队列，元素为(入队时间, 事件)"""
+        self.task: Optional["asyncio.Task"] = None
+        """worker任务"""
+        self.handled: int = 0
+        """处理完成事件数"""
+        self.lag: float = 0.0
+        """最近一个事件从入队到开始处理的等待时间"""
+        self.max_lag: float = 0.0
+        """事件等待时间的最大值"""
+
+    @property
+    def qsize(self) -> int:
+        """当前队列深度"""
+        return self.queue.qsize()
+
+
+class EventDispatcher:
+    """
+    单个bot的事件分发器，事件按会话分配到固定数量的分片中处理
+    """
+
+    def __init__(
+        self, bot: "Bot", workers: int, queue_size: int, drain_timeout: float = 5
+    ) -> None:
+        self.bot = bot
+        """所属bot"""
+        self.shards: List[EventShard] = [
+            EventShard(queue_size) for _ in range(max(workers, 1))
+        ]
+        """事件分片"""
+        self.received: int = 0
+        """入队事件数"""
+        self.rejected: int = 0
+        """队列已满被拒绝的事件数"""
+        self.drain_timeout: float = drain_timeout
+        """停止时等待已入队事件处理完成的最长时间，单位秒"""
+        self.intake_size: int = max(queue_size, 1)
+        """接收缓冲的上限，超出时 `intake_full` 为True"""
+        self._intake: "asyncio.Queue[Event]" = asyncio.Queue()
+        self._intake_space = asyncio.Event()
+        self._intake_space.set()
+        self._feeder: Optional["asyncio.Task"] = None
+        self._next: int = 0
+
+    @property
+    def tasks(self) -> List["asyncio.Task"]:
+        """worker任务与接收缓冲的转入任务"""
+        tasks = [shard.task for shard in self.shards if shard.task is not None]
+        if self._feeder is not None:
+            tasks.append(self._feeder)
+        return tasks
+
+    @property
+    def handled(self) -> int:
+        """处理完成事件数"""
+        return sum(shard.handled for shard in self.shards)
+
+    @property
+    def qsize(self) -> int:
+        """当前队列总深度，包含接收缓冲中的事件"""
+        return sum(shard.qsize for shard in self.shards) + self._intake.qsize()
+
+    @property
+    def intake_full(self) -> bool:
+        """接收缓冲是否已达到上限"""
+        return self._intake.qsize() >= self.intake_size
+
+    @property
+    def maxsize(self) -> int:
+        """队列最大总深度"""
+        return sum(shard.queue.maxsize for shard in self.shards)
+
+    @property
+    def occupancy(self) -> List[int]:
+        """各分片当前队列深度"""
+        return [shard.qsize for shard in self.shards]
+
+    @property
+    def lags(self) -> List[float]:
+        """各分片最近一个事件的等待时间"""
+        return [shard.lag for shard in self.shards]
+
+    @property
+    def max_lags(self) -> List[float]:
+        """各分片事件等待时间的最大值"""
+        return [shard.max_lag for shard in self.shards]
+
+    def get_shard(self, event: Event) -> EventShard:
+        """获取事件所属会话对应的分片，不属于任何会话的事件轮流分配"""
+        key = get_conversation_id(event)
+        if key:
+            return self.shards[hash(key) % len(self.shards)]
+        self._next = (self._next + 1) % len(self.shards)
+        return self.shards[self._next]
+
+    def start(self) -> List["asyncio.Task"]:
+        """启动worker，返回创建的任务"""
+        for shard in self.shards:
+            if shard.task is None:
+                shard.task = asyncio.create_task(self._worker(shard))
+        if self._feeder is None:
+            self._feeder = asyncio.create_task(self._feed())
+        return self.tasks
+
+    async def put(self, event: Event) -> None:
+        """事件入队，分片队列已满时等待"""
+        loop = asyncio.get_running_loop()
+        await self.get_shard(event).queue.put((loop.time(), event))
+        self.received += 1
+
+    def put_intake(self, event: Event) -> None:
+        """事件放入接收缓冲，不等待，由单独的任务按顺序转入分片队列
+
+        websocket读取循环不能在分片队列上等待：api回调与事件在同一连接上，
+        读取循环停下时，正在等待回调的事件处理也无法完成
+        """
+        self._intake.put_nowait(event)
+        if self.intake_full:
+            self._intake_space.clear()
+
+    async def wait_intake(self) -> None:
+        """等待接收缓冲低于上限"""
+        await self._intake_space.wait()
+
+    async def _feed(self) -> None:
+        while True:
+            event = await self._intake.get()
+            if not self.intake_full:
+                self._intake_space.set()
+            try:
+                await self.put(event)
+            finally:
+                self._intake.task_done()
+
+    def put_nowait(self, event: Event) -> bool:
+        """事件入队，分片队列已满时返回False"""
+        loop = asyncio.get_running_loop()
+        try:
+            self.get_shard(event).queue.put_nowait((loop.time(), event))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.received += 1
+        return True
+
+    async def _worker(self, shard: EventShard) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            enqueued_at, event = await shard.queue.get()
+            shard.lag = loop.time() - enqueued_at
+            if shard.lag > shard.max_lag:
+                shard.max_lag = shard.lag
+            try:
+                await self.bot.handle_event(event)
+            except Exception as e:
+                log(
+                    "ERROR",
+                    f"<r><bg #f8bbd0>Error while handle event for bot {escape_tag(self.bot.self_id)}.</bg #f8bbd0></r>",
+                    e,
+                )
+            finally:
+                shard.handled += 1
+                shard.queue.task_done()
+
+    async def _drain(self) -> None:
+        await self._intake.join()
+        await asyncio.gather(*(shard.queue.join() for shard in self.shards))
+
+    async def stop(self) -> None:
+        """等待已入队的事件处理完成后停止所有worker，超过drain_timeout时取消剩余的处理"""
+        tasks = self.tasks
+        if tasks:
+            try:
+                await asyncio.wait_for(self._drain(), self.drain_timeout)
+            except asyncio.TimeoutError:
+                log(
+                    "WARNING",
+                    f"Dispatcher for Bot {escape_tag(self.bot.self_id)} "
+                    f"stopped with {self.qsize} events pending",
+                )
+        for shard in self.shards:
+            shard.task = None
+        self._feeder = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,18 +1,50 @@
-from copy import deepcopy
 from enum import IntEnum
+from functools import lru_cache, wraps
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Type
 from urllib.parse import unquote
 from xml.etree import ElementTree as ET
 
 from nonebot.typing import overrides
 from nonebot.utils import escape_tag
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, Field, PrivateAttr, root_validator
 
 from nonebot.adapters import Event as BaseEvent
 
 from .message import Message
-from .type import EventType, SubType, WxType
+from .tracing import Trace
+from .type import EVENT_TYPE_NAMES, SUB_TYPE_NAMES, WX_TYPE_NAMES, EventType, SubType
+
+
+def xml_field(func: Callable[[Any, ET.Element], Any]) -> property:
+    """
+    将方法转换为由raw_msg解析的只读字段，首次访问时才解析xml，结果缓存在事件上；
+    事件描述不读取这些字段，记录事件日志时不会解析xml
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def getter(self: "Event") -> Any:
+        cache = self._xml_cache
+        if cache is None:
+            cache = self._xml_cache = {"": ET.fromstring(getattr(self, "raw_msg"))}
+        if name not in cache:
+            cache[name] = func(self, cache[""])
+        return cache[name]
+
+    setattr(getter, "__xml_field__", True)
+    return property(getter)
+
+
+@lru_cache(maxsize=None)
+def get_xml_fields(model: Type["Event"]) -> Tuple[str, ...]:
+    """获取事件模型中由 `xml_field` 定义的字段名"""
+    return tuple(
+        name
+        for name in dir(model)
+        if isinstance(getattr(model, name, None), property)
+        and getattr(getattr(model, name).fget, "__xml_field__", False)
+    )
 
 
 class Event(BaseEvent):
@@ -20,8 +52,8 @@ class Event(BaseEvent):
     ntchat事件基类
     """
 
-    data: Dict
-    """事件原始数据"""
+    data: Dict = Field(default_factory=dict)
+    """事件原始数据，需开启 `ntchat_keep_raw_data`"""
     type: int
     """事件类型"""
     to_me: bool = False
@@ -30,22 +62,50 @@ class Event(BaseEvent):
 
     :类型: ``bool``
     """
+    _xml_cache: Optional[Dict[str, Any]] = PrivateAttr(default=None)
+    """raw_msg解析结果缓存"""
+    _trace: Optional[Trace] = PrivateAttr(default=None)
+    """被采样时的阶段追踪记录"""
+
+    def _iter(
+        self,
+        to_dict: bool = False,
+        by_alias: bool = False,
+        include: Any = None,
+        exclude: Any = None,
+        exclude_unset: bool = False,
+        exclude_defaults: bool = False,
+        exclude_none: bool = False,
+    ) -> Iterator[Tuple[str, Any]]:
+        # xml字段不是模型字段，导出(dict/json)时补上，保持与原先的输出一致
+        yield from super()._iter(
+            to_dict=to_dict,
+            by_alias=by_alias,
+            include=include,
+            exclude=exclude,
+            exclude_unset=exclude_unset,
+            exclude_defaults=exclude_defaults,
+            exclude_none=exclude_none,
+        )
+        if not to_dict:
+            return
+        for name in get_xml_fields(type(self)):
+            if include is not None and name not in include:
+                continue
+            if exclude is not None and name in exclude:
+                continue
+            value = getattr(self, name)
+            if exclude_none and value is None:
+                continue
+            yield name, value
 
     @overrides(BaseEvent)
     def get_type(self) -> str:
-        try:
-            wx_type = EventType(self.type)
-            return wx_type.name
-        except Exception:
-            return str(self.type)
+        return EVENT_TYPE_NAMES.get(self.type) or str(self.type)
 
     @overrides(BaseEvent)
     def get_event_name(self) -> str:
-        try:
-            wx_type = EventType(self.type)
-            return wx_type.name
-        except Exception:
-            return str(self.type)
+        return EVENT_TYPE_NAMES.get(self.type) or str(self.type)
 
     @overrides(BaseEvent)
     def get_message(self) -> "Message":
@@ -95,7 +155,7 @@ class MessageEvent(Event):
     @root_validator(pre=True, allow_reuse=True)
     def check_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
         if "msg" in values:
-            values["message"] = deepcopy(values["msg"])
+            values["message"] = Message(values["msg"])
         else:
             values["message"] = ""
         return values
@@ -147,6 +207,7 @@ class QuoteMessageEvent(MessageEvent):
 
     @root_validator(pre=True, allow_reuse=True)
     def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
+        # 标题即消息内容，必须在构造时解析，引用字段随之一并取出，不再重复解析
         raw_xml = values["raw_msg"]
         xml_obj = ET.fromstring(raw_xml)
         values["message"] = xml_obj.find("./appmsg/title").text
@@ -202,24 +263,22 @@ class CardMessageEvent(MessageEvent):
     """接收名片消息"""
 
     type: int = EventType.MT_RECV_CARD_MSG
-    headimg_url: str
-    """头像url"""
-    nickname: str
-    """名片用户昵称"""
     raw_msg: str
     """微信中的原始消息,xml格式"""
 
-    @root_validator(pre=True, allow_reuse=True)
-    def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        raw_xml = values["raw_msg"]
-        xml_obj = ET.fromstring(raw_xml)
-        values["headimg_url"] = xml_obj.attrib.get("bigheadimgurl")
-        values["nickname"] = xml_obj.attrib.get("nickname")
-        return values
+    @xml_field
+    def headimg_url(self, xml_obj: ET.Element) -> str:
+        """头像url"""
+        return xml_obj.attrib.get("bigheadimgurl")
+
+    @xml_field
+    def nickname(self, xml_obj: ET.Element) -> str:
+        """名片用户昵称"""
+        return xml_obj.attrib.get("nickname")
 
     @overrides(MessageEvent)
     def get_event_description(self) -> str:
-        msg = f"[名片消息] - {self.nickname}"
+        msg = "[名片消息]请查看raw_msg"
         if self.room_wxid:
             return f"Message {self.msgid} from {self.from_wxid}@[群:{self.room_wxid}]: {msg}"
         else:
@@ -250,18 +309,13 @@ class EmojiMessageEvent(MessageEvent):
     """接收表情消息"""
 
     type = EventType.MT_RECV_EMOJI_MSG
-    emoji_url: str
-    """表情url地址"""
     raw_msg: str
     """微信中的原始消息,xml格式"""
 
-    @root_validator(pre=True, allow_reuse=True)
-    def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        raw_xml = values["raw_msg"]
-        xml_obj = ET.fromstring(raw_xml)
-        emoji_url = xml_obj.find("./emoji").attrib.get("cdnurl")
-        values["emoji_url"] = unquote(emoji_url)
-        return values
+    @xml_field
+    def emoji_url(self, xml_obj: ET.Element) -> str:
+        """表情url地址"""
+        return unquote(xml_obj.find("./emoji").attrib.get("cdnurl"))
 
     @overrides(MessageEvent)
     def get_event_description(self) -> str:
@@ -276,31 +330,32 @@ class LocationMessageEvent(MessageEvent):
     """接收位置消息消息"""
 
     type: int = EventType.MT_RECV_LOCATION_MSG
-    location_x: str
-    """位置x坐标"""
-    location_y: str
-    """位置y坐标"""
-    label: str
-    """位置标签"""
-    poiname: str
-    """位置名称"""
     raw_msg: str
     """微信中的原始消息,xml格式"""
 
-    @root_validator(pre=True, allow_reuse=True)
-    def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        raw_xml = values["raw_msg"]
-        xml_obj = ET.fromstring(raw_xml)
-        location = xml_obj.find("./location")
-        values["location_x"] = location.attrib.get("x")
-        values["location_y"] = location.attrib.get("y")
-        values["label"] = location.attrib.get("label")
-        values["poiname"] = location.attrib.get("poiname")
-        return values
+    @xml_field
+    def location_x(self, xml_obj: ET.Element) -> str:
+        """位置x坐标"""
+        return xml_obj.find("./location").attrib.get("x")
+
+    @xml_field
+    def location_y(self, xml_obj: ET.Element) -> str:
+        """位置y坐标"""
+        return xml_obj.find("./location").attrib.get("y")
+
+    @xml_field
+    def label(self, xml_obj: ET.Element) -> str:
+        """位置标签"""
+        return xml_obj.find("./location").attrib.get("label")
+
+    @xml_field
+    def poiname(self, xml_obj: ET.Element) -> str:
+        """位置名称"""
+        return xml_obj.find("./location").attrib.get("poiname")
 
     @overrides(MessageEvent)
     def get_event_description(self) -> str:
-        msg = f"[位置消息] - {self.poiname}"
+        msg = "[位置消息]请查看raw_msg"
         if self.room_wxid:
             return f"Message {self.msgid} from {self.from_wxid}@[群:{self.room_wxid}]: {msg}"
         else:
@@ -469,23 +524,19 @@ class RevokeNoticeEvent(NoticeEvent):
     """接收者的wxid"""
     raw_msg: str
     """微信中的原始消息,xml格式"""
-    msg_id: str
-    """撤回消息id"""
 
     @overrides(NoticeEvent)
     def get_user_id(self) -> str:
         return self.from_wxid
 
-    @root_validator(pre=True, allow_reuse=True)
-    def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        raw_xml = values["raw_msg"]
-        xml_obj = ET.fromstring(raw_xml)
-        values["msg_id"] = xml_obj.find("./revokemsg/newmsgid").text
-        return values
+    @xml_field
+    def msg_id(self, xml_obj: ET.Element) -> str:
+        """撤回消息id"""
+        return xml_obj.find("./revokemsg/newmsgid").text
 
     @overrides(NoticeEvent)
     def get_event_description(self) -> str:
-        msg = f"[撤回通知]msg_id:{self.msg_id}"
+        msg = "[撤回通知]请查看raw_msg"
         if self.room_wxid:
             return f"Message  from {self.from_wxid}@[群:{self.room_wxid}]: {msg}"
         else:
@@ -590,8 +641,8 @@ class RoomMemberAddNoticeEvent(NoticeEvent):
     """群成员变动的wxid 可用event.member_list[0].wxid获取"""
     nickname: str
     """群昵称"""
-    data: Dict
-    """微信中的原始消息,xml格式"""
+    data: Dict = Field(default_factory=dict)
+    """ntchat上报中的data字段，不受 `ntchat_keep_raw_data` 影响；上报中没有该字段时与其他事件相同"""
 
     @overrides(NoticeEvent)
     def get_user_id(self) -> str:
@@ -615,8 +666,8 @@ class RoomMemberDelNoticeEvent(NoticeEvent):
     """群成员变动的wxid 可用event.member_list[0].wxid获取"""
     nickname: str
     """群昵称"""
-    data: Dict
-    """微信中的原始消息,xml格式"""
+    data: Dict = Field(default_factory=dict)
+    """ntchat上报中的data字段，不受 `ntchat_keep_raw_data` 影响；上报中没有该字段时与其他事件相同"""
 
     @overrides(NoticeEvent)
     def get_user_id(self) -> str:
@@ -653,11 +704,8 @@ class AppEvent(Event):
 
     @overrides(Event)
     def get_event_name(self) -> str:
-        wx_type = WxType(self.wx_type).name
-        try:
-            sub_type = SubType(self.wx_sub_type).name
-        except Exception:
-            sub_type = self.wx_sub_type
+        wx_type = WX_TYPE_NAMES.get(self.wx_type) or self.wx_type
+        sub_type = SUB_TYPE_NAMES.get(self.wx_sub_type) or self.wx_sub_type
         return f"AppMessage.{wx_type}.{sub_type}"
 
 
@@ -700,25 +748,22 @@ class WcpayMessageEvent(AppEvent):
 
     type: int = EventType.MT_RECV_WCPAY_MSG
     wx_sub_type: int = SubType.WX_APPMSG_WCPAY
-    feedesc: str
-    """收钱数目，以￥开头"""
-    pay_memo: str
-    """转账说明"""
     raw_msg: str
     """微信中的原始消息,xml格式"""
 
-    @root_validator(pre=True, allow_reuse=True)
-    def get_pre_message(cls, values: Dict[str, Any]) -> Dict[str, Any]:
-        raw_xml = values["raw_msg"]
-        xml_obj = ET.fromstring(raw_xml)
-        wcpayinfo = xml_obj.find("./appmsg/wcpayinfo")
-        values["feedesc"] = wcpayinfo.find("./feedesc").text
-        values["pay_memo"] = wcpayinfo.find("./pay_memo").text
-        return values
+    @xml_field
+    def feedesc(self, xml_obj: ET.Element) -> str:
+        """收钱数目，以￥开头"""
+        return xml_obj.find("./appmsg/wcpayinfo/feedesc").text
+
+    @xml_field
+    def pay_memo(self, xml_obj: ET.Element) -> str:
+        """转账说明"""
+        return xml_obj.find("./appmsg/wcpayinfo/pay_memo").text
 
     @overrides(Event)
     def get_event_description(self) -> str:
-        msg = f"[转账消息] - 收到{self.feedesc}，转账说明：{self.pay_memo}"
+        msg = "[转账消息]请查看raw_msg"
         if self.room_wxid:
             return f"Message {self.msgid} from {self.from_wxid}@[群:{self.room_wxid}]: {msg}"
         else:
@@ -1,8 +1,9 @@
 """adapter异常
 """
 
-from typing import Optional
+from typing import Any, Dict, List, Optional
 
+from nonebot.exception import ActionFailed as BaseActionFailed
 from nonebot.exception import AdapterException
 from nonebot.exception import ApiNotAvailable as BaseApiNotAvailable
 from nonebot.exception import NetworkError as BaseNetworkError
@@ -28,6 +29,42 @@ class NotInteractableEventError(NtchatAdapterException):
         return self.__repr__()
 
 
+class SendMessageError(NtchatAdapterException):
+    """多段消息中有消息发送失败"""
+
+    def __init__(self, results: List[Any]) -> None:
+        super().__init__()
+        self.results: List[Any] = results
+        """每段消息的发送结果，发送失败的为对应异常"""
+
+    @property
+    def errors(self) -> List[Exception]:
+        """发送失败的异常"""
+        return [r for r in self.results if isinstance(r, Exception)]
+
+    def __repr__(self) -> str:
+        return f"<SendMessageError failed={len(self.errors)}/{len(self.results)}>"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
+class ActionFailed(BaseActionFailed, NtchatAdapterException):
+    """API 调用失败"""
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__()
+        self.info: Dict[str, Any] = kwargs
+        """ntchat返回的结果"""
+
+    def __repr__(self) -> str:
+        info = ", ".join(f"{k}={v!r}" for k, v in self.info.items())
+        return f"<ActionFailed {info}>"
+
+    def __str__(self) -> str:
+        return self.__repr__()
+
+
 class NetworkError(BaseNetworkError, NtchatAdapterException):
     """网络错误。"""
 
@@ -43,5 +80,12 @@ class NetworkError(BaseNetworkError, NtchatAdapterException):
         return self.__repr__()
 
 
+class ApiTimeout(NetworkError):
+    """API 调用超时"""
+
+    def __repr__(self) -> str:
+        return f"<ApiTimeout message={self.msg}>"
+
+
 class ApiNotAvailable(BaseApiNotAvailable, NtchatAdapterException):
     """API 连接不可用"""
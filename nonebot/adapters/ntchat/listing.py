@@ -0,0 +1,209 @@
+"""大列表的增量解析
+好友、群聊与群成员列表的回调可能有数MB，逐项解析为紧凑记录，不构造完整的字典列表
+"""
+
+import json
+import re
+import sys
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Match,
+    NamedTuple,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+    cast,
+)
+
+from .utils import handle_api_result
+
+T = TypeVar("T")
+
+
+class Friend(NamedTuple):
+    """好友记录"""
+
+    wxid: str
+    """好友wxid"""
+    account: str
+    """微信号"""
+    nickname: str
+    """昵称"""
+    remark: str
+    """备注"""
+    avatar: str
+    """头像url"""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Friend":
+        return cls(
+            data.get("wxid", ""),
+            data.get("account", ""),
+            data.get("nickname", ""),
+            data.get("remark", ""),
+            data.get("avatar", ""),
+        )
+
+
+class Room(NamedTuple):
+    """群聊记录"""
+
+    wxid: str
+    """群wxid"""
+    nickname: str
+    """群名"""
+    manager_wxid: str
+    """群主wxid"""
+    total_member: int
+    """成员数"""
+    avatar: str
+    """群头像url"""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Room":
+        return cls(
+            data.get("wxid", ""),
+            data.get("nickname", ""),
+            sys.intern(data.get("manager_wxid", "")),
+            data.get("total_member", 0),
+            data.get("avatar", ""),
+        )
+
+
+class Member(NamedTuple):
+    """群成员记录"""
+
+    wxid: str
+    """成员wxid"""
+    nickname: str
+    """群内昵称"""
+    avatar: str
+    """头像url"""
+    invite_by: str
+    """邀请人wxid"""
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Member":
+        return cls(
+            data.get("wxid", ""),
+            data.get("nickname", ""),
+            data.get("avatar", ""),
+            # 邀请人大量重复，驻留后只保留一份
+            sys.intern(data.get("invite_by", "")),
+        )
+
+
+_ECHO = re.compile(r'"echo"\s*:\s*"?(\d+)')
+_ECHO_BYTES = re.compile(_ECHO.pattern.encode())
+_SEPARATOR = re.compile(r"[\s,]*")
+_WHITESPACE = re.compile(r"\s*")
+
+_decoder = json.JSONDecoder()
+
+
+def peek_echo(data: Union[str, bytes]) -> Optional[int]:
+    """不解码json，从回调帧中找出echo"""
+    match = (_ECHO_BYTES if isinstance(data, bytes) else _ECHO).search(data)
+    return int(match.group(1)) if match else None
+
+
+def iter_items(frame: Any, convert: Callable[[Dict[str, Any]], T]) -> Iterator[T]:
+    """逐项解析回调中的列表，每项解析后立即转换为记录
+
+    参数:
+        frame: 回调原始数据，或已解码的回调（二进制帧）
+        convert: 将单项字典转换为记录的函数
+
+    返回:
+        记录迭代器，data为包含member_list的字典时迭代member_list
+
+    异常:
+        ActionFailed: API 调用失败
+    """
+    if not isinstance(frame, (str, bytes)):
+        yield from (convert(item) for item in item_list(handle_api_result(frame)))
+        return
+    text = frame.decode() if isinstance(frame, bytes) else frame
+    index = _find_list(text)
+    if index is None:
+        # 调用失败、data不是列表或字段顺序不符合预期时，直接完整解码
+        result = handle_api_result(json.loads(text))
+        yield from (convert(item) for item in item_list(result))
+        return
+    decode = _decoder.raw_decode
+    skip = _SEPARATOR.match
+    while True:
+        index = cast(Match[str], skip(text, index)).end()
+        if index >= len(text) or text[index] == "]":
+            return
+        item, index = decode(text, index)
+        yield convert(item)
+
+
+def _find_list(text: str) -> Optional[int]:
+    """逐个字段解析顶层对象，找到要逐项解析的列表
+
+    只有在data之前读到成功的status时才返回，data为字典时在其中查找member_list
+
+    返回:
+        列表第一项的位置，无法确定时返回None
+    """
+    status = None
+    index = _skip_space(text, 0)
+    if not text.startswith("{", index):
+        return None
+    index += 1
+    while True:
+        item = _next_key(text, index)
+        if item is None:
+            return None
+        key, index = item
+        if key != "data":
+            value, index = _decoder.raw_decode(text, index)
+            if key == "status":
+                status = value
+            continue
+        if status is None or status == "failed":
+            return None
+        if text.startswith("[", index):
+            return index + 1
+        if not text.startswith("{", index):
+            return None
+        # data为字典时，跳过member_list之前的字段（room_wxid等）
+        index += 1
+        while True:
+            item = _next_key(text, index)
+            if item is None:
+                return None
+            key, index = item
+            if key == "member_list":
+                return index + 1 if text.startswith("[", index) else None
+            _, index = _decoder.raw_decode(text, index)
+
+
+def _skip_space(text: str, index: int) -> int:
+    return cast(Match[str], _WHITESPACE.match(text, index)).end()
+
+
+def _next_key(text: str, index: int) -> Optional[Tuple[str, int]]:
+    """读取对象中的下一个键，返回键与值的起始位置，对象结束时返回None"""
+    index = cast(Match[str], _SEPARATOR.match(text, index)).end()
+    if not text.startswith('"', index):
+        return None
+    key, index = _decoder.raw_decode(text, index)
+    index = _skip_space(text, index)
+    if not text.startswith(":", index):
+        return None
+    return key, _skip_space(text, index + 1)
+
+
+def item_list(result: Any) -> List[Dict[str, Any]]:
+    """从api返回数据中取出列表，兼容返回列表或包含member_list的字典"""
+    if isinstance(result, dict):
+        return result.get("member_list") or []
+    return result or []
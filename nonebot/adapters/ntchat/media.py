@@ -0,0 +1,229 @@
+"""媒体文件存储
+将bytes媒体按内容哈希保存到与ntchat共享的目录，以文件路径代替base64发送
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, Tuple, Union
+
+CHUNK_SIZE = 1024 * 1024
+"""写入文件时的分块大小"""
+MEDIA_NAME = re.compile(r"[0-9a-f]{64}(\.[0-9A-Za-z]+)?")
+"""保存的媒体文件名，sha256哈希加可选的后缀，目录中的其他文件不会被索引或删除"""
+
+
+class MediaStore:
+    """
+    按内容哈希命名的媒体文件目录，相同内容只保存一次，按总大小淘汰最久未使用的文件
+
+    消息段构造时保存文件，发送时才由ntchat读取，最近保存或复用的文件在evict_grace内不会被淘汰
+
+    大文件的保存在线程池中进行，索引与统计的修改都在 `lock` 内完成，哈希与写入文件不持有锁
+    """
+
+    def __init__(self) -> None:
+        self.directory: Optional[Path] = None
+        """保存目录，为None时不启用"""
+        self.threshold: int = 0
+        """大于等于此大小的媒体才保存为文件"""
+        self.max_age: float = 86400
+        """文件保留时间，单位秒"""
+        self.max_bytes: int = 0
+        """文件占用的最大空间，0为不限制"""
+        self.evict_grace: float = 300
+        """文件保存或复用后至少保留的时间，单位秒"""
+        self.total_bytes: int = 0
+        """已保存文件的总大小"""
+        self.hits: int = 0
+        """命中已有文件的次数"""
+        self.misses: int = 0
+        """新保存文件的次数"""
+        self.bytes_saved: int = 0
+        """命中已有文件而省去写入的字节数"""
+        self._index: "OrderedDict[str, Tuple[Path, int, float]]" = OrderedDict()
+        """按使用顺序排列的文件索引，值为(路径, 大小, 最近使用时间)"""
+        self._last_cleanup: float = 0.0
+        self.lock = threading.Lock()
+        """保护索引、总大小与命中统计的锁"""
+
+    @property
+    def hit_rate(self) -> float:
+        """命中率"""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def configure(
+        self,
+        directory: Optional[Path],
+        threshold: int,
+        max_age: float,
+        max_bytes: int = 0,
+        evict_grace: float = 300,
+    ) -> None:
+        """设置保存目录与阈值，并从目录中已有的文件重建索引"""
+        self.directory = directory
+        self.threshold = threshold
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.evict_grace = evict_grace
+        with self.lock:
+            self._index.clear()
+            self.total_bytes = 0
+        if directory is not None:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._load_index()
+
+    def _load_index(self) -> None:
+        """按修改时间从旧到新索引目录中已有的文件，重启后仍计入总大小并可被复用"""
+        assert self.directory is not None
+        entries = []
+        for entry in os.scandir(self.directory):
+            try:
+                if not entry.is_file() or not MEDIA_NAME.fullmatch(entry.name):
+                    continue
+                stat = entry.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, entry.name, stat.st_size))
+        with self.lock:
+            for mtime, name, size in sorted(entries):
+                path = (self.directory / name).resolve()
+                self._index[name] = (path, size, mtime)
+                self.total_bytes += size
+            self._evict()
+
+    def accept(self, size: int) -> bool:
+        """该大小的媒体是否应保存为文件"""
+        return self.directory is not None and size >= self.threshold
+
+    def save(self, data: Union[bytes, BytesIO], suffix: str = "") -> Path:
+        """分块写入文件，返回按内容哈希命名的文件路径
+
+        参数:
+            data: 媒体内容
+            suffix: 文件后缀
+
+        返回:
+            文件路径，内容相同的文件已存在时直接返回
+        """
+        assert self.directory is not None
+        view = data.getbuffer() if isinstance(data, BytesIO) else memoryview(data)
+        size = len(view)
+        try:
+            digest = hashlib.sha256()
+            for start in range(0, len(view), CHUNK_SIZE):
+                digest.update(view[start : start + CHUNK_SIZE])
+            key = f"{digest.hexdigest()}{suffix}"
+            with self.lock:
+                path = self._lookup(key)
+                if path is not None:
+                    self.hits += 1
+                    self.bytes_saved += size
+                    return path
+                self.misses += 1
+            path = self._write(key, view)
+        finally:
+            view.release()
+        with self.lock:
+            self._add(key, path, size)
+            self._evict()
+        self._maybe_cleanup()
+        return path
+
+    def _lookup(self, key: str) -> Optional[Path]:
+        """查找已保存的文件，找到时刷新使用顺序与修改时间，需持有锁"""
+        item = self._index.get(key)
+        if item is None:
+            return None
+        path, size, _ = item
+        try:
+            # 刷新修改时间，避免被清理
+            os.utime(path)
+        except OSError:
+            del self._index[key]
+            self.total_bytes -= size
+            return None
+        self._index[key] = (path, size, time.time())
+        self._index.move_to_end(key)
+        return path
+
+    def _write(self, key: str, view: memoryview) -> Path:
+        """写入临时文件后替换为目标文件，不修改索引"""
+        assert self.directory is not None
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for start in range(0, len(view), CHUNK_SIZE):
+                    f.write(view[start : start + CHUNK_SIZE])
+            path = (self.directory / key).resolve()
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return path
+
+    def _add(self, key: str, path: Path, size: int) -> None:
+        """将写入的文件加入索引，需持有锁"""
+        # 相同内容可能在多个线程中同时写入，只计入一次
+        if key not in self._index:
+            self.total_bytes += size
+        self._index[key] = (path, size, time.time())
+        self._index.move_to_end(key)
+
+    def _evict(self) -> None:
+        """删除最久未使用的文件，直到总大小不超过上限，不删除evict_grace内使用过的文件，需持有锁"""
+        grace = time.time() - self.evict_grace
+        while self.max_bytes and self.total_bytes > self.max_bytes:
+            if len(self._index) <= 1:
+                break
+            key = next(iter(self._index))
+            path, size, used = self._index[key]
+            if used > grace:
+                # 其余文件使用得更晚，暂时超出上限，之后的保存再淘汰
+                break
+            del self._index[key]
+            self.total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def _maybe_cleanup(self) -> None:
+        now = time.time()
+        with self.lock:
+            if now - self._last_cleanup < self.max_age / 10:
+                return
+            self._last_cleanup = now
+        self.cleanup(now)
+
+    def cleanup(self, now: Optional[float] = None) -> None:
+        """删除超过保留时间的媒体文件，只删除索引中或按内容哈希命名的文件"""
+        if self.directory is None:
+            return
+        expire = (now or time.time()) - self.max_age
+        for entry in os.scandir(self.directory):
+            if entry.name not in self._index and not MEDIA_NAME.fullmatch(entry.name):
+                continue
+            # 在锁内检查修改时间并删除，避免删除其他线程刚复用的文件
+            with self.lock:
+                try:
+                    if not entry.is_file() or os.stat(entry.path).st_mtime >= expire:
+                        continue
+                    os.remove(entry.path)
+                except OSError:
+                    continue
+                item = self._index.pop(entry.name, None)
+                if item is not None:
+                    self.total_bytes -= item[1]
+
+
+media_store = MediaStore()
+"""媒体文件存储，由适配器根据配置启用"""
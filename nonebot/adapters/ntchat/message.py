@@ -8,6 +8,53 @@ from nonebot.typing import overrides
 from nonebot.adapters import Message as BaseMessage
 from nonebot.adapters import MessageSegment as BaseMessageSegment
 
+from .media import media_store
+
+AT_PLACEHOLDER = "{$@}"
+"""群@消息中@的占位字符串"""
+SPLIT_DELIMITERS = ("\n", "。！？!?", "；;，, ")
+"""拆分过长文本时优先使用的分隔字符，按优先级排列"""
+
+
+_MAGIC_SUFFIXES = (
+    (0, b"\x89PNG\r\n\x1a\n", ".png"),
+    (0, b"\xff\xd8\xff", ".jpg"),
+    (0, b"GIF87a", ".gif"),
+    (0, b"GIF89a", ".gif"),
+    (0, b"BM", ".bmp"),
+    (8, b"WEBP", ".webp"),
+    (4, b"ftyp", ".mp4"),
+    (0, b"%PDF-", ".pdf"),
+)
+"""按文件头识别的文件后缀，(偏移, 文件头, 后缀)"""
+
+
+def _guess_suffix(file: Union[bytes, BytesIO]) -> str:
+    """按文件头推断文件后缀，无法识别时为空"""
+    if isinstance(file, BytesIO):
+        with file.getbuffer() as view:
+            head = view[:16].tobytes()
+    else:
+        head = file[:16]
+    for offset, magic, suffix in _MAGIC_SUFFIXES:
+        if head.startswith(magic, offset):
+            return suffix
+    return ""
+
+
+def _to_file_str(file: Union[str, bytes, BytesIO, Path]) -> str:
+    """将媒体内容转换为ntchat可用的地址，bytes超过阈值时保存为文件，否则转为base64"""
+    if isinstance(file, (bytes, BytesIO)):
+        size = file.getbuffer().nbytes if isinstance(file, BytesIO) else len(file)
+        if media_store.accept(size):
+            return media_store.save(file, _guess_suffix(file)).as_uri()
+        if isinstance(file, BytesIO):
+            file = file.getvalue()
+        return f"base64://{b64encode(file).decode()}"
+    elif isinstance(file, Path):
+        return file.resolve().as_uri()
+    return file
+
 
 class MessageSegment(BaseMessageSegment["Message"]):
     """ntchat MessageSegment 适配。具体方法参考https://www.showdoc.com.cn/579570325733136/3417108506295223。"""
@@ -91,46 +138,22 @@ class MessageSegment(BaseMessageSegment["Message"]):
     @staticmethod
     def image(file_path: Union[str, bytes, BytesIO, Path]) -> "MessageSegment":
         """图片消息"""
-        if isinstance(file_path, BytesIO):
-            file_path = file_path.getvalue()
-        if isinstance(file_path, bytes):
-            file_path = f"base64://{b64encode(file_path).decode()}"
-        elif isinstance(file_path, Path):
-            file_path = file_path.resolve().as_uri()
-        return MessageSegment("image", {"file_path": file_path})
+        return MessageSegment("image", {"file_path": _to_file_str(file_path)})
 
     @staticmethod
     def file(file_path: Union[str, bytes, BytesIO, Path]) -> "MessageSegment":
         """文件消息"""
-        if isinstance(file_path, BytesIO):
-            file_path = file_path.getvalue()
-        if isinstance(file_path, bytes):
-            file_path = f"base64://{b64encode(file_path).decode()}"
-        elif isinstance(file_path, Path):
-            file_path = file_path.resolve().as_uri()
-        return MessageSegment("file", {"file_path": file_path})
+        return MessageSegment("file", {"file_path": _to_file_str(file_path)})
 
     @staticmethod
     def video(file_path: Union[str, bytes, BytesIO, Path]) -> "MessageSegment":
         """视频消息"""
-        if isinstance(file_path, BytesIO):
-            file_path = file_path.getvalue()
-        if isinstance(file_path, bytes):
-            file_path = f"base64://{b64encode(file_path).decode()}"
-        elif isinstance(file_path, Path):
-            file_path = file_path.resolve().as_uri()
-        return MessageSegment("video", {"file_path": file_path})
+        return MessageSegment("video", {"file_path": _to_file_str(file_path)})
 
     @staticmethod
     def gif(file: Union[str, bytes, BytesIO, Path]) -> "MessageSegment":
         """gif消息"""
-        if isinstance(file, BytesIO):
-            file = file.getvalue()
-        if isinstance(file, bytes):
-            file = f"base64://{b64encode(file).decode()}"
-        elif isinstance(file, Path):
-            file = file.resolve().as_uri()
-        return MessageSegment("file", {"file": file})
+        return MessageSegment("file", {"file": _to_file_str(file)})
 
     @staticmethod
     def xml(xml: str, app_type: int = 5) -> "MessageSegment":
@@ -174,3 +197,86 @@ class Message(BaseMessage[MessageSegment]):
     @overrides(BaseMessage)
     def _construct(msg: str) -> Iterable[MessageSegment]:
         yield MessageSegment.text(msg)
+
+    def normalize(self, max_length: int = 0) -> "Message":
+        """合并相邻的文本与群@消息段，并拆分过长的文本，减少api调用次数
+
+        参数:
+            max_length: 单条文本最大长度，0为不拆分
+
+        返回:
+            新的Message，不修改原消息
+        """
+        merged = Message()
+        for segment in self:
+            if merged and _can_merge(merged[-1], segment):
+                merged[-1] = _merge(merged[-1], segment)
+            else:
+                merged.append(segment)
+        if max_length <= 0:
+            return merged
+
+        result = Message()
+        for segment in merged:
+            if segment.is_text() and len(segment.data["content"]) > max_length:
+                result.extend(_split(segment, max_length))
+            else:
+                result.append(segment)
+        return result
+
+
+def _can_merge(first: MessageSegment, second: MessageSegment) -> bool:
+    """两个相邻消息段是否可以合并为一条"""
+    if not (first.is_text() and second.is_text()):
+        return False
+    if first.type == second.type:
+        return True
+    # 文本合并进群@消息时，文本中不能含有占位字符串
+    text = first if first.type == "text" else second
+    return AT_PLACEHOLDER not in text.data["content"]
+
+
+def _merge(first: MessageSegment, second: MessageSegment) -> MessageSegment:
+    """合并两个相邻的文本或群@消息段"""
+    content = first.data["content"] + second.data["content"]
+    if first.type == "text" and second.type == "text":
+        return MessageSegment.text(content)
+    at_list = first.data.get("at_list", []) + second.data.get("at_list", [])
+    return MessageSegment.room_at_msg(content, at_list)
+
+
+def _split_content(content: str, max_length: int) -> List[str]:
+    """在安全的位置将文本拆分为不超过max_length的多段，不拆开占位字符串"""
+    chunks = []
+    while len(content) > max_length:
+        cut = max_length
+        for delimiters in SPLIT_DELIMITERS:
+            pos = max(content.rfind(d, 0, max_length) for d in delimiters)
+            if pos > 0:
+                cut = pos + 1
+                break
+        start = content.find(AT_PLACEHOLDER, max(cut - len(AT_PLACEHOLDER) + 1, 0))
+        if 0 <= start < cut:
+            cut = start if start > 0 else start + len(AT_PLACEHOLDER)
+        chunks.append(content[:cut])
+        content = content[cut:]
+    if content:
+        chunks.append(content)
+    return chunks
+
+
+def _split(segment: MessageSegment, max_length: int) -> List[MessageSegment]:
+    """拆分过长的文本或群@消息段，群@消息的at_list按占位字符串分配到各段"""
+    chunks = _split_content(segment.data["content"], max_length)
+    if segment.type == "text":
+        return [MessageSegment.text(chunk) for chunk in chunks]
+    at_list: List[str] = segment.data.get("at_list", [])
+    result = []
+    for chunk in chunks:
+        count = chunk.count(AT_PLACEHOLDER)
+        if count:
+            result.append(MessageSegment.room_at_msg(chunk, at_list[:count]))
+            at_list = at_list[count:]
+        else:
+            result.append(MessageSegment.text(chunk))
+    return result
@@ -0,0 +1,315 @@
+"""运行指标
+以Prometheus文本格式导出事件接收、分发与api调用的指标
+
+所有指标只在事件循环线程中更新，不需要加锁
+"""
+
+from bisect import bisect_left
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+Labels = Tuple[str, ...]
+
+LATENCY_BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.05,
+    0.1,
+    0.5,
+    1.0,
+    5.0,
+    10.0,
+    30.0,
+)
+"""延迟直方图的默认分桶，单位秒"""
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = (
+        '{}="{}"'.format(
+            name,
+            str(value)
+            .replace("\\", "\\\\")
+            .replace('"', '\\"')
+            .replace("\n", "\\n"),
+        )
+        for name, value in zip(names, values)
+    )
+    return "{" + ",".join(pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    指标基类
+    """
+
+    type: str = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        self.name: str = name
+        """指标名称"""
+        self.documentation: str = documentation
+        """指标说明"""
+        self.labelnames: Labels = labelnames
+        """标签名称"""
+        self.enabled: bool = True
+        """是否记录，关闭时更新操作直接返回"""
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+    def render(self) -> Iterator[str]:
+        """输出该指标的文本格式"""
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.type}"
+        yield from self.samples()
+
+
+class Counter(Metric):
+    """
+    计数器，按标签分别累加
+    """
+
+    type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Labels = ()) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.values: Dict[Labels, float] = {}
+        """各标签的计数"""
+
+    def inc(self, labels: Labels = (), value: float = 1) -> None:
+        """增加计数"""
+        if self.enabled:
+            self.values[labels] = self.values.get(labels, 0) + value
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.values.items():
+            yield (
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+
+
+class Histogram(Metric):
+    """
+    直方图，按标签分别统计各分桶的数量
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        """分桶上界，不含+Inf"""
+        self.values: Dict[Labels, List[float]] = {}
+        """各标签的分桶计数，最后两项为总和与总数"""
+
+    def observe(self, labels: Labels, value: float) -> None:
+        """记录一个观测值"""
+        if not self.enabled:
+            return
+        counts = self.values.get(labels)
+        if counts is None:
+            counts = self.values[labels] = [0] * (len(self.buckets) + 3)
+        counts[bisect_left(self.buckets, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def samples(self) -> Iterator[str]:
+        names = self.labelnames + ("le",)
+        for labels, counts in self.values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = _format_value(bound)
+                yield (
+                    f"{self.name}_bucket{_format_labels(names, labels + (le,))} "
+                    f"{_format_value(cumulative)}"
+                )
+            suffix = _format_labels(self.labelnames, labels)
+            yield f"{self.name}_sum{suffix} {_format_value(counts[-2])}"
+            yield f"{self.name}_count{suffix} {_format_value(counts[-1])}"
+
+
+class Gauge(Metric):
+    """
+    仪表，导出时调用函数获取当前值
+    """
+
+    type = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels,
+        func: Callable[[], Iterable[Tuple[Labels, float]]],
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.func = func
+        """返回(标签, 当前值)的函数"""
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in self.func():
+            yield (
+                f"{self.name}{_format_labels(self.labelnames, labels)} "
+                f"{_format_value(value)}"
+            )
+
+
+class FuncCounter(Gauge):
+    """
+    计数器，导出时调用函数获取当前累计值，用于导出其他对象自行维护的计数
+    """
+
+    type = "counter"
+
+
+M = TypeVar("M", bound=Metric)
+
+
+class Metrics:
+    """
+    适配器的指标集合
+    """
+
+    def __init__(self, enabled: bool = True) -> None:
+        self.metrics: List[Metric] = []
+        """已注册的指标"""
+        self.events = self.register(
+            Counter(
+                "ntchat_events_received_total",
+                "Events received, by bot and event model",
+                ("bot", "event"),
+            )
+        )
+        """接收事件数"""
+        self.duplicates = self.register(
+            Counter(
+                "ntchat_events_duplicate_total",
+                "Duplicate messages dropped at ingest, by bot",
+                ("bot",),
+            )
+        )
+        """丢弃的重复消息数"""
+        self.decode_seconds = self.register(
+            Histogram(
+                "ntchat_event_decode_seconds",
+                "Time spent decoding event json, by event model",
+                ("event",),
+            )
+        )
+        """事件json解码耗时"""
+        self.parse_seconds = self.register(
+            Histogram(
+                "ntchat_event_parse_seconds",
+                "Time spent building event objects, by event model",
+                ("event",),
+            )
+        )
+        """事件对象构造耗时"""
+        self.api_seconds = self.register(
+            Histogram(
+                "ntchat_api_call_seconds",
+                "Api call latency excluding send rate limiting, by action",
+                ("action",),
+            )
+        )
+        """api调用耗时"""
+        self.api_timeouts = self.register(
+            Counter(
+                "ntchat_api_call_timeouts_total",
+                "Api calls that timed out, by action",
+                ("action",),
+            )
+        )
+        """api调用超时数"""
+        self.api_errors = self.register(
+            Counter(
+                "ntchat_api_call_errors_total",
+                "Api calls that failed, by action",
+                ("action",),
+            )
+        )
+        """api调用失败数"""
+        self.send_wait_seconds = self.register(
+            Histogram(
+                "ntchat_send_wait_seconds",
+                "Time sends waited in the rate limiting scheduler, by bot and priority",
+                ("bot", "priority"),
+            )
+        )
+        """发送调度排队时间"""
+        self.connects = self.register(
+            Counter(
+                "ntchat_websocket_connects_total",
+                "Accepted websocket connections, by bot",
+                ("bot",),
+            )
+        )
+        """websocket连接次数"""
+        self.set_enabled(enabled)
+
+    def register(self, metric: M) -> M:
+        """注册指标"""
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels,
+        func: Callable[[], Iterable[Tuple[Labels, float]]],
+    ) -> Gauge:
+        """注册导出时取值的仪表"""
+        return self.register(Gauge(name, documentation, labelnames, func))
+
+    def func_counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Labels,
+        func: Callable[[], Iterable[Tuple[Labels, float]]],
+    ) -> FuncCounter:
+        """注册导出时取值的计数器"""
+        return self.register(FuncCounter(name, documentation, labelnames, func))
+
+    def set_enabled(self, enabled: bool) -> None:
+        """开启或关闭指标记录"""
+        for metric in self.metrics:
+            metric.enabled = enabled
+
+    def render(self) -> str:
+        """以Prometheus文本格式输出所有指标"""
+        lines: List[str] = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
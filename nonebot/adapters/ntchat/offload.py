@@ -0,0 +1,109 @@
+"""执行器卸载
+将大数据量的编解码放到线程池或进程池中运行，避免阻塞事件循环
+"""
+
+import asyncio
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Callable, Optional, TypeVar, Union
+
+from .codec import (
+    BinaryCodec,
+    JsonCodec,
+    binary_codecs,
+    get_binary_codec,
+    get_codec,
+)
+
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=None)
+def _get_codec(name: str) -> Union[JsonCodec, BinaryCodec]:
+    if name in binary_codecs:
+        codec = get_binary_codec(name)
+        if codec is not None:
+            return codec
+    return get_codec(name)
+
+
+def codec_loads(name: str, data: Any) -> Any:
+    """使用指定编解码器解码，可在子进程中调用"""
+    return _get_codec(name).loads(data)
+
+
+def codec_dumps(name: str, obj: Any) -> Union[str, bytes]:
+    """使用指定编解码器编码，可在子进程中调用"""
+    return _get_codec(name).dumps(obj)
+
+
+def payload_size(obj: Any) -> int:
+    """估算数据大小，只统计str、bytes与顶层字典中的str、bytes值"""
+    if isinstance(obj, (str, bytes)):
+        return len(obj)
+    if isinstance(obj, BytesIO):
+        return obj.getbuffer().nbytes
+    if isinstance(obj, dict):
+        return sum(len(v) for v in obj.values() if isinstance(v, (str, bytes)))
+    return 0
+
+
+class Offloader:
+    """
+    执行器卸载，数据大小超过阈值时在执行器中运行
+    """
+
+    def __init__(
+        self, threshold: int, executor: str = "thread", workers: Optional[int] = None
+    ) -> None:
+        self.threshold: int = threshold
+        """卸载阈值，0为不卸载"""
+        self.executor: str = executor
+        """执行器类型，thread或process"""
+        self.workers: Optional[int] = workers
+        """执行器worker数量"""
+        self.offloaded: int = 0
+        """已卸载的调用数"""
+        self._executor: Optional[Executor] = None
+        self._thread_executor: Optional[Executor] = None
+
+    def should_offload(self, size: int) -> bool:
+        """该大小的数据是否需要卸载"""
+        return 0 < self.threshold <= size
+
+    def _get_executor(self, local: bool) -> Executor:
+        if local or self.executor != "process":
+            if self._thread_executor is None:
+                self._thread_executor = ThreadPoolExecutor(self.workers)
+            return self._thread_executor
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(self.workers)
+        return self._executor
+
+    async def run(
+        self, size: int, func: Callable[..., T], *args: Any, local: bool = False
+    ) -> T:
+        """运行函数，数据大小超过阈值时在执行器中运行
+
+        参数:
+            size: 数据大小
+            func: 要运行的函数
+            args: 函数参数
+            local: 是否必须在当前进程中运行（线程池）
+
+        返回:
+            函数返回值
+        """
+        if not self.should_offload(size):
+            return func(*args)
+        self.offloaded += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(local), func, *args)
+
+    def shutdown(self) -> None:
+        """关闭执行器"""
+        for executor in (self._executor, self._thread_executor):
+            if executor is not None:
+                executor.shutdown(wait=False)
+        self._executor = self._thread_executor = None
@@ -0,0 +1,278 @@
+"""上报记录与回放
+将收到的原始数据按长度前缀格式追加到滚动日志，用于复现线上问题与基于真实流量的测试
+
+记录格式：每条为 `>dBHI` 头（接收时间、帧格式、bot id长度、数据长度）+ bot id + 原始数据，
+启用压缩时整个文件为gzip流
+
+回放：
+    python -m nonebot.adapters.ntchat.recorder records/*.rec.gz --speed 1
+"""
+
+import argparse
+import asyncio
+import gzip
+import queue
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import (
+    IO,
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from .utils import log
+
+if TYPE_CHECKING:
+    from .adapter import Adapter
+
+HEADER = struct.Struct(">dBHI")
+"""记录头：接收时间、帧格式、bot id长度、数据长度"""
+
+FORMATS = ("json", "msgpack", "cbor")
+"""帧格式，记录中保存其序号"""
+
+Record = Tuple[float, str, str, bytes]
+
+
+class Recorder:
+    """
+    在后台线程中写入上报记录，按大小滚动文件
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_bytes: int,
+        max_files: int,
+        compress: bool = True,
+        queue_size: int = 10000,
+    ) -> None:
+        self.directory: Path = directory
+        """记录目录"""
+        self.max_bytes: int = max_bytes
+        """单个文件写入的最大字节数（压缩前）"""
+        self.max_files: int = max_files
+        """保留的文件数，0为不限制"""
+        self.compress: bool = compress
+        """是否使用gzip压缩"""
+        self.recorded: int = 0
+        """已写入的记录数"""
+        self.dropped: int = 0
+        """写入队列已满时丢弃的记录数"""
+        self._queue: "queue.Queue[Optional[Record]]" = queue.Queue(queue_size)
+        self._raw: Optional[IO[bytes]] = None
+        self._file: Optional[IO[bytes]] = None
+        self._written: int = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """启动写入线程"""
+        if self._thread is None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._thread = threading.Thread(
+                target=self._run, name="ntchat-recorder", daemon=True
+            )
+            self._thread.start()
+
+    def record(
+        self, self_id: str, data: Union[str, bytes], frame_format: str = "json"
+    ) -> None:
+        """记录一条原始数据，只做入队，不会阻塞事件循环"""
+        if isinstance(data, str):
+            data = data.encode()
+        try:
+            self._queue.put_nowait((time.time(), frame_format, self_id, data))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """写完队列中的记录并停止写入线程"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                # 空闲时刷新缓冲，避免进程崩溃时丢失过多记录
+                if self._file is not None:
+                    self._file.flush()
+                continue
+            if item is None:
+                break
+            try:
+                self._write(item)
+            except OSError as e:
+                log("ERROR", "Failed to write record", e)
+        self._close_file()
+
+    def _close_file(self) -> None:
+        if self._file is not None and self._file is not self._raw:
+            self._file.close()
+        if self._raw is not None:
+            self._raw.close()
+        self._file = self._raw = None
+
+    def _write(self, item: Record) -> None:
+        received, frame_format, self_id, data = item
+        bot_id = self_id.encode()
+        if self._file is None or self._written >= self.max_bytes:
+            self._rotate()
+        assert self._file is not None
+        self._file.write(
+            HEADER.pack(received, FORMATS.index(frame_format), len(bot_id), len(data))
+        )
+        self._file.write(bot_id)
+        self._file.write(data)
+        self._written += HEADER.size + len(bot_id) + len(data)
+        self.recorded += 1
+
+    def _rotate(self) -> None:
+        self._close_file()
+        suffix = ".rec.gz" if self.compress else ".rec"
+        name = time.strftime("ntchat-%Y%m%d-%H%M%S", time.localtime())
+        path = self.directory / f"{name}{suffix}"
+        index = 1
+        while path.exists():
+            path = self.directory / f"{name}-{index}{suffix}"
+            index += 1
+        self._raw = path.open("wb")
+        self._file = self._raw
+        if self.compress:
+            self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        self._written = 0
+        self._cleanup()
+
+    def _cleanup(self) -> None:
+        if self.max_files <= 0:
+            return
+        files = sorted(
+            (p for p in self.directory.glob("ntchat-*.rec*") if p.is_file()),
+            key=lambda p: p.stat().st_mtime,
+        )
+        for path in files[: -self.max_files]:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def read_records(path: Path) -> Iterator[Record]:
+    """读取记录文件，文件末尾不完整的记录会被忽略
+
+    参数:
+        path: 记录文件路径
+
+    返回:
+        (接收时间, 帧格式, bot id, 原始数据) 迭代器
+    """
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        while True:
+            try:
+                header = f.read(HEADER.size)
+            except EOFError:
+                return
+            if len(header) < HEADER.size:
+                return
+            received, index, id_size, data_size = HEADER.unpack(header)
+            try:
+                body = f.read(id_size + data_size)
+            except EOFError:
+                return
+            if len(body) < id_size + data_size:
+                return
+            yield received, FORMATS[index], body[:id_size].decode(), body[id_size:]
+
+
+async def replay(
+    adapter: "Adapter", paths: Iterable[Path], speed: float = 0
+) -> Dict[str, float]:
+    """将记录回放到适配器
+
+    参数:
+        adapter: 适配器
+        paths: 记录文件，按顺序回放
+        speed: 回放速度倍数，0为尽快回放
+
+    返回:
+        回放统计
+    """
+    from .bot import Bot
+    from .codec import get_binary_codec
+
+    bots: Dict[str, Bot] = {}
+    loaders: Dict[str, Callable[[bytes], Any]] = {}
+    count = events = 0
+    first: Optional[float] = None
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    for path in paths:
+        for received, frame_format, self_id, data in read_records(path):
+            if speed > 0:
+                if first is None:
+                    first = received
+                delay = started + (received - first) / speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            count += 1
+            loads = loaders.get(frame_format)
+            if loads is None:
+                codec = get_binary_codec(frame_format)
+                loads = loaders[frame_format] = (
+                    codec.loads if codec is not None else adapter.codec.loads
+                )
+            event = adapter.json_to_event(loads(data), self_id)
+            if event is None:
+                continue
+            bot = bots.get(self_id)
+            if bot is None:
+                bot = bots[self_id] = Bot(adapter, self_id)
+                adapter.bot_connect(bot)
+            await bot.handle_event(event)
+            events += 1
+    for self_id in bots:
+        adapter.bot_disconnect(bots[self_id])
+    elapsed = loop.time() - started
+    return {
+        "records": count,
+        "events": events,
+        "seconds": elapsed,
+        "events_per_second": events / elapsed if elapsed else 0.0,
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="replay recorded ntchat frames")
+    parser.add_argument("paths", type=Path, nargs="+", help="记录文件")
+    parser.add_argument("--speed", type=float, default=0, help="回放速度倍数，0为尽快回放")
+    parser.add_argument("--plugins", type=Path, help="加载插件的目录")
+    args = parser.parse_args(argv)
+
+    import nonebot
+
+    from .adapter import Adapter
+
+    nonebot.init()
+    adapter = Adapter(nonebot.get_driver())
+    if args.plugins:
+        nonebot.load_plugins(str(args.plugins))
+    print(asyncio.run(replay(adapter, args.paths, args.speed)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""发送调度
+按bot与接收方限制发送速率，避免触发微信风控
+"""
+
+import asyncio
+from collections import OrderedDict, deque
+from typing import Deque, Dict, List, Optional
+
+from .exception import NetworkError
+
+PRIORITY_REPLY = 0
+"""回复消息优先级"""
+PRIORITY_NORMAL = 1
+"""主动发送消息优先级"""
+PRIORITY_NAMES = ("reply", "normal")
+"""各优先级名称，用于指标标签"""
+
+
+def priority_level(priority: int) -> int:
+    """将优先级限制在已有的优先级范围内"""
+    return min(max(priority, 0), PRIORITY_NORMAL)
+
+
+class TokenBucket:
+    """
+    令牌桶，rate为0时不限制
+    """
+
+    def __init__(self, rate: float, burst: int, now: float) -> None:
+        self.rate: float = rate
+        """每秒生成令牌数"""
+        self.burst: float = max(burst, 1)
+        """令牌上限"""
+        self.tokens: float = self.burst
+        """当前令牌数"""
+        self.updated: float = now
+        """上次更新时间"""
+
+    def delay(self, now: float) -> float:
+        """距离下一个令牌可用的时间，0为当前可用"""
+        if self.rate <= 0:
+            return 0.0
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def consume(self) -> None:
+        """消耗一个令牌"""
+        if self.rate > 0:
+            self.tokens -= 1
+
+    @property
+    def full(self) -> bool:
+        """令牌是否已满"""
+        return self.tokens >= self.burst
+
+
+class SendScheduler:
+    """
+    单个bot的发送调度器，高优先级先发送，同一优先级内各接收方轮流发送
+    """
+
+    def __init__(
+        self, rate: float, burst: int, user_rate: float, user_burst: int
+    ) -> None:
+        loop = asyncio.get_event_loop()
+        self.bucket = TokenBucket(rate, burst, loop.time())
+        """bot令牌桶"""
+        self.user_rate: float = user_rate
+        """每个接收方每秒发送数"""
+        self.user_burst: int = user_burst
+        """每个接收方令牌上限"""
+        self.user_buckets: Dict[str, TokenBucket] = {}
+        """接收方令牌桶"""
+        self.queues: List["OrderedDict[str, Deque[asyncio.Future]]"] = [
+            OrderedDict() for _ in range(PRIORITY_NORMAL + 1)
+        ]
+        """各优先级等待队列，按接收方分组"""
+        self.sent: int = 0
+        """已放行的发送数"""
+        self.wait_total: float = 0.0
+        """累计排队时间"""
+        self.wait_max: float = 0.0
+        """最长排队时间"""
+        self._wakeup = asyncio.Event()
+        self._task: Optional["asyncio.Task"] = None
+
+    @property
+    def pending(self) -> int:
+        """排队中的发送数"""
+        return sum(len(w) for queue in self.queues for w in queue.values())
+
+    @property
+    def wait_avg(self) -> float:
+        """平均排队时间"""
+        return self.wait_total / self.sent if self.sent else 0.0
+
+    async def acquire(self, to_wxid: str, priority: int = PRIORITY_NORMAL) -> float:
+        """等待直到可以向接收方发送
+
+        参数:
+            to_wxid: 接收方wxid
+            priority: 优先级，越小越优先
+
+        返回:
+            排队时间，单位秒
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        priority = priority_level(priority)
+        self.queues[priority].setdefault(to_wxid, deque()).append(future)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._wakeup.set()
+
+        started = loop.time()
+        await future
+        wait = loop.time() - started
+        self.sent += 1
+        self.wait_total += wait
+        if wait > self.wait_max:
+            self.wait_max = wait
+        return wait
+
+    def _get_bucket(self, to_wxid: str, now: float) -> TokenBucket:
+        bucket = self.user_buckets.get(to_wxid)
+        if bucket is None:
+            if len(self.user_buckets) >= 4096:
+                # 令牌已满的桶与新建的桶等价，可以直接丢弃
+                for key in [k for k, b in self.user_buckets.items() if b.full]:
+                    del self.user_buckets[key]
+            bucket = TokenBucket(self.user_rate, self.user_burst, now)
+            self.user_buckets[to_wxid] = bucket
+        return bucket
+
+    def _release_one(self, now: float) -> Optional[float]:
+        """放行一个发送，返回None表示已放行，否则返回需要等待的时间"""
+        delay = self.bucket.delay(now)
+        if delay > 0:
+            return delay
+        delay = float("inf")
+        for queue in self.queues:
+            for to_wxid in list(queue):
+                waiters = queue[to_wxid]
+                while waiters and waiters[0].done():
+                    waiters.popleft()
+                if not waiters:
+                    del queue[to_wxid]
+                    continue
+                bucket = self._get_bucket(to_wxid, now)
+                user_delay = bucket.delay(now)
+                if user_delay > 0:
+                    delay = min(delay, user_delay)
+                    continue
+                bucket.consume()
+                self.bucket.consume()
+                waiters.popleft().set_result(None)
+                if waiters:
+                    queue.move_to_end(to_wxid)
+                else:
+                    del queue[to_wxid]
+                return None
+        return delay
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            delay = self._release_one(loop.time())
+            if delay is None:
+                continue
+            self._wakeup.clear()
+            if delay == float("inf"):
+                await self._wakeup.wait()
+            else:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def stop(self) -> None:
+        """停止调度，排队中的发送将失败"""
+        for queue in self.queues:
+            for waiters in queue.values():
+                for future in waiters:
+                    if not future.done():
+                        future.set_exception(NetworkError("Send scheduler stopped"))
+            queue.clear()
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
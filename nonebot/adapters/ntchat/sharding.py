@@ -0,0 +1,91 @@
+"""多进程分片
+由supervisor启动的worker进程通过环境变量获知自身编号与其他worker地址，
+bot按X-Self-ID固定分配到某个worker
+"""
+
+import hmac
+import json
+import os
+import zlib
+from typing import Dict, List, Optional
+
+WORKER_ID_ENV = "NTCHAT_WORKER_ID"
+"""当前worker编号"""
+WORKER_URLS_ENV = "NTCHAT_WORKER_URLS"
+"""所有worker的http地址，json列表"""
+WORKER_ASSIGNMENTS_ENV = "NTCHAT_WORKER_ASSIGNMENTS"
+"""手动指定的bot分配，json对象，wxid -> worker编号"""
+WORKER_SECRET_ENV = "NTCHAT_WORKER_SECRET"
+"""supervisor生成的密钥，worker之间及supervisor调用worker接口时校验"""
+WORKER_SECRET_HEADER = "X-Worker-Secret"
+"""携带worker密钥的请求头"""
+
+
+def get_worker_index(
+    self_id: str, workers: int, assignments: Optional[Dict[str, int]] = None
+) -> int:
+    """获取bot所属的worker编号
+
+    参数:
+        self_id: bot的wxid
+        workers: worker数量
+        assignments: 手动指定的分配，优先于哈希分配
+
+    返回:
+        worker编号
+    """
+    if assignments and self_id in assignments:
+        return assignments[self_id] % workers
+    return zlib.crc32(self_id.encode()) % workers
+
+
+class WorkerInfo:
+    """
+    当前worker进程的分片信息
+    """
+
+    def __init__(
+        self,
+        worker_id: int,
+        urls: List[str],
+        assignments: Dict[str, int],
+        secret: str = "",
+    ) -> None:
+        self.worker_id: int = worker_id
+        """当前worker编号"""
+        self.urls: List[str] = urls
+        """所有worker的http地址"""
+        self.assignments: Dict[str, int] = assignments
+        """手动指定的bot分配"""
+        self.secret: str = secret
+        """worker接口的密钥"""
+
+    @classmethod
+    def from_env(cls) -> Optional["WorkerInfo"]:
+        """从环境变量读取，不是由supervisor启动时返回None"""
+        worker_id = os.environ.get(WORKER_ID_ENV)
+        if worker_id is None:
+            return None
+        return cls(
+            int(worker_id),
+            json.loads(os.environ.get(WORKER_URLS_ENV, "[]")),
+            json.loads(os.environ.get(WORKER_ASSIGNMENTS_ENV, "{}")),
+            os.environ.get(WORKER_SECRET_ENV, ""),
+        )
+
+    def to_env(self) -> Dict[str, str]:
+        """转换为传给worker进程的环境变量"""
+        return {
+            WORKER_ID_ENV: str(self.worker_id),
+            WORKER_URLS_ENV: json.dumps(self.urls),
+            WORKER_ASSIGNMENTS_ENV: json.dumps(self.assignments),
+            WORKER_SECRET_ENV: self.secret,
+        }
+
+    def check_secret(self, secret: Optional[str]) -> bool:
+        """校验请求携带的worker密钥"""
+        return bool(self.secret) and hmac.compare_digest(self.secret, secret or "")
+
+    def owner(self, self_id: str) -> int:
+        """bot所属的worker编号"""
+        return get_worker_index(self_id, len(self.urls), self.assignments)
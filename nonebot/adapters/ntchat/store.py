@@ -3,36 +3,120 @@
 
 import asyncio
 import sys
-from typing import Any, Dict, Optional, Tuple
+from typing import Any, Dict, Optional, Set, Tuple, Union
 
-from .exception import NetworkError
+from .exception import ApiTimeout, NetworkError
 
 
 class ResultStore:
+    """
+    单个bot的api回调存储
+    """
+
     def __init__(self) -> None:
         self._seq: int = 1
-        self._futures: Dict[Tuple[str, int], asyncio.Future] = {}
+        self._futures: Dict[int, Tuple[float, asyncio.Future]] = {}
+        self._raw: Set[int] = set()
+        self._registered = asyncio.Event()
+        self.late: int = 0
+        """调用结束（超时或连接断开）后才到达的回调数"""
+        self.unknown: int = 0
+        """echo无法识别的回调数"""
+
+    @property
+    def in_flight(self) -> int:
+        """等待回调的api调用数"""
+        return len(self._futures)
+
+    @property
+    def oldest_age(self) -> float:
+        """等待最久的api调用已等待的时间，无调用时为0"""
+        for started, _ in self._futures.values():
+            return asyncio.get_event_loop().time() - started
+        return 0.0
+
+    @property
+    def streaming(self) -> bool:
+        """是否有等待原始回调数据的api调用"""
+        return bool(self._raw)
+
+    def wants_raw(self, seq: int) -> bool:
+        """该api调用是否需要未解码的回调数据"""
+        return seq in self._raw
+
+    async def wait_call(self) -> None:
+        """等待下一个api调用开始等待回调"""
+        self._registered.clear()
+        await self._registered.wait()
 
     def get_seq(self) -> int:
         s = self._seq
         self._seq = (self._seq + 1) % sys.maxsize
         return s
 
-    def add_result(self, self_id: str, result: Dict[str, Any]):
-        echo = result.get("echo")
-        if isinstance(echo, str) and echo.isdecimal():
-            future = self._futures.get((self_id, int(echo)))
-            if future:
-                future.set_result(result)
-
-    async def fetch(
-        self, self_id: str, seq: int, timeout: Optional[float]
-    ) -> Dict[str, Any]:
-        future = asyncio.get_event_loop().create_future()
-        self._futures[(self_id, seq)] = future
+    def add_result(self, result: Dict[str, Any]):
+        try:
+            seq = int(result.get("echo"))
+        except (TypeError, ValueError):
+            self.unknown += 1
+            return
+        item = self._futures.get(seq)
+        if item is None:
+            if 0 < seq < self._seq:
+                self.late += 1
+            else:
+                self.unknown += 1
+            return
+        future = item[1]
+        if not future.done():
+            future.set_result(result)
+
+    def add_raw(self, seq: int, data: Union[str, bytes]) -> None:
+        """设置未解码的回调数据"""
+        item = self._futures.get(seq)
+        if item is not None and not item[1].done():
+            item[1].set_result(data)
+
+    def register(self, seq: int, raw: bool = False) -> asyncio.Future:
+        """登记等待回调的api调用，需在发出请求前调用，避免回调先于登记到达
+
+        参数:
+            seq: 请求的echo
+            raw: 是否需要未解码的回调数据
+
+        返回:
+            回调到达时完成的future，需通过 `wait` 等待
+        """
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        self._futures[seq] = (loop.time(), future)
+        if raw:
+            self._raw.add(seq)
+        self._registered.set()
+        return future
+
+    def discard(self, seq: int) -> None:
+        """取消登记，请求未能发出时调用"""
+        self._futures.pop(seq, None)
+        self._raw.discard(seq)
+
+    async def wait(
+        self, seq: int, future: asyncio.Future, timeout: Optional[float]
+    ) -> Any:
+        """等待 `register` 登记的回调，超时或取消时取消登记
+
+        异常:
+            ApiTimeout: 等待超时
+        """
         try:
             return await asyncio.wait_for(future, timeout)
         except asyncio.TimeoutError:
-            raise NetworkError("WebSocket API call timeout") from None
+            raise ApiTimeout("WebSocket API call timeout") from None
         finally:
-            del self._futures[(self_id, seq)]
+            self.discard(seq)
+
+    def fail_all(self, msg: str) -> None:
+        """使所有等待中的api调用立即失败"""
+        for _, future in self._futures.values():
+            if not future.done():
+                future.set_exception(NetworkError(msg))
@@ -0,0 +1,293 @@
+"""多进程supervisor
+启动多个运行同一bot入口文件的worker进程，按X-Self-ID将ntchat的反向ws连接转发到固定的worker，
+并在worker退出后自动重启
+
+用法:
+    python -m nonebot.adapters.ntchat.supervisor bot.py --workers 4 --port 8080
+
+需要安装websockets，只转发反向ws连接，http post上报请直接发送到对应worker
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import secrets
+import signal
+import sys
+import time
+from http import HTTPStatus
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+import websockets
+from websockets.datastructures import Headers
+
+from .sharding import WORKER_SECRET_HEADER, WorkerInfo, get_worker_index
+
+FORWARD_HEADERS = ("X-Self-ID", "X-Frame-Format", "access_token")
+"""转发到worker的请求头"""
+
+HEALTHY_UPTIME = 60
+"""worker运行超过此时间（秒）后退出时，重启等待时间重新从头计算"""
+
+
+def _log(message: str) -> None:
+    print(f"[ntchat supervisor] {message}", file=sys.stderr, flush=True)
+
+
+class Worker:
+    """
+    worker进程，退出后自动重启
+    """
+
+    def __init__(
+        self, index: int, command: List[str], host: str, port: int, env: Dict[str, str]
+    ) -> None:
+        self.index: int = index
+        """worker编号"""
+        self.command: List[str] = command
+        """启动命令"""
+        self.host: str = host
+        """监听地址"""
+        self.port: int = port
+        """监听端口"""
+        self.env: Dict[str, str] = env
+        """附加的环境变量"""
+        self.process: Optional[asyncio.subprocess.Process] = None
+        """当前进程"""
+        self.restarts: int = 0
+        """重启次数"""
+        self.failures: int = 0
+        """连续未能稳定运行的次数，决定重启前的等待时间"""
+        self.stopping: bool = False
+
+    @property
+    def url(self) -> str:
+        """http地址"""
+        return f"http://{self.host}:{self.port}"
+
+    async def run(self) -> None:
+        """运行并在退出后重启，直到stop被调用"""
+        while not self.stopping:
+            env = {**os.environ, **self.env, "HOST": self.host, "PORT": str(self.port)}
+            self.process = await asyncio.create_subprocess_exec(*self.command, env=env)
+            _log(f"worker {self.index} started, pid {self.process.pid}")
+            started = time.monotonic()
+            code = await self.process.wait()
+            if self.stopping:
+                break
+            self.restarts += 1
+            if time.monotonic() - started >= HEALTHY_UPTIME:
+                self.failures = 0
+            self.failures += 1
+            delay = min(2 ** min(self.failures, 5), 30)
+            _log(f"worker {self.index} exited with {code}, restarting in {delay}s")
+            await asyncio.sleep(delay)
+
+    async def stop(self) -> None:
+        self.stopping = True
+        if self.process is not None and self.process.returncode is None:
+            self.process.terminate()
+            try:
+                await asyncio.wait_for(self.process.wait(), 10)
+            except asyncio.TimeoutError:
+                self.process.kill()
+
+
+class Supervisor:
+    """
+    按X-Self-ID将反向ws连接分配到worker
+    """
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.assignments: Dict[str, int] = dict(args.assign)
+        """手动指定的bot分配"""
+        self.secret: str = secrets.token_urlsafe(32)
+        """worker接口的密钥，通过环境变量传给worker，不对外公开"""
+        urls = [
+            f"http://{args.worker_host}:{args.worker_port + i}"
+            for i in range(args.workers)
+        ]
+        self.workers: List[Worker] = [
+            Worker(
+                i,
+                [sys.executable, args.script],
+                args.worker_host,
+                args.worker_port + i,
+                WorkerInfo(i, urls, self.assignments, self.secret).to_env(),
+            )
+            for i in range(args.workers)
+        ]
+        """worker进程"""
+        self.connections: Dict[str, int] = {}
+        """已转发的连接，wxid -> worker编号"""
+
+    def get_worker(self, self_id: str) -> Worker:
+        return self.workers[
+            get_worker_index(self_id, len(self.workers), self.assignments)
+        ]
+
+    async def _process_request(
+        self, path: str, headers: Headers
+    ) -> Optional[Tuple[HTTPStatus, List[Tuple[str, str]], bytes]]:
+        if path.rstrip("/") == "/ntchat/supervisor/load":
+            if not self._check_access_token(headers):
+                return HTTPStatus.FORBIDDEN, [], "身份认证失败".encode()
+            body = json.dumps(await self.load(), ensure_ascii=False)
+            return HTTPStatus.OK, [("Content-Type", "application/json")], body.encode()
+        if not headers.get("X-Self-ID"):
+            return HTTPStatus.BAD_REQUEST, [], b"Missing X-Self-ID Header"
+        return None
+
+    def _check_access_token(self, headers: Headers) -> bool:
+        """校验access_token，未设置 `--access-token` 时不校验"""
+        access_token = self.args.access_token
+        if not access_token:
+            return True
+        return hmac.compare_digest(access_token, headers.get("access_token") or "")
+
+    async def load(self) -> Dict[str, Any]:
+        """汇总各worker的负载"""
+        result: List[Dict[str, Any]] = []
+        headers = {WORKER_SECRET_HEADER: self.secret}
+        async with httpx.AsyncClient(timeout=5, headers=headers) as client:
+            for worker in self.workers:
+                item: Dict[str, Any] = {
+                    "worker_id": worker.index,
+                    "url": worker.url,
+                    "restarts": worker.restarts,
+                    "connections": sum(
+                        1 for i in self.connections.values() if i == worker.index
+                    ),
+                }
+                try:
+                    response = await client.get(f"{worker.url}/ntchat/worker/load")
+                    item.update(response.json())
+                except (httpx.HTTPError, ValueError) as e:
+                    item["error"] = repr(e)
+                result.append(item)
+        return {"workers": result}
+
+    async def _connect_worker(self, worker: Worker, path: str, headers: Dict[str, str]):
+        """连接worker，worker重启期间持续重试"""
+        uri = f"ws://{worker.host}:{worker.port}{path}"
+        for _ in range(self.args.connect_retries):
+            try:
+                return await websockets.connect(
+                    uri, extra_headers=headers, max_size=None, ping_interval=None
+                )
+            except (OSError, websockets.InvalidHandshake):
+                await asyncio.sleep(1)
+        return None
+
+    async def _handle(self, websocket: Any) -> None:
+        self_id = websocket.request_headers["X-Self-ID"]
+        worker = self.get_worker(self_id)
+        headers = {
+            name: websocket.request_headers[name]
+            for name in FORWARD_HEADERS
+            if name in websocket.request_headers
+        }
+        upstream = await self._connect_worker(worker, websocket.path, headers)
+        if upstream is None:
+            await websocket.close(1013, "Worker unavailable")
+            return
+
+        _log(f"bot {self_id} -> worker {worker.index}")
+        self.connections[self_id] = worker.index
+        try:
+            await self._pipe(websocket, upstream)
+        finally:
+            if self.connections.get(self_id) == worker.index:
+                del self.connections[self_id]
+            await upstream.close()
+
+    async def _pipe(self, client: Any, upstream: Any) -> None:
+        async def forward(source: Any, target: Any) -> None:
+            async for message in source:
+                await target.send(message)
+
+        tasks = [
+            asyncio.create_task(forward(client, upstream)),
+            asyncio.create_task(forward(upstream, client)),
+        ]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stop = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set_result, None)
+            except (NotImplementedError, RuntimeError):
+                # windows不支持add_signal_handler，由KeyboardInterrupt结束
+                pass
+
+        tasks = [asyncio.create_task(worker.run()) for worker in self.workers]
+        try:
+            async with websockets.serve(
+                self._handle,
+                self.args.host,
+                self.args.port,
+                process_request=self._process_request,
+                max_size=None,
+                ping_interval=None,
+            ):
+                _log(f"listening on {self.args.host}:{self.args.port}")
+                await stop
+        finally:
+            for worker in self.workers:
+                await worker.stop()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def _parse_assignment(value: str) -> Tuple[str, int]:
+    self_id, _, index = value.rpartition("=")
+    if not self_id:
+        raise argparse.ArgumentTypeError("assignment must be WXID=WORKER")
+    return self_id, int(index)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="ntchat multi-process supervisor")
+    parser.add_argument("script", help="bot入口文件，需要调用nonebot.run()")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1", help="对ntchat开放的地址")
+    parser.add_argument("--port", type=int, default=8080, help="对ntchat开放的端口")
+    parser.add_argument("--worker-host", default="127.0.0.1")
+    parser.add_argument(
+        "--worker-port", type=int, default=18080, help="worker端口从此端口开始依次递增"
+    )
+    parser.add_argument(
+        "--assign",
+        type=_parse_assignment,
+        action="append",
+        default=[],
+        metavar="WXID=WORKER",
+        help="手动指定bot所在的worker，可多次使用",
+    )
+    parser.add_argument(
+        "--access-token",
+        default=os.environ.get("ACCESS_TOKEN"),
+        help="访问 /ntchat/supervisor/load 需要的access_token，默认读取ACCESS_TOKEN环境变量",
+    )
+    parser.add_argument(
+        "--connect-retries", type=int, default=30, help="连接worker的重试次数，每次间隔1秒"
+    )
+    args = parser.parse_args()
+    try:
+        asyncio.run(Supervisor(args).run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
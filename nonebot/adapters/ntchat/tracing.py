@@ -0,0 +1,226 @@
+"""事件阶段追踪
+按采样率记录事件从接收到处理完成各阶段的耗时，用于定位延迟来源
+
+可以直接运行本模块汇总追踪文件：
+    python -m nonebot.adapters.ntchat.tracing ntchat_trace.jsonl
+"""
+
+import json
+import queue
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple
+
+from .utils import log
+
+_current_trace: ContextVar[Optional["Trace"]] = ContextVar(
+    "ntchat_current_trace", default=None
+)
+
+
+class Trace:
+    """
+    单个事件的追踪记录，每次mark记录距上一次mark的耗时
+    """
+
+    __slots__ = ("bot", "event", "started", "last", "stages")
+
+    def __init__(self, bot: str, started: Optional[float] = None) -> None:
+        now = time.perf_counter()
+        self.bot: str = bot
+        """bot的wxid"""
+        self.event: str = ""
+        """事件模型名称"""
+        self.started: float = now if started is None else started
+        """开始时间"""
+        self.last: float = self.started
+        """上一次mark的时间"""
+        self.stages: List[Tuple[str, float]] = []
+        """各阶段名称与耗时"""
+
+    def mark(self, stage: str) -> None:
+        """结束一个阶段"""
+        now = time.perf_counter()
+        self.stages.append((stage, now - self.last))
+        self.last = now
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ts": time.time(),
+            "bot": self.bot,
+            "event": self.event,
+            "total": self.last - self.started,
+            "stages": dict(self.stages),
+        }
+
+
+def mark(stage: str) -> None:
+    """结束当前上下文中追踪记录的一个阶段，未采样时不做任何事"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
+
+
+class TraceSink:
+    """
+    追踪记录输出，可继承以输出到其他位置
+    """
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlSink(TraceSink):
+    """
+    以每行一个json的格式追加到文件，在后台线程中编码与写入
+    """
+
+    def __init__(self, path: Path, queue_size: int = 10000) -> None:
+        self.path: Path = path
+        """文件路径"""
+        self.dropped: int = 0
+        """写入队列已满时丢弃的记录数"""
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(queue_size)
+        self._file: Optional[IO[str]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def emit(self, record: Dict[str, Any]) -> None:
+        """只做入队，不会阻塞事件循环"""
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, name="ntchat-trace", daemon=True
+            )
+            self._thread.start()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """写完队列中的记录并停止写入线程"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            try:
+                record = self._queue.get(timeout=1)
+            except queue.Empty:
+                # 空闲时刷新缓冲，避免进程崩溃时丢失过多记录
+                if self._file is not None:
+                    self._file.flush()
+                continue
+            if record is None:
+                break
+            try:
+                self._write(record)
+            except OSError as e:
+                log("ERROR", "Failed to write trace", e)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write(self, record: Dict[str, Any]) -> None:
+        if self._file is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = self.path.open("a", encoding="utf-8")
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+class Tracer:
+    """
+    按采样率创建追踪记录并输出到sink
+    """
+
+    def __init__(self, sample_rate: float, sink: Optional[TraceSink] = None) -> None:
+        self.sample_rate: float = sample_rate
+        """采样率，0为不追踪"""
+        self.sink: Optional[TraceSink] = sink
+        """追踪记录输出，为None时不追踪"""
+        self.traced: int = 0
+        """已输出的追踪记录数"""
+
+    def start(self, bot: str, started: Optional[float] = None) -> Optional[Trace]:
+        """按采样率开始追踪，未被采样时返回None"""
+        if self.sink is None or random.random() >= self.sample_rate:
+            return None
+        return Trace(bot, started)
+
+    def activate(self, trace: Optional[Trace]) -> Any:
+        """将追踪记录设为当前上下文的记录，返回用于恢复的token"""
+        return _current_trace.set(trace)
+
+    def deactivate(self, token: Any) -> None:
+        _current_trace.reset(token)
+
+    def finish(self, trace: Trace) -> None:
+        """输出追踪记录"""
+        if self.sink is None:
+            return
+        self.traced += 1
+        self.sink.emit(trace.to_dict())
+
+    def close(self) -> None:
+        if self.sink is not None:
+            self.sink.close()
+
+
+def _percentile(values: List[float], q: float) -> float:
+    values = sorted(values)
+    index = min(int(q * len(values)), len(values) - 1)
+    return values[index]
+
+
+def report(records: Iterable[Dict[str, Any]]) -> str:
+    """按事件类型与阶段汇总追踪记录的p50与p99耗时
+
+    参数:
+        records: 追踪记录
+
+    返回:
+        表格形式的汇总，时间单位为毫秒
+    """
+    samples: Dict[Tuple[str, str], List[float]] = defaultdict(list)
+    order: Dict[str, None] = {}
+    for record in records:
+        for stage, duration in record["stages"].items():
+            order[stage] = None
+            samples[(record["event"], stage)].append(duration)
+        samples[(record["event"], "total")].append(record["total"])
+    order["total"] = None
+
+    rank = {stage: i for i, stage in enumerate(order)}
+    lines = [f"{'event':<32}{'stage':<12}{'count':>8}{'p50 ms':>10}{'p99 ms':>10}"]
+    for (event, stage), values in sorted(
+        samples.items(), key=lambda item: (item[0][0], rank[item[0][1]])
+    ):
+        lines.append(
+            f"{event:<32}{stage:<12}{len(values):>8}"
+            f"{_percentile(values, 0.5) * 1000:>10.3f}"
+            f"{_percentile(values, 0.99) * 1000:>10.3f}"
+        )
+    return "\n".join(lines)
+
+
+def load(path: Path) -> List[Dict[str, Any]]:
+    """读取jsonl追踪文件"""
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("usage: python -m nonebot.adapters.ntchat.tracing <trace.jsonl>")
+        sys.exit(1)
+    print(report(load(Path(sys.argv[1]))))
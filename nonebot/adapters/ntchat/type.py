@@ -3,6 +3,7 @@
 """
 
 from enum import IntEnum
+from typing import Dict
 
 
 class EventType(IntEnum):
@@ -126,3 +127,11 @@ class SubType(IntEnum):
     """引用消息"""
     WX_APPMSG_WCPAY = 2000
     """转账"""
+
+
+EVENT_TYPE_NAMES: Dict[int, str] = {t.value: t.name for t in EventType}
+"""消息类型名称表"""
+WX_TYPE_NAMES: Dict[int, str] = {t.value: t.name for t in WxType}
+"""微信原始类型名称表"""
+SUB_TYPE_NAMES: Dict[int, str] = {t.value: t.name for t in SubType}
+"""应用子类型名称表"""
@@ -1,10 +1,40 @@
-from typing import Any, Dict, Optional
+import asyncio
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional, Tuple
 
-from nonebot.exception import ActionFailed
 from nonebot.utils import logger_wrapper
 
+from .exception import ActionFailed
+
 log = logger_wrapper("ntchat")
 
+_api_options: ContextVar[Optional[Tuple[Optional["asyncio.Task"], Dict[str, Any]]]] = (
+    ContextVar("ntchat_api_options", default=None)
+)
+
+
+@contextmanager
+def api_options(**options: Any) -> Iterator[None]:
+    """为当前任务中发起的api调用附加选项（发送优先级、写出通知等）
+
+    选项不经过 `call_api` 的参数传递，calling_api/called_api钩子中不可见，
+    钩子及其他子任务中发起的api调用也不会继承
+    """
+    token = _api_options.set((asyncio.current_task(), options))
+    try:
+        yield
+    finally:
+        _api_options.reset(token)
+
+
+def get_api_options() -> Dict[str, Any]:
+    """获取当前任务通过 `api_options` 设置的api调用选项"""
+    item = _api_options.get()
+    if item is None or item[0] is not asyncio.current_task():
+        return {}
+    return item[1]
+
 
 def handle_api_result(result: Optional[Dict[str, Any]]) -> Any:
     """处理 API 请求返回值。
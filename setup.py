@@ -21,4 +21,12 @@ setuptools.setup(
     ],
     python_requires=">=3.8",
     install_requires=["httpx==0.23.0"],
+    extras_require={
+        "orjson": ["orjson"],
+        "msgspec": ["msgspec"],
+        "ujson": ["ujson"],
+        "msgpack": ["msgpack"],
+        "cbor": ["cbor2"],
+        "supervisor": ["websockets>=10.1"],
+    },
 )
@@ -0,0 +1,14 @@
+import nonebot
+import pytest
+
+from nonebot.adapters.ntchat import Adapter
+
+
+def pytest_configure(config: pytest.Config) -> None:
+    nonebot.init(api_timeout=3)
+    nonebot.get_driver().register_adapter(Adapter)
+
+
+@pytest.fixture
+def adapter() -> Adapter:
+    return nonebot.get_driver()._adapters[Adapter.get_name()]  # type: ignore
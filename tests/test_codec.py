@@ -0,0 +1,24 @@
+import asyncio
+
+import pytest
+
+from nonebot.adapters.ntchat import Adapter
+
+cbor2 = pytest.importorskip("cbor2")
+msgpack = pytest.importorskip("msgpack")
+
+
+def test_inbound_frames_are_sniffed(adapter: Adapter) -> None:
+    """收到的帧按首字节识别格式，与连接协商的格式无关"""
+    frame = {"type": 11046, "data": {"msg": "hello"}}
+    msgpack_codec = adapter.binary_codecs["msgpack"]
+
+    for data, name in (
+        (msgpack.packb(frame), "msgpack"),
+        (cbor2.dumps(frame), "cbor"),
+        (b'{"type": 11046, "data": {"msg": "hello"}}', None),
+    ):
+        for negotiated in (None, msgpack_codec):
+            codec = adapter._inbound_codec(data, negotiated)
+            assert (codec.name if codec else None) == name
+            assert asyncio.run(adapter._loads_frame(data, codec)) == frame
@@ -0,0 +1,67 @@
+import json
+import time
+from typing import Any, Dict, List
+
+import nonebot
+from fastapi.testclient import TestClient
+from nonebot import on_message
+from nonebot.rule import startswith
+
+from nonebot.adapters.ntchat import Adapter, Bot, TextMessageEvent
+
+results: List[Any] = []
+
+calling = on_message(startswith("call_api"), block=True)
+
+
+@calling.handle()
+async def _(bot: Bot, event: TextMessageEvent) -> None:
+    try:
+        results.append(await bot.call_api("get_self_info"))
+    except Exception as e:
+        results.append(e)
+
+
+def text_frame(msgid: int) -> Dict[str, Any]:
+    return {
+        "type": 11046,
+        "data": {
+            "at_user_list": [],
+            "from_wxid": "wxid_user",
+            "msg": "call_api",
+            "msgid": str(msgid),
+            "room_wxid": "",
+            "timestamp": 1,
+            "to_wxid": "wxid_bot",
+            "wx_type": 1,
+        },
+    }
+
+
+def test_api_results_are_read_while_shard_is_full(adapter: Adapter) -> None:
+    """分片队列已满时，事件处理中的api调用仍能收到回调"""
+    config = adapter.ntchat_config
+    config.ntchat_dispatch_workers = 1
+    config.ntchat_dispatch_queue_size = 2
+    results.clear()
+    events = 8
+
+    with TestClient(nonebot.get_asgi()) as client:
+        with client.websocket_connect(
+            "/ntchat/ws", headers={"X-Self-ID": "wxid_bot"}
+        ) as ws:
+            for msgid in range(events):
+                ws.send_text(json.dumps(text_frame(msgid)))
+            started = time.monotonic()
+            for _ in range(events):
+                request = ws.receive_json()
+                assert request["action"] == "get_self_info"
+                reply = {"echo": request["echo"], "status": "ok", "data": "ok"}
+                ws.send_text(json.dumps(reply))
+            deadline = time.monotonic() + 2
+            while len(results) < events and time.monotonic() < deadline:
+                time.sleep(0.01)
+            elapsed = time.monotonic() - started
+
+    assert results == ["ok"] * events
+    assert elapsed < 2
@@ -0,0 +1,26 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+from nonebot.adapters.ntchat.media import MediaStore
+
+
+def test_cleanup_keeps_foreign_files(tmp_path: Path) -> None:
+    """清理只删除按内容哈希命名的媒体文件，不删除目录中的其他文件"""
+    foreign = tmp_path / "notes.txt"
+    foreign.write_text("keep")
+    store = MediaStore()
+    store.configure(tmp_path, threshold=0, max_age=60)
+    path = store.save(b"sticker", ".gif")
+    assert path.name == hashlib.sha256(b"sticker").hexdigest() + ".gif"
+    assert store.total_bytes == len(b"sticker")
+
+    old = time.time() - 3600
+    os.utime(foreign, (old, old))
+    os.utime(path, (old, old))
+    store.cleanup()
+
+    assert foreign.exists()
+    assert not path.exists()
+    assert store.total_bytes == 0
@@ -0,0 +1,20 @@
+import sys
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "benchmarks"))
+
+from check_parity import build_models, compare  # noqa: E402
+from corpus import CorpusGenerator  # noqa: E402
+
+
+def test_trusted_construction_matches_parse_obj() -> None:
+    """信任模式构造的事件与parse_obj完整校验的结果一致"""
+    models = build_models()
+    mismatches: List[str] = []
+    for frame in CorpusGenerator(0).generate(2000):
+        model = models.get_event_model(frame)
+        for keep_raw in (False, True):
+            for diff in compare(model, frame, keep_raw):
+                mismatches.append(f"{model.__name__} (keep_raw={keep_raw}): {diff}")
+    assert not mismatches, "\n".join(mismatches[:20])
@@ -0,0 +1,37 @@
+import asyncio
+
+import pytest
+
+from nonebot.adapters.ntchat.exception import ApiTimeout
+from nonebot.adapters.ntchat.store import ResultStore
+
+
+def test_result_before_wait_is_kept() -> None:
+    """回调先于等待到达（如发送过程中）时不被丢弃"""
+
+    async def run() -> None:
+        store = ResultStore()
+        seq = store.get_seq()
+        future = store.register(seq)
+        store.add_result({"echo": str(seq), "status": "ok"})
+        assert await store.wait(seq, future, 1) == {"echo": str(seq), "status": "ok"}
+        assert store.in_flight == 0
+        assert store.late == store.unknown == 0
+
+    asyncio.run(run())
+
+
+def test_wait_timeout_discards() -> None:
+    async def run() -> None:
+        store = ResultStore()
+        seq = store.get_seq()
+        future = store.register(seq, raw=True)
+        assert store.wants_raw(seq)
+        with pytest.raises(ApiTimeout):
+            await store.wait(seq, future, 0.01)
+        assert store.in_flight == 0
+        assert not store.wants_raw(seq)
+        store.add_result({"echo": str(seq)})
+        assert store.late == 1
+
+    asyncio.run(run())